@@ -0,0 +1,102 @@
+"""
+Benchmark of auxiliary.has_docstrings against the full-AST check it replaced, on large generated modules.
+
+Usage:
+    python benchmarks/docstring_prefilter.py [--rows 100000] [--repeat 3]
+
+Three files are generated in a temporary folder:
+    - table_documented.py: a lookup table with a module docstring (the scan stops at once);
+    - wrapper.py: a wrapped Fortran-style interface, thousands of functions with docstrings;
+    - table_undocumented.py: a lookup table and one helper function, no docstring anywhere
+      (the worst case: every def/class header is checked).
+Time and peak memory (tracemalloc) are reported for both implementations.
+"""
+
+import argparse
+import ast
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from contextmaker.converters import auxiliary
+
+
+def has_docstrings_ast(file_path):
+    """The previous implementation: parse the whole file, then walk the tree."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=file_path)
+    if ast.get_docstring(tree):
+        return True
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if ast.get_docstring(node):
+                return True
+    return False
+
+
+def write_table(path, rows, docstring):
+    with open(path, "w", encoding="utf-8") as f:
+        if docstring:
+            f.write('"""Generated lookup table."""\n\n')
+        f.write("TABLE = [\n")
+        for i in range(rows):
+            f.write(f"    ({i}, {i * 0.001!r}, 'key_{i}', [{i}, {i + 1}, {i + 2}]),\n")
+        f.write("]\n\n\ndef lookup(i):\n    return TABLE[i]\n")
+
+
+def write_wrapper(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("import numpy as np\nfrom . import _flib\n\n")
+        for i in range(rows // 10):
+            f.write(
+                f"def routine_{i}(a, b, n={i}, *, out=None):\n"
+                f"    if out is None:\n        out = np.empty(n)\n"
+                f"    _flib.routine_{i}(a, b, n, out)\n    return out\n\n"
+            )
+        f.write('def documented():\n    """Last function, the only one documented."""\n')
+
+
+def measure(func, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Rows of the generated tables (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best is kept (default: 3)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="contextmaker_bench_") as tmp:
+        cases = {
+            "table_documented.py": lambda p: write_table(p, args.rows, docstring=True),
+            "wrapper.py": lambda p: write_wrapper(p, args.rows),
+            "table_undocumented.py": lambda p: write_table(p, args.rows, docstring=False),
+        }
+        print(f"{'file':<24}{'size':>9}  {'full AST':>18}  {'prefilter':>18}  {'speedup':>8}")
+        for name, write in cases.items():
+            path = os.path.join(tmp, name)
+            write(path)
+            size = os.path.getsize(path) / 2 ** 20
+            expected, ast_time, ast_peak = measure(has_docstrings_ast, path, args.repeat)
+            result, time_, peak = measure(auxiliary.has_docstrings, path, args.repeat)
+            assert result == expected, f"{name}: prefilter says {result}, AST says {expected}"
+            print(
+                f"{name:<24}{size:>7.1f}MB  {ast_time:>7.3f}s {ast_peak / 2 ** 20:>7.1f}MB  "
+                f"{time_:>7.3f}s {peak / 2 ** 20:>7.1f}MB  {ast_time / time_:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark of the three ways to turn a Sphinx project into one text file, on the same project.
+
+Usage:
+    python benchmarks/sphinx_builders.py [--pages 200] [--functions 400] [--repeat 1]
+    python benchmarks/sphinx_builders.py --sphinx-source /path/to/docs --source-root /path/to/lib
+
+Paths compared:
+    - markdown + html2text: sphinx-markdown-builder pages, combined, then markdown and html2text
+      (make() before Sphinx's text builder was used for .txt outputs);
+    - html + html2text: full HTML build with theme and static assets, every page through html2text
+      (markdown_builder --html-to-text);
+    - text builder: Sphinx's built-in text builder, pages combined as they are (make() for .txt).
+Without --sphinx-source, a project is generated in a temporary folder: pages of prose, lists,
+tables and code blocks, and an API page documenting a generated module with autodoc.
+Wall time (best of --repeat) and output size are reported.
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from contextmaker.contextmaker import markdown_to_text
+from contextmaker.converters import markdown_builder
+
+
+def write_project(root, pages, functions):
+    """Generate a Sphinx project and the module it documents; return (sphinx_source, source_root)."""
+    source_root = os.path.join(root, "benchlib")
+    package = os.path.join(source_root, "benchlib")
+    docs = os.path.join(source_root, "docs")
+    os.makedirs(package)
+    os.makedirs(docs)
+    with open(os.path.join(package, "__init__.py"), "w", encoding="utf-8") as f:
+        f.write('"""Generated library."""\n\n')
+        for i in range(functions):
+            f.write(
+                f"def routine_{i}(a, b=1.0, *, scale=None):\n"
+                f'    """\n    Combine a and b, step {i}.\n\n'
+                f"    Args:\n        a (float): First operand.\n        b (float): Second operand.\n"
+                f"        scale (float, optional): Factor applied to the result.\n\n"
+                f'    Returns:\n        float: The combined value.\n    """\n'
+                f"    return (a + b) * (scale or 1.0)\n\n\n"
+            )
+    with open(os.path.join(docs, "conf.py"), "w", encoding="utf-8") as f:
+        f.write('project = "benchlib"\nextensions = ["sphinx.ext.autodoc", "sphinx.ext.napoleon"]\n')
+    names = [f"page_{i}" for i in range(pages)]
+    with open(os.path.join(docs, "index.rst"), "w", encoding="utf-8") as f:
+        f.write("benchlib\n========\n\n.. toctree::\n   :maxdepth: 2\n\n   api\n")
+        f.writelines(f"   {name}\n" for name in names)
+    with open(os.path.join(docs, "api.rst"), "w", encoding="utf-8") as f:
+        f.write("API\n===\n\n.. automodule:: benchlib\n   :members:\n")
+    for i, name in enumerate(names):
+        with open(os.path.join(docs, f"{name}.rst"), "w", encoding="utf-8") as f:
+            f.write(f"Topic {i}\n{'=' * (6 + len(str(i)))}\n\n")
+            for j in range(5):
+                paragraph = f"Some *emphasised* and ``literal`` text about :func:`benchlib.routine_{i}`, repeated. " * 3
+                f.write(
+                    f"Part {j}\n{'-' * (5 + len(str(j)))}\n\n{paragraph}\n\n"
+                    "- first item\n- second item with **bold** text\n\n"
+                    ".. code-block:: python\n\n    import benchlib\n"
+                    f"    value = benchlib.routine_{i}(1.0, 2.0)\n\n"
+                    "=====  =====\nKey    Value\n=====  =====\nalpha  1\nbeta   2\n=====  =====\n\n"
+                )
+    return docs, source_root
+
+
+def markdown_then_text(sphinx_source, source_root, workspace, output):
+    build_dir = markdown_builder.build_markdown(sphinx_source, os.path.join(sphinx_source, "conf.py"), source_root, workspace=workspace)
+    markdown_file = markdown_builder.combine_markdown(build_dir, [], output + ".md", os.path.join(sphinx_source, "index.rst"), "benchlib")
+    markdown_to_text(markdown_file, output)
+
+
+def html_then_text(sphinx_source, source_root, workspace, output):
+    markdown_builder.build_html_and_convert_to_text(sphinx_source, os.path.join(sphinx_source, "conf.py"), source_root, output)
+
+
+def text_builder(sphinx_source, source_root, workspace, output):
+    build_dir = markdown_builder.build_markdown(sphinx_source, os.path.join(sphinx_source, "conf.py"), source_root, workspace=workspace, builder="text")
+    markdown_builder.combine_markdown(build_dir, [], output, os.path.join(sphinx_source, "index.rst"), "benchlib", builder="text")
+
+
+PATHS = {
+    "markdown + html2text": markdown_then_text,
+    "html + html2text": html_then_text,
+    "text builder": text_builder,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200, help="Pages of the generated project (default: 200)")
+    parser.add_argument("--functions", type=int, default=400, help="Functions of the generated module (default: 400)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per path, the best is kept (default: 1)")
+    parser.add_argument("--sphinx-source", help="Benchmark this Sphinx source folder instead of a generated project")
+    parser.add_argument("--source-root", help="With --sphinx-source: root of the documented library")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="contextmaker_bench_") as tmp:
+        if args.sphinx_source:
+            sphinx_source = os.path.abspath(args.sphinx_source)
+            source_root = os.path.abspath(args.source_root or os.path.dirname(sphinx_source))
+        else:
+            sphinx_source, source_root = write_project(tmp, args.pages, args.functions)
+        print(f"{'path':<24}{'time':>9}  {'output':>10}")
+        for name, convert in PATHS.items():
+            best = float("inf")
+            for run in range(args.repeat):
+                workspace = tempfile.mkdtemp(prefix="run_", dir=tmp)
+                output = os.path.join(workspace, "benchlib.txt")
+                start = time.perf_counter()
+                convert(sphinx_source, source_root, workspace, output)
+                best = min(best, time.perf_counter() - start)
+            size = os.path.getsize(output) / 2 ** 20 if os.path.exists(output) else 0.0
+            print(f"{name:<24}{best:>8.2f}s  {size:>8.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-from .contextmaker import make  # Expose 'make' as the main API, keep 'convert' for backward compatibility
+from .contextmaker import make, iter_sections  # Expose 'make' as the main API, keep 'convert' for backward compatibility
@@ -4,8 +4,22 @@ Context_Maker: A tool to convert library documentation into a format optimized f
 Usage:
     contextmaker <library_name>
     or
+    contextmaker serve        (daemon; later `contextmaker <library_name>` calls are sent to it)
+    or
     contextmaker pixell --input_path /path/to/library/source
     or
+    contextmaker pixell --watch   (rebuild whenever the sources or docs change)
+    or
+    contextmaker pixell --store contexts.db, then contextmaker search contexts.db "curvedsky.alm2map"
+    or
+    contextmaker pixell --plan    (print what the conversion would do and cost, as JSON)
+    or
+    contextmaker intersphinx fetch   (cache intersphinx inventories for offline builds)
+    or
+    contextmaker worker --queue /shared/queue   (run jobs from a queue shared by several nodes)
+    or
+    contextmaker.iter_sections("pixell")   (Python: yield the sections as they are produced)
+    or
     python contextmaker/contextmaker.py --i <path_to_library> --o <path_to_output_folder>
 
 Notes:
@@ -15,10 +29,15 @@ Notes:
 """
 
 import argparse
+import glob
+import importlib.util
+import json
 import os
 import sys
 import logging
-from contextmaker.converters import nonsphinx_converter, auxiliary
+import tempfile
+from contextmaker.converters import nonsphinx_converter, auxiliary, filters, framed_output, incremental, limits as stage_limits
+from contextmaker import freshness, profiling, server
 import subprocess
 
 # Set up the logger
@@ -44,7 +63,30 @@ def parse_args():
     parser.add_argument('--output', '-o', help='Output path (default: ~/contextmaker_output/)')
     parser.add_argument('--input_path', '-i', help='Manual path to library (overrides automatic search)')
     parser.add_argument('--extension', '-e', choices=['txt', 'md'], default='txt', help='Output file extension: txt (default) or md')
-    return parser.parse_args()
+    parser.add_argument('--static-autodoc', action='store_true', help='Resolve Sphinx autodoc directives from the source AST instead of importing the library')
+    parser.add_argument('--build-camb', action='store_true', help='CAMB only: compile the Fortran library if missing instead of mocking it')
+    parser.add_argument('--store', help='Also write every section to this SQLite full-text store (see `contextmaker search`)')
+    parser.add_argument('--export', action='store_true', help='Also export every section as <library>.sections.jsonl (and .parquet if pyarrow is installed)')
+    parser.add_argument('--compress', choices=['gzip', 'zstd'], help='Write the output as independently decompressible frames, one per section, with a .idx.json frame index')
+    parser.add_argument('--only', action='append', metavar='PATTERN', help='Only document what matches PATTERN: a module ("pixell.enmap"), a Sphinx document or glob ("api/*"), a notebook name. Repeatable')
+    parser.add_argument('--include', action='append', metavar='PATTERN', help='Only convert files matching this gitignore-style pattern, relative to the library root. Repeatable')
+    parser.add_argument('--exclude', action='append', metavar='PATTERN', help='Skip files and directories matching this gitignore-style pattern ("tests/", "*_pb2.py"), on top of .contextmakerignore. Repeatable')
+    parser.add_argument('--max-file-size', metavar='SIZE', help='Skip files larger than SIZE (e.g. 500k, 2M)')
+    parser.add_argument('--timeout', action='append', metavar='[STAGE=]SECONDS', help='Kill an external tool (stage sphinx, notebook or build; all stages without STAGE) after SECONDS. Repeatable')
+    parser.add_argument('--memory-limit', action='append', metavar='[STAGE=]SIZE', help='Cap the memory of external tools (e.g. sphinx=4G). Repeatable')
+    parser.add_argument('--cpu-limit', action='append', metavar='[STAGE=]SECONDS', help='Cap the CPU time of external tools. Repeatable')
+    parser.add_argument('--offline-intersphinx', action='store_true', help='Never fetch intersphinx inventories: use the copies cached with `contextmaker intersphinx fetch`')
+    parser.add_argument('--no-dedup', dest='dedup', action='store_false', help='Keep repeated paragraphs and code blocks instead of replacing them with references')
+    parser.add_argument('--force', action='store_true', help='Convert even if the existing output is up to date with the installed version and sources')
+    parser.add_argument('--profile', metavar='DIR', help='Write a cProfile profile of every pipeline stage and their wall times to DIR/<library>/ (implies --force)')
+    parser.add_argument('--profile-memory', action='store_true', help='With --profile, also report the top tracemalloc allocations of every stage')
+    parser.add_argument('--plan', action='store_true', help='Print the planned pipeline, file counts, sizes, Sphinx strategy, cache hit ratio and estimated duration as JSON, without converting')
+    parser.add_argument('--watch', action='store_true', help='Keep running and regenerate the output whenever the library sources or docs change')
+    parser.add_argument('--poll', action='store_true', help='With --watch: detect changes by polling file stats instead of inotify')
+    args = parser.parse_args()
+    if args.watch and args.profile:
+        parser.error("--profile cannot be combined with --watch")
+    return args
 
 
 def markdown_to_text(md_path, txt_path):
@@ -70,114 +112,118 @@ def markdown_to_text(md_path, txt_path):
 
 
 def ensure_library_installed(library_name):
-    try:
-        __import__(library_name)
-    except ImportError:
+    # find_spec locates the package without executing it, so libraries whose import needs
+    # compiled extensions (e.g. CAMB) are not reinstalled just because they cannot be imported yet
+    if importlib.util.find_spec(library_name) is None:
         logger.info(f"Library '{library_name}' not found. Attempting to install it via pip...")
         result = subprocess.run([sys.executable, "-m", "pip", "install", library_name])
         if result.returncode != 0:
             logger.error(f"Automatic pip install failed for '{library_name}'. Please install it manually.")
             sys.exit(1)
-        try:
-            __import__(library_name)
-        except ImportError:
+        importlib.invalidate_caches()
+        if importlib.util.find_spec(library_name) is None:
             logger.error(f"Library '{library_name}' could not be imported even after pip install. Please check the library name and your environment.")
             sys.exit(1)
 
 
+def find_input_path(library_name, input_path=None):
+    """
+    Install the library if needed, then return the absolute path of its sources (input_path when
+    given, otherwise found with auxiliary.find_library_path), or None if it cannot be found.
+    """
+    ensure_library_installed(library_name)
+    if input_path:
+        input_path = os.path.abspath(input_path)
+        logger.info(f"📁 Using manual path: {input_path}")
+        return input_path
+    logger.info(f"🔍 Searching for library '{library_name}'...")
+    input_path = auxiliary.find_library_path(library_name)
+    if not input_path:
+        logger.error(f"❌ Library '{library_name}' not found. Try specifying the path manually with input_path.")
+    return input_path
+
+
 def main():
+    if sys.argv[1:2] == ["serve"]:
+        server.main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["intersphinx"]:
+        from contextmaker.converters import intersphinx_cache
+        intersphinx_cache.main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["worker"]:
+        from contextmaker import work_queue
+        work_queue.main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["search"]:
+        from contextmaker import section_store
+        section_store.main(sys.argv[2:])
+        return
     try:
         args = parse_args()
-        
-        # Ensure target library is installed before processing
-        ensure_library_installed(args.library_name)
-        
-        # Determine input path
-        if args.input_path:
-            # Manual path provided
-            input_path = os.path.abspath(args.input_path)
-            logger.info(f"📁 Using manual path: {input_path}")
-        else:
-            # Automatic search
-            logger.info(f"🔍 Searching for library '{args.library_name}'...")
-            input_path = auxiliary.find_library_path(args.library_name)
-            if not input_path:
-                logger.error(f"❌ Library '{args.library_name}' not found. Try specifying the path manually with --input_path")
+        if args.plan:
+            from contextmaker import planner
+            # Keep stdout for the JSON plan
+            for handler in logging.getLogger().handlers:
+                if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                    handler.setStream(sys.stderr)
+            result = planner.plan(
+                args.library_name,
+                input_path=args.input_path,
+                output_path=args.output,
+                extension=args.extension,
+                static_autodoc=args.static_autodoc,
+                only=args.only,
+                include=args.include,
+                exclude=args.exclude,
+                max_file_size=args.max_file_size,
+                build_camb=args.build_camb,
+                compress=args.compress,
+                offline_intersphinx=args.offline_intersphinx,
+                dedup=args.dedup,
+                force=args.force,
+                store=args.store,
+                export=args.export,
+            )
+            if result is None:
                 sys.exit(1)
-        # Ensure CAMB is built if processing CAMB
-        if args.library_name.lower() == "camb":
-            auxiliary.ensure_camb_built(input_path)
-            auxiliary.patch_camb_sys_exit(input_path)
-        
-        # Determine output path
-        if args.output:
-            output_path = os.path.abspath(args.output)
-        else:
-            output_path = auxiliary.get_default_output_path()
-        
-        logger.info(f"📁 Input path: {input_path}")
-        logger.info(f"📁 Output path: {output_path}")
-
-        if not os.path.exists(input_path):
-            logger.error(f"Input path '{input_path}' does not exist.")
-            sys.exit(1)
-
-        if not os.listdir(input_path):
-            logger.error(f"Input path '{input_path}' is empty.")
-            sys.exit(1)
-
-        os.makedirs(output_path, exist_ok=True)
-
-        doc_format = auxiliary.find_format(input_path)
-        logger.info(f" 📚 Detected documentation format: {doc_format}")
-
-        extension = args.extension
-
-        if doc_format == 'sphinx':
-            from contextmaker.converters.markdown_builder import build_markdown, combine_markdown, find_notebooks_in_doc_dirs, convert_notebook, append_notebook_markdown
-            sphinx_source = auxiliary.find_sphinx_source(input_path)
-            if sphinx_source:
-                conf_path = os.path.join(sphinx_source, "conf.py")
-                index_path = os.path.join(sphinx_source, "index.rst")
-                output_file = os.path.join(output_path, f"{args.library_name}.md")
-                build_dir = build_markdown(sphinx_source, conf_path, input_path, robust=False)
-                import glob
-                md_files = glob.glob(os.path.join(build_dir, "*.md"))
-                if not md_files:
-                    logger.warning(" ⚠️ Sphinx build with original conf.py failed or produced no markdown. Falling back to minimal configuration...")
-                    build_dir = build_markdown(sphinx_source, conf_path, input_path, robust=True)
-                combine_markdown(build_dir, [], output_file, index_path, args.library_name)
-                appended_notebooks = set()
-                for nb_path in find_notebooks_in_doc_dirs(input_path):
-                    notebook_md = convert_notebook(nb_path)
-                    if notebook_md:
-                        append_notebook_markdown(output_file, notebook_md)
-                        appended_notebooks.add(os.path.abspath(nb_path))
-                success = True
-            else:
-                success = False
-        else:
-            success = nonsphinx_converter.create_final_markdown(input_path, output_path, args.library_name)
-        
-        if success:
-            logger.info(f" ✅ Conversion completed successfully. Output: {output_file if doc_format == 'sphinx' else output_path}")
-            if extension == 'txt' and output_file is not None:
-                txt_file = os.path.splitext(output_file)[0] + ".txt"
-                markdown_to_text(output_file, txt_file)
-                # Delete the markdown file after successful text conversion
-                if os.path.exists(txt_file):
-                    try:
-                        os.remove(output_file)
-                        logger.info(f"Deleted markdown file after text conversion: {output_file}")
-                    except Exception as e:
-                        logger.warning(f"Could not delete markdown file: {output_file}. Error: {e}")
-                return txt_file
-            elif output_file is not None:
-                return output_file
-            else:
-                return None
-        else:
-            logger.warning(" ⚠️ Conversion completed with warnings or partial results.")
+            print(json.dumps(result, indent=2))
+            return
+        options = dict(
+            output_path=args.output,
+            input_path=args.input_path,
+            extension=args.extension,
+            static_autodoc=args.static_autodoc,
+            build_camb=args.build_camb,
+            store=args.store,
+            export=args.export,
+            compress=args.compress,
+            only=args.only,
+            include=args.include,
+            exclude=args.exclude,
+            max_file_size=args.max_file_size,
+            limits=stage_limits.merge(
+                stage_limits.parse_option(args.timeout, "timeout"),
+                stage_limits.parse_option(args.memory_limit, "memory", str),
+                stage_limits.parse_option(args.cpu_limit, "cpu", int),
+            ),
+            offline_intersphinx=args.offline_intersphinx,
+            dedup=args.dedup,
+        )
+        if args.watch:
+            from contextmaker import watcher
+            # Every rebuild converts, so --force is implied
+            output_file = watcher.watch(args.library_name, polling=args.poll, **options)
+            if output_file is None:
+                sys.exit(1)
+            return
+        output_file = make(
+            args.library_name,
+            force=args.force,
+            profile=args.profile,
+            profile_memory=args.profile_memory,
+            **options,
+        )
 
         # At the very end, delete the conversion.log file if it exists
         log_path = os.path.join(os.getcwd(), "conversion.log")
@@ -188,12 +234,15 @@ def main():
             except Exception as e:
                 logger.warning(f"Could not delete log file: {log_path}. Error: {e}")
 
+        if output_file is None:
+            sys.exit(1)
+
     except Exception as e:
         logger.exception(f" ❌ An unexpected error occurred: {e}")
         sys.exit(1)
 
 
-def make(library_name, output_path=None, input_path=None, extension='txt'):
+def make(library_name, output_path=None, input_path=None, extension='txt', static_autodoc=False, build_camb=False, store=None, export=False, compress=None, only=None, include=None, exclude=None, max_file_size=None, limits=None, offline_intersphinx=False, dedup=True, force=False, profile=None, profile_memory=False, use_daemon=None):
     """
     Convert a library's documentation to text or markdown format (programmatic API).
     Args:
@@ -201,101 +250,249 @@ def make(library_name, output_path=None, input_path=None, extension='txt'):
         output_path (str, optional): Output directory. Defaults to ~/your_context_library/.
         input_path (str, optional): Manual path to library (overrides automatic search).
         extension (str, optional): Output file extension: 'txt' (default) or 'md'.
+        static_autodoc (bool, optional): Resolve Sphinx autodoc directives from the source AST instead
+            of importing the library (no compiled extensions or heavy imports needed).
+        build_camb (bool, optional): CAMB only: compile the Fortran library if it is missing. By default
+            it is mocked and the docs are generated statically, without a compiler.
+        store (str, optional): Path of a SQLite database that also receives every section of the output
+            (pages, notebooks, or one per module/class/function), indexed for full-text search. The
+            library's previous rows are replaced, also with only: the store then holds the selection.
+        export (bool, optional): Also write every section with its heading path, size and content hash to
+            <library>.sections.jsonl (and .parquet when pyarrow is installed) next to the output.
+        compress (str, optional): "gzip" or "zstd": write <library>.<extension>.gz/.zst made of one compressed
+            frame per section, with a <file>.idx.json frame index to read single sections (see framed_output.py).
+        only (list, optional): Only document what matches these patterns, e.g. ["pixell.enmap", "api/*"]:
+            modules (with their members and submodules), Sphinx docnames or globs, notebook names. Sphinx
+            builds only the matching documents and their toctree closure.
+        include (list, optional): gitignore-style patterns, relative to the library root, of the files to
+            convert; others are skipped.
+        exclude (list, optional): gitignore-style patterns of files and directories to skip ("tests/",
+            "benchmarks/", "*_pb2.py"), added to the defaults (.git/, build/, ...) and to the library's
+            .contextmakerignore. Excluded directories are pruned while walking, never read or copied.
+        max_file_size (int | str, optional): Skip files larger than this (bytes, or "500k", "2M").
+        limits (dict, optional): Timeout, memory and CPU limits of the external tools, per stage ("sphinx",
+            "notebook", "build") or for all ("*"), e.g. {"*": {"timeout": 600}, "sphinx": {"memory": "4G"}}
+            (see converters/limits.py). A Sphinx build breaching them falls back to the minimal conf.py,
+            then to docstring extraction.
+        offline_intersphinx (bool, optional): Never fetch intersphinx inventories: the project's conf.py
+            mappings are rewritten to the copies cached with `contextmaker intersphinx fetch`, and
+            mappings without one are dropped (see converters/intersphinx_cache.py).
+        dedup (bool, optional): Replace paragraphs and code blocks repeating earlier ones (inherited docstrings,
+            boilerplate, vendored copies) with a short reference (see converters/dedup.py). Sections sent
+            to store and export keep their full text.
+        force (bool, optional): Convert even when the existing output is fresh. By default an output whose
+            <output>.meta.json record matches the installed distribution version, the source files' mtimes,
+            the contextmaker version and these options is returned as is (see freshness.py); runs with
+            store or export always convert.
+        profile (str, optional): Folder receiving a cProfile profile (<stage>.pstats) of every pipeline stage
+            (discovery, format detection, Sphinx, file conversion, combine) and their wall
+            times, in <profile>/<library>/ (see profiling.py). Implies force; never sent to the daemon.
+        profile_memory (bool, optional): With profile, also report the top tracemalloc allocations and the
+            peak memory of every stage (<stage>.allocations.txt).
+        use_daemon (bool, optional): Send the request to a running `contextmaker serve` daemon.
+            None (default) uses the daemon when one answers, False always converts in-process.
     Returns:
         str: Path to the generated documentation file, or None if failed.
     """
+    # Profiles measure this process, so profiled conversions always run in-process
+    if use_daemon is not False and not profile and server.daemon_available():
+        logger.info(f" 📡 Sending '{library_name}' to the contextmaker daemon at {server.default_socket_path()}")
+        return server.request_build(
+            library_name, output_path=output_path, input_path=input_path, extension=extension,
+            static_autodoc=static_autodoc, build_camb=build_camb, store=store, export=export, compress=compress, only=only,
+            include=include, exclude=exclude, max_file_size=max_file_size, limits=limits,
+            offline_intersphinx=offline_intersphinx, dedup=dedup, force=force,
+        )
+    profiler = profiling.start(profile, library_name, profile_memory)
     try:
-        # Ensure target library is installed before processing
-        ensure_library_installed(library_name)
-        # Determine input path
-        if input_path:
-            input_path = os.path.abspath(input_path)
-            logger.info(f"📁 Using manual path: {input_path}")
-        else:
-            logger.info(f"🔍 Searching for library '{library_name}'...")
-            input_path = auxiliary.find_library_path(library_name)
+        with profiling.stage("discovery"):
+            input_path = find_input_path(library_name, input_path)
             if not input_path:
-                logger.error(f"❌ Library '{library_name}' not found. Try specifying the path manually with input_path.")
                 return None
-        # Ensure CAMB is built if processing CAMB
-        if library_name.lower() == "camb":
-            auxiliary.ensure_camb_built(input_path)
-            auxiliary.patch_camb_sys_exit(input_path)
-
-        # Determine output path
-        if output_path:
-            output_path = os.path.abspath(output_path)
-        else:
-            output_path = auxiliary.get_default_output_path()
 
-        logger.info(f"📁 Input path: {input_path}")
-        logger.info(f"📁 Output path: {output_path}")
+            # Determine output path
+            if output_path:
+                output_path = os.path.abspath(output_path)
+            else:
+                output_path = auxiliary.get_default_output_path()
+            os.makedirs(output_path, exist_ok=True)
+            logger.info(f"📁 Output path: {output_path}")
+
+            # Sphinx pages are built as text directly for .txt outputs, as Markdown otherwise
+            from contextmaker.converters.markdown_builder import builder_for, write_combined
+            builder = builder_for(extension)
+
+            # Reuse the previous output when nothing it was built from has changed
+            compress = framed_output.resolve_compression(compress)
+            record = freshness.build_record(library_name, input_path, freshness.record_options(
+                extension, builder, static_autodoc, build_camb, compress, only, include, exclude, max_file_size,
+                offline_intersphinx, dedup,
+            ))
+            output_file = framed_output.output_path(os.path.join(output_path, f"{library_name}.{extension}"), compress)
+        if not (force or store or export or profiler) and freshness.fresh_output(output_file, record):
+            logger.info(f" ♻️ {library_name} is unchanged since the last conversion, reusing {output_file}")
+            return output_file
+
+        # Every intermediate file lives in a private workspace and the result is moved into
+        # output_path atomically, so concurrent runs (threads or processes) never collide
+        with auxiliary.run_workspace(output_path, library_name) as workspace, stage_limits.applied(limits):
+            sections = [] if store or export else None
+            fallbacks = []
+            stream = context_stream(library_name, input_path, workspace, static_autodoc, build_camb, only, include, exclude, max_file_size, sections, builder, offline_intersphinx, fallbacks)
+            if stream is None:
+                return None
+            pipeline, context = stream
+            if profiler:
+                # Sections are normally converted while they are written: separate the two stages
+                with profiling.stage("file_conversion"):
+                    context = list(context)
+
+            with profiling.stage("combine"):
+                if pipeline == 'sphinx':
+                    result_file = write_combined(context, os.path.join(workspace, f"{library_name}.{extension}"), library_name, sections, compress, dedup)
+                else:
+                    # Non-Sphinx output already preserves the Markdown formatting; only its extension differs
+                    result_file = nonsphinx_converter.write_fragments(context, workspace, library_name, compress, dedup)
+
+            os.replace(result_file, output_file)
+            if compress:
+                os.replace(framed_output.index_path(result_file), framed_output.index_path(output_file))
+            if fallbacks:
+                # A degraded output (e.g. after a timeout or a missing dependency) is rebuilt next time
+                logger.info(f" ♻️ Not recording {output_file} as reusable: built with fallbacks {fallbacks}")
+                freshness.remove_record(output_file)
+            else:
+                freshness.write_record(output_file, {**record, "pipeline": pipeline})
+            if store:
+                from contextmaker import section_store
+                section_store.write_sections(os.path.abspath(store), library_name, sections)
+            if export:
+                from contextmaker import section_export
+                section_export.export_sections(output_path, library_name, sections)
 
-        if not os.path.exists(input_path):
-            logger.error(f"Input path '{input_path}' does not exist.")
-            return None
+        logger.info(f" ✅ Conversion completed successfully. Output: {output_file}")
+        return output_file
 
-        if not os.listdir(input_path):
-            logger.error(f"Input path '{input_path}' is empty.")
-            return None
+    except Exception as e:
+        logger.exception(f" ❌ An unexpected error occurred: {e}")
+        raise
+    finally:
+        profiling.stop(profiler)
 
-        os.makedirs(output_path, exist_ok=True)
-
-        doc_format = auxiliary.find_format(input_path)
-        logger.info(f" 📚 Detected documentation format: {doc_format}")
-
-        if doc_format == 'sphinx':
-            from contextmaker.converters.markdown_builder import build_markdown, combine_markdown, find_notebooks_in_doc_dirs, convert_notebook, append_notebook_markdown
-            sphinx_source = auxiliary.find_sphinx_source(input_path)
-            if sphinx_source:
-                conf_path = os.path.join(sphinx_source, "conf.py")
-                index_path = os.path.join(sphinx_source, "index.rst")
-                output_file = os.path.join(output_path, f"{library_name}.md")
-                build_dir = build_markdown(sphinx_source, conf_path, input_path, robust=False)
-                import glob
-                md_files = glob.glob(os.path.join(build_dir, "*.md"))
-                if not md_files:
-                    logger.warning(" ⚠️ Sphinx build with original conf.py failed or produced no markdown. Falling back to minimal configuration...")
-                    build_dir = build_markdown(sphinx_source, conf_path, input_path, robust=True)
-                combine_markdown(build_dir, [], output_file, index_path, library_name)
-                appended_notebooks = set()
-                for nb_path in find_notebooks_in_doc_dirs(input_path):
-                    notebook_md = convert_notebook(nb_path)
-                    if notebook_md:
-                        append_notebook_markdown(output_file, notebook_md)
-                        appended_notebooks.add(os.path.abspath(nb_path))
-                success = True
-            else:
-                success = False
-                output_file = None
-        else:
-            success = nonsphinx_converter.create_final_markdown(input_path, output_path, library_name)
-            output_file = os.path.join(output_path, f"{library_name}.md")
-
-        if success:
-            logger.info(f" ✅ Conversion completed successfully. Output: {output_file}")
-            if extension == 'txt' and output_file is not None:
-                txt_file = os.path.splitext(output_file)[0] + ".txt"
-                markdown_to_text(output_file, txt_file)
-                # Delete the markdown file after successful text conversion
-                if os.path.exists(txt_file):
-                    try:
-                        os.remove(output_file)
-                        logger.info(f"Deleted markdown file after text conversion: {output_file}")
-                    except Exception as e:
-                        logger.warning(f"Could not delete markdown file: {output_file}. Error: {e}")
-                return txt_file
-            elif output_file is not None:
-                return output_file
-            else:
-                return None
+
+def context_stream(library_name, input_path, workspace, static_autodoc=False, build_camb=False, only=None, include=None, exclude=None, max_file_size=None, sections=None, builder="markdown", offline_intersphinx=False, fallbacks=None):
+    """
+    Run the conversion steps that must finish before output starts (format detection, the Sphinx
+    build and its fallbacks), then return the rest of the conversion as a lazy stream of Sections.
+    Sphinx pages are built with builder: "markdown", or "text" for plain text pages.
+    offline_intersphinx is passed to build_markdown. In watch mode, the work kept from the previous
+    rebuild (see converters/incremental.py) is reused. The fallbacks taken ("minimal_conf" when the
+    original conf.py failed, "docstrings" when Sphinx produced no pages) are appended to the
+    fallbacks list when one is given.
+
+    Returns:
+        tuple | None: ("sphinx", pages then notebooks) or (doc_format, one fragment per file), or None
+        if the input cannot be converted. Notebooks and fragments are converted as they are consumed.
+    """
+    # CAMB special case: compile the Fortran library only on request, otherwise mock it
+    sphinx_env = None
+    if library_name.lower() == "camb":
+        if auxiliary.ensure_camb_built(input_path, build=build_camb) is None:
+            sphinx_env = auxiliary.camb_mock_env(os.path.join(workspace, "camb_mock"))
+            static_autodoc = True
+        # Work on a cached, patched overlay so the checkout is left untouched
+        input_path = auxiliary.patch_camb_sys_exit(input_path)
+
+    logger.info(f"📁 Input path: {input_path}")
+
+    if not os.path.exists(input_path):
+        logger.error(f"Input path '{input_path}' does not exist.")
+        return None
+
+    if not os.listdir(input_path):
+        logger.error(f"Input path '{input_path}' is empty.")
+        return None
+
+    state = incremental.current()
+    with profiling.stage("format_detection"):
+        if state and state.file_filter:
+            file_filter = state.file_filter
         else:
+            file_filter = filters.FileFilter(input_path, include, exclude, max_file_size)
+        doc_format = auxiliary.find_format(input_path, file_filter)
+    logger.info(f" 📚 Detected documentation format: {doc_format}")
+
+    if doc_format == 'sphinx':
+        from contextmaker.converters.markdown_builder import BUILDER_SUFFIXES, NotebookConversions, build_markdown, iter_pages
+        sphinx_source = auxiliary.find_sphinx_source(input_path)
+        if not sphinx_source:
             logger.warning(" ⚠️ Conversion completed with warnings or partial results.")
             return None
+        conf_path = os.path.join(sphinx_source, "conf.py")
+        index_path = os.path.join(sphinx_source, "index.rst")
+        # Notebooks do not depend on the build: convert them while sphinx-build runs
+        notebooks = NotebookConversions(input_path, only, file_filter, state.directory if state else workspace)
+        # Pruning to a selection changes the sources every run, so it cannot build incrementally
+        incremental_dir = state.sphinx_dir if state and not only else None
+        try:
+            with profiling.stage("sphinx"):
+                build_dir = build_markdown(sphinx_source, conf_path, input_path, robust=False, static_autodoc=static_autodoc, extra_env=sphinx_env, workspace=workspace, incremental_dir=incremental_dir, only=only, file_filter=file_filter, builder=builder, offline_intersphinx=offline_intersphinx)
+                if not glob.glob(os.path.join(build_dir, "*" + BUILDER_SUFFIXES[builder])):
+                    logger.warning(" ⚠️ Sphinx build with original conf.py failed or produced no pages. Falling back to minimal configuration...")
+                    if fallbacks is not None:
+                        fallbacks.append("minimal_conf")
+                    build_dir = build_markdown(sphinx_source, conf_path, input_path, robust=True, static_autodoc=static_autodoc, extra_env=sphinx_env, workspace=workspace, only=only, file_filter=file_filter, builder=builder, offline_intersphinx=offline_intersphinx)
+        except BaseException:
+            notebooks.close()
+            raise
+        if glob.glob(os.path.join(build_dir, "*" + BUILDER_SUFFIXES[builder])):
+            return doc_format, sphinx_sections(iter_pages(build_dir, [], index_path, file_filter.max_size, builder, sphinx_source), notebooks)
+        notebooks.close()
+        logger.warning(" ⚠️ Sphinx produced no pages even with the minimal configuration. Falling back to docstring extraction...")
+        if fallbacks is not None:
+            fallbacks.append("docstrings")
+        doc_format = 'docstrings'
+    return doc_format, nonsphinx_converter.iter_file_sections(input_path, sections, only, file_filter, state.file_cache if state else None)
+
+
+def sphinx_sections(pages, notebooks):
+    """
+    Yield the pages, then the notebooks, stopping the notebook conversions if the stream is closed early.
+    """
+    try:
+        yield from pages
+        yield from notebooks
+    finally:
+        notebooks.close()
 
-    except Exception as e:
-        logger.exception(f" ❌ An unexpected error occurred: {e}")
-        raise
+
+def iter_sections(library_name, input_path=None, static_autodoc=False, build_camb=False, only=None, include=None, exclude=None, max_file_size=None, limits=None, offline_intersphinx=False):
+    """
+    Convert a library's documentation like make(), yielding its sections as they are produced
+    instead of writing a file.
+
+    Sphinx pages are yielded once the build has finished, then every notebook as soon as it is
+    converted; other libraries yield one fragment per file while the files are converted. The
+    sections come in the order of make()'s output. Intermediate files live in a temporary folder
+    removed when the generator is exhausted or closed.
+
+        for section in iter_sections("pixell", only=["pixell.enmap"]):
+            print(section.title, len(section.text))
+
+    Args:
+        library_name, input_path, static_autodoc, build_camb, only, include, exclude, max_file_size,
+        limits, offline_intersphinx: As for make().
+
+    Yields:
+        Section: Pages, notebooks or file fragments (see converters/sections.py).
+    """
+    input_path = find_input_path(library_name, input_path)
+    if not input_path:
+        return
+    with tempfile.TemporaryDirectory(prefix=f"contextmaker_{library_name}_") as workspace, stage_limits.applied(limits):
+        stream = context_stream(library_name, input_path, workspace, static_autodoc, build_camb, only, include, exclude, max_file_size, builder="markdown", offline_intersphinx=offline_intersphinx)
+        if stream is not None:
+            yield from stream[1]
 
 
 if __name__ == "__main__":
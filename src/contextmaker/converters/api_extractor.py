@@ -0,0 +1,392 @@
+"""
+Static API extraction from Python source files.
+
+The extractor walks a module's AST once with an ``ast.NodeVisitor`` and records, for every
+class, function, method and documented attribute, its qualified name, full signature
+(defaults and annotations included), decorators, docstring and nesting. Nothing is imported
+or executed, so it works for libraries whose import requires compiled extensions.
+"""
+
+import ast
+import inspect
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def module_name_from_path(file_path: str, root: str | None = None) -> str:
+    """
+    Compute the dotted module name of a Python file relative to a source root.
+
+    Args:
+        file_path (str): Path to the .py file.
+        root (str, optional): Directory the module path is relative to. Defaults to the file's folder.
+
+    Returns:
+        str: Dotted module name (e.g. "pixell.enmap"), without a trailing "__init__".
+    """
+    root = root or os.path.dirname(file_path)
+    rel_path = os.path.relpath(os.path.splitext(file_path)[0], root)
+    parts = [p for p in rel_path.split(os.sep) if p not in ("", ".")]
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    if not parts:
+        parts = [os.path.basename(os.path.normpath(root))]
+    return ".".join(parts)
+
+
+def format_arguments(args: ast.arguments, drop_first: bool = False) -> str:
+    """
+    Render an ``ast.arguments`` node as a signature string, without the surrounding parentheses.
+
+    Positional-only and keyword-only markers, defaults and annotations are preserved.
+
+    Args:
+        args (ast.arguments): Arguments node of a function definition.
+        drop_first (bool): Drop the first positional argument (``self``/``cls``), as for class signatures.
+
+    Returns:
+        str: The rendered arguments, e.g. "a, /, b: int = 1, *args, c=None, **kwargs".
+    """
+    def render(arg, default=None):
+        text = arg.arg
+        if arg.annotation is not None:
+            text += f": {ast.unparse(arg.annotation)}"
+        if default is not None:
+            text += f" = {ast.unparse(default)}" if arg.annotation is not None else f"={ast.unparse(default)}"
+        return text
+
+    positional = list(args.posonlyargs) + list(args.args)
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    rendered = [render(arg, default) for arg, default in zip(positional, defaults)]
+    posonly_count = len(args.posonlyargs)
+    if drop_first and rendered:
+        rendered = rendered[1:]
+        posonly_count = max(posonly_count - 1, 0)
+    if posonly_count:
+        rendered.insert(posonly_count, "/")
+    if args.vararg is not None:
+        rendered.append("*" + render(args.vararg))
+    elif args.kwonlyargs:
+        rendered.append("*")
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        rendered.append(render(arg, default))
+    if args.kwarg is not None:
+        rendered.append("**" + render(args.kwarg))
+    return ", ".join(rendered)
+
+
+def format_signature(node: ast.FunctionDef | ast.AsyncFunctionDef, drop_first: bool = False) -> str:
+    """
+    Render the full signature of a function definition.
+
+    Args:
+        node (ast.FunctionDef | ast.AsyncFunctionDef): Function definition node.
+        drop_first (bool): Drop the first positional argument, see format_arguments().
+
+    Returns:
+        str: Signature such as "(x, y: float = 0.0) -> bool".
+    """
+    signature = f"({format_arguments(node.args, drop_first)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    return signature
+
+
+class ApiExtractor(ast.NodeVisitor):
+    """
+    Single-pass visitor building a nested API tree for one module.
+
+    Each entry is a dict with the keys ``kind``, ``name``, ``qualname``, ``signature``,
+    ``decorators``, ``bases``, ``docstring``, ``lineno`` and ``children``; methods also get a
+    ``bound_signature`` without ``self``/``cls``, and properties the ``accessors`` (setter and
+    deleter entries) merged into them. The module entry
+    additionally carries ``imports`` (local name -> absolute dotted target) and ``all`` (the
+    literal ``__all__``, or None). Function-local definitions are not part of the API and are
+    not descended into.
+    """
+
+    def __init__(self, module_name: str, is_package: bool = False):
+        self.module = _make_entry("module", module_name, module_name)
+        self.module["imports"] = {}
+        self.module["all"] = None
+        self.package = module_name if is_package else module_name.rpartition(".")[0]
+        self.stack = [self.module]
+
+    def visit_Module(self, node):
+        self.module["docstring"] = ast.get_docstring(node)
+        self._visit_body(node.body)
+
+    def visit_ClassDef(self, node):
+        qualname = self._qualname(node.name)
+        entry = _make_entry("class", node.name, qualname, node)
+        entry["bases"] = [ast.unparse(b) for b in node.bases] + [ast.unparse(k) for k in node.keywords]
+        self.stack[-1]["children"].append(entry)
+        self.stack.append(entry)
+        self._visit_body(node.body)
+        self.stack.pop()
+        init = next((s for s in node.body if isinstance(s, ast.FunctionDef) and s.name == "__init__"), None)
+        entry["signature"] = f"({format_arguments(init.args, drop_first=True)})" if init else ""
+
+    def visit_FunctionDef(self, node):
+        parent = self.stack[-1]
+        if parent["kind"] not in ("module", "class"):
+            return
+        kind = "method" if parent["kind"] == "class" else "function"
+        entry = _make_entry(kind, node.name, self._qualname(node.name), node)
+        entry["signature"] = format_signature(node)
+        entry["is_async"] = isinstance(node, ast.AsyncFunctionDef)
+        if kind == "method":
+            if "staticmethod" not in entry["decorators"]:
+                entry["bound_signature"] = format_signature(node, drop_first=True)
+            if any(d in ("property", "cached_property", "functools.cached_property") for d in entry["decorators"]):
+                entry["kind"] = "property"
+                entry["accessors"] = []
+            elif any(d == f"{node.name}.setter" or d == f"{node.name}.deleter" for d in entry["decorators"]):
+                prop = next((c for c in reversed(parent["children"]) if c["kind"] == "property" and c["name"] == node.name), None)
+                if prop is not None:
+                    prop["accessors"].append(entry)
+                    if not prop["docstring"]:
+                        prop["docstring"] = entry["docstring"]
+                    return
+                entry["kind"] = "property"
+                entry["accessors"] = []
+        parent["children"].append(entry)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def generic_visit(self, node):
+        # Definitions guarded by `if`/`try`/`with` at module or class level are still API
+        # (imports and documented attributes included, e.g. under `if TYPE_CHECKING:` or `try: import x`)
+        self._visit_body(getattr(node, "body", None) or [])
+        for handler in getattr(node, "handlers", None) or []:
+            self._visit_body(handler.body)
+        for field in ("orelse", "finalbody"):
+            self._visit_body(getattr(node, field, None) or [])
+
+    def _visit_body(self, body):
+        for i, stmt in enumerate(body):
+            if isinstance(stmt, (ast.Assign, ast.AnnAssign)):
+                self._record_attribute(stmt, body[i + 1] if i + 1 < len(body) else None)
+            elif isinstance(stmt, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef, ast.If, ast.Try, ast.With)):
+                self.visit(stmt)
+            elif isinstance(stmt, (ast.Import, ast.ImportFrom)) and self.stack[-1] is self.module:
+                self._record_import(stmt)
+
+    def _record_import(self, stmt):
+        imports = self.module["imports"]
+        if isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                if alias.asname:
+                    imports[alias.asname] = alias.name
+                else:
+                    top = alias.name.split(".")[0]
+                    imports[top] = top
+            return
+        base = stmt.module or ""
+        if stmt.level:
+            package = self.package.split(".") if self.package else []
+            package = package[:len(package) - (stmt.level - 1)] if stmt.level > 1 else package
+            base = ".".join(package + ([stmt.module] if stmt.module else []))
+        for alias in stmt.names:
+            if alias.name != "*":
+                imports[alias.asname or alias.name] = f"{base}.{alias.name}" if base else alias.name
+
+    def _record_attribute(self, stmt, next_stmt):
+        targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+        names = [t.id for t in targets if isinstance(t, ast.Name)]
+        if len(names) != 1:
+            return
+        if names[0] == "__all__" and self.stack[-1] is self.module:
+            try:
+                self.module["all"] = [str(n) for n in ast.literal_eval(stmt.value)]
+            except (ValueError, TypeError, SyntaxError):
+                pass
+            return
+        entry = _make_entry("attribute", names[0], self._qualname(names[0]), stmt)
+        if isinstance(stmt, ast.AnnAssign):
+            entry["signature"] = f": {ast.unparse(stmt.annotation)}"
+        if stmt.value is not None:
+            value = ast.unparse(stmt.value)
+            entry["value"] = value if len(value) <= 80 else value[:77] + "..."
+        if (isinstance(next_stmt, ast.Expr) and isinstance(next_stmt.value, ast.Constant)
+                and isinstance(next_stmt.value.value, str)):
+            entry["docstring"] = inspect.cleandoc(next_stmt.value.value)
+        self.stack[-1]["children"].append(entry)
+
+    def _qualname(self, name):
+        parent = self.stack[-1]
+        return name if parent["kind"] == "module" else f"{parent['qualname']}.{name}"
+
+
+def _make_entry(kind, name, qualname, node=None):
+    return {
+        "kind": kind,
+        "name": name,
+        "qualname": qualname,
+        "signature": "",
+        "decorators": [ast.unparse(d) for d in getattr(node, "decorator_list", [])],
+        "bases": [],
+        "docstring": ast.get_docstring(node) if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) else None,
+        "lineno": getattr(node, "lineno", 0),
+        "children": [],
+    }
+
+
+def extract_api(source: str, filename: str = "<unknown>", module_name: str | None = None, is_package: bool = False) -> dict:
+    """
+    Extract the API tree of a Python module from its source.
+
+    Args:
+        source (str): Python source code.
+        filename (str): Filename used in syntax error messages.
+        module_name (str, optional): Dotted module name. Defaults to the filename stem.
+        is_package (bool): Whether the source is a package ``__init__``, for relative imports.
+
+    Returns:
+        dict: The module entry; classes, functions and attributes are nested under "children".
+
+    Raises:
+        SyntaxError: If the source cannot be parsed.
+    """
+    if module_name is None:
+        module_name = os.path.splitext(os.path.basename(filename))[0]
+    tree = ast.parse(source, filename=filename)
+    extractor = ApiExtractor(module_name, is_package)
+    extractor.visit(tree)
+    return extractor.module
+
+
+def extract_api_from_file(file_path: str, root: str | None = None) -> dict:
+    """
+    Extract the API tree of a Python file.
+
+    Args:
+        file_path (str): Path to the .py file.
+        root (str, optional): Source root used to compute the dotted module name.
+
+    Returns:
+        dict: The module entry, see extract_api().
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        source = f.read()
+    is_package = os.path.basename(file_path) == "__init__.py"
+    return extract_api(source, filename=file_path, module_name=module_name_from_path(file_path, root), is_package=is_package)
+
+
+def iter_api(entry: dict, depth: int = 0):
+    """
+    Iterate over an API tree depth-first, in source order.
+
+    Args:
+        entry (dict): Entry returned by extract_api() or one of its children.
+        depth (int): Nesting depth of ``entry``.
+
+    Yields:
+        tuple: (entry, depth) pairs, starting with ``entry`` itself.
+    """
+    yield entry, depth
+    for child in entry["children"]:
+        yield from iter_api(child, depth + 1)
+
+
+def is_public(entry: dict) -> bool:
+    """
+    Tell whether an entry should appear in generated documentation.
+
+    Public names are always documented; private and special names only when they carry a docstring.
+    ``__init__`` is documented with its class instead (see markdown_blocks).
+    """
+    if entry["kind"] == "attribute":
+        return bool(entry["docstring"])
+    if entry["name"] == "__init__":
+        return False
+    return not entry["name"].startswith("_") or bool(entry["docstring"])
+
+
+def format_declaration(entry: dict) -> str:
+    """
+    Render an entry as a Python-like declaration, decorators included.
+
+    Args:
+        entry (dict): Class, function, method, property or attribute entry.
+
+    Returns:
+        str: E.g. "@staticmethod\\ndef norm(x: float) -> float".
+    """
+    lines = [f"@{d}" for d in entry["decorators"]]
+    if entry["kind"] == "class":
+        bases = f"  # bases: {', '.join(entry['bases'])}" if entry["bases"] else ""
+        lines.append(f"class {entry['name']}{entry['signature']}{bases}")
+    elif entry["kind"] == "attribute":
+        value = f" = {entry['value']}" if entry.get("value") else ""
+        lines.append(f"{entry['name']}{entry['signature']}{value}")
+    else:
+        prefix = "async def" if entry.get("is_async") else "def"
+        lines.append(f"{prefix} {entry['name']}{entry['signature']}")
+    for accessor in entry.get("accessors", []):
+        lines.append(format_declaration(accessor))
+    return "\n".join(lines)
+
+
+_KIND_TITLES = {
+    "class": "Class",
+    "function": "Function",
+    "method": "Method",
+    "property": "Property",
+    "attribute": "Attribute",
+}
+
+
+def markdown_blocks(module: dict) -> list:
+    """
+    Render a module API tree as Markdown blocks, one per documented object, in document order.
+
+    Header depth follows the nesting: module (#), top-level objects (##), class members (###), ...
+    A class's ``__init__`` docstring follows the class docstring.
+
+    Args:
+        module (dict): Module entry returned by extract_api().
+
+    Returns:
+        list: (entry, markdown block) pairs, starting with the module when anything is documented.
+    """
+    blocks = []
+
+    def render(entry, depth):
+        if not is_public(entry):
+            return
+        level = "#" * min(depth + 1, 6)
+        title = _KIND_TITLES.get(entry["kind"], entry["kind"].capitalize())
+        block = f"{level} {title} `{module['qualname']}.{entry['qualname']}`\n\n```python\n{format_declaration(entry)}\n```\n"
+        docstrings = [entry["docstring"]]
+        if entry["kind"] == "class":
+            docstrings += [c["docstring"] for c in entry["children"] if c["name"] == "__init__" and c["kind"] == "method"]
+        docstring = "\n\n".join(d for d in docstrings if d)
+        if docstring:
+            block += f"\n{docstring}\n"
+        blocks.append((entry, block))
+        for child in entry["children"]:
+            render(child, depth + 1)
+
+    for child in module["children"]:
+        render(child, 1)
+    if module["docstring"]:
+        blocks.insert(0, (module, f"# Module `{module['qualname']}`\n\n{module['docstring']}\n"))
+    elif blocks:
+        blocks.insert(0, (module, f"# Module `{module['qualname']}`\n"))
+    return blocks
+
+
+def api_to_markdown(module: dict) -> str:
+    """
+    Render a module API tree as Markdown, one header per documented object (see markdown_blocks).
+
+    Args:
+        module (dict): Module entry returned by extract_api().
+
+    Returns:
+        str: Markdown text, or an empty string if nothing is documented.
+    """
+    return "\n".join(block for _entry, block in markdown_blocks(module))
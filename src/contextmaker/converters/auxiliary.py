@@ -1,20 +1,32 @@
 import os
 import ast
+import contextlib
+import fnmatch
 import glob
+import hashlib
+import io
+import json
 import logging
 import platform
-import subprocess
+import re
+import shutil
 import sys
+import tempfile
+import threading
+import tokenize
+
+from contextmaker.converters import filters, limits
 
 logger = logging.getLogger(__name__)
 
 
-def find_format(lib_path: str) -> str:
+def find_format(lib_path: str, file_filter: filters.FileFilter | None = None) -> str:
     """
     Detect the documentation format of a given library.
 
     Args:
         lib_path (str): Path to the root of the library.
+        file_filter (FileFilter, optional): Files to consider (default: filters.DEFAULT_EXCLUDE).
 
     Returns:
         str: One of ['sphinx', 'notebook', 'docstrings', 'source'].
@@ -25,13 +37,13 @@ def find_format(lib_path: str) -> str:
     if has_documentation(lib_path):
         logger.info(" 📚 Detected Sphinx-style documentation.")
         return 'sphinx'
-    elif has_notebook(lib_path):
+    elif has_notebook(lib_path, file_filter):
         logger.info(" 📒 Detected Jupyter notebooks.")
         return 'notebook'
     elif has_docstrings(lib_path):
         logger.info(" 📄 Detected inline docstrings.")
         return 'docstrings'
-    elif has_source(lib_path):
+    elif has_source(lib_path, file_filter):
         logger.info(" 💻 Detected raw source code.")
         return 'source'
     else:
@@ -80,12 +92,13 @@ def has_documentation(lib_path: str) -> bool:
     return find_sphinx_source(lib_path) is not None
 
 
-def has_notebook(lib_path: str) -> bool:
+def has_notebook(lib_path: str, file_filter: filters.FileFilter | None = None) -> bool:
     """
     Check if the library contains Jupyter notebooks.
 
     Args:
         lib_path (str): Path to the library.
+        file_filter (FileFilter, optional): Notebooks to consider.
 
     Returns:
         bool: True if at least one .ipynb file exists.
@@ -95,8 +108,9 @@ def has_notebook(lib_path: str) -> bool:
 
     notebook_dir = os.path.join(lib_path, 'notebooks')
     if os.path.exists(notebook_dir):
+        file_filter = filters.default_filter(lib_path, file_filter)
         notebooks = glob.glob(os.path.join(notebook_dir, '*.ipynb'))
-        return len(notebooks) > 0
+        return any(file_filter.accepts(nb) for nb in notebooks)
     return False
 
 
@@ -104,6 +118,12 @@ def has_docstrings(file_path: str) -> bool:
     """
     Check if the Python file contains docstrings.
 
+    This is a prefilter: the module start and each def/class header are tokenized just far enough
+    to see whether their first statement is a docstring, and the scan stops at the first one found.
+    Large generated modules (lookup tables, wrapped Fortran interfaces) are thus never parsed into
+    an AST; the AST is only built when the API is extracted. A def/class written inside a string
+    literal may rarely count as documented, but no real docstring is missed.
+
     Args:
         file_path (str): Path to a .py file.
 
@@ -111,44 +131,145 @@ def has_docstrings(file_path: str) -> bool:
         bool: True if at least one docstring is found.
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            source = f.read()
-        tree = ast.parse(source, filename=file_path)
+        with open(file_path, "rb") as f:
+            encoding, _ = tokenize.detect_encoding(f.readline)
+            f.seek(0)
+            source = f.read().decode(encoding)
+        if _starts_with_docstring(tokenize.generate_tokens(io.StringIO(source).readline), in_header=False):
+            return True
     except Exception as e:
         logger.warning(f"Failed to parse {file_path}: {e}")
         return False
 
-    if ast.get_docstring(tree):
-        return True
-
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-            if ast.get_docstring(node):
+    # Compound statements start a line, so every def/class header matches this. A body's first
+    # statement comes before the next header: without a quote in between, there is no docstring.
+    buffer = io.StringIO(source)
+    starts = [match.start(1) for match in _DEF_OR_CLASS.finditer(source)]
+    for start, end in zip(starts, starts[1:] + [len(source)]):
+        if '"' not in source[start:end] and "'" not in source[start:end]:
+            continue
+        buffer.seek(start)
+        tokens = tokenize.generate_tokens(buffer.readline)
+        try:
+            if _starts_with_docstring(tokens, in_header=True):
                 return True
+        except (tokenize.TokenError, SyntaxError):
+            continue  # inside a string literal
+    return False
+
+
+_DEF_OR_CLASS = re.compile(r"^[ \t]*(?:async[ \t]+)?((?:def|class)[ \t])", re.MULTILINE)
+_OPENING_BRACKETS = {"(", "[", "{"}
+_CLOSING_BRACKETS = {")", "]", "}"}
+
+
+def _starts_with_docstring(tokens, in_header: bool) -> bool:
+    """
+    Read tokens up to the first statement of a module, or of the body of the def/class header
+    they start with (in_header), and tell whether that statement is a non-empty docstring.
+    """
+    depth = 0
+    strings = None
+    for tok in tokens:
+        if tok.type in (tokenize.ENCODING, tokenize.NL, tokenize.COMMENT):
+            continue
+        if in_header:
+            if tok.type == tokenize.OP:
+                if tok.string in _OPENING_BRACKETS:
+                    depth += 1
+                elif tok.string in _CLOSING_BRACKETS:
+                    depth -= 1
+                elif tok.string == ":" and depth == 0:
+                    in_header = False
+            continue
+        if strings is None and tok.type in (tokenize.NEWLINE, tokenize.INDENT):
+            continue
+        if tok.type == tokenize.STRING:
+            prefix = tok.string[:len(tok.string) - len(tok.string.lstrip("rRuUbBfF"))]
+            if set(prefix.lower()) & {"b", "f"}:
+                return False  # bytes and f-strings are not docstrings
+            strings = strings or []
+            strings.append(ast.literal_eval(tok.string))
+            continue
+        if strings is None:
+            return False
+        # The statement is a docstring only if it is made of string literals alone
+        ends_statement = tok.type in (tokenize.NEWLINE, tokenize.ENDMARKER) or (tok.type == tokenize.OP and tok.string == ";")
+        return ends_statement and bool("".join(strings).strip())
     return False
 
 
-def has_source(lib_path: str) -> bool:
+def has_source(lib_path: str, file_filter: filters.FileFilter | None = None) -> bool:
     """
     Check if the library has source code but no other documentation.
 
     Args:
         lib_path (str): Path to the library.
+        file_filter (FileFilter, optional): Files to consider; excluded directories are not walked.
 
     Returns:
         bool: True if only source code is found.
     """
-    if not has_documentation(lib_path) and not has_notebook(lib_path):
+    if not has_documentation(lib_path) and not has_notebook(lib_path, file_filter):
         py_files = [
             os.path.join(dp, f)
-            for dp, _, filenames in os.walk(lib_path)
+            for dp, _, filenames in filters.default_filter(lib_path, file_filter).walk()
             for f in filenames if f.endswith('.py')
         ]
         return any(has_docstrings(fp) for fp in py_files) is False
     return False
 
 
+def matches_selection(names, patterns) -> bool:
+    """
+    Tell whether any of the names (docnames, module names, notebook paths) is selected by
+    make(only=...) patterns.
+
+    A pattern with glob characters is matched with fnmatch ("api/*"). Otherwise it selects the name
+    itself and, for dotted names, everything below it, wherever the package sits in the tree
+    ("pixell.enmap" selects "pixell.enmap.ndmap" and "src.pixell.enmap").
+    """
+    for pattern in patterns:
+        for name in names:
+            if any(c in pattern for c in "*?["):
+                if fnmatch.fnmatchcase(name, pattern):
+                    return True
+            elif name == pattern or f".{pattern}." in f".{name}.":
+                return True
+    return False
+
+
+# Library name -> path found by find_library_path(), kept only by long-running processes
+_LIBRARY_PATH_CACHE = None
+
+
+def enable_library_path_cache():
+    """
+    Remember find_library_path() results for the life of the process (used by the daemon, where
+    repeating the filesystem search for every request would dominate short builds).
+    """
+    global _LIBRARY_PATH_CACHE
+    if _LIBRARY_PATH_CACHE is None:
+        _LIBRARY_PATH_CACHE = {}
+
+
 def find_library_path(library_name: str) -> str | None:
+    """
+    Find the library path by searching in common locations (see _search_library_path).
+    Results are cached when enable_library_path_cache() was called and the folder still exists.
+    """
+    if _LIBRARY_PATH_CACHE is None:
+        return _search_library_path(library_name)
+    cached = _LIBRARY_PATH_CACHE.get(library_name)
+    if cached and os.path.isdir(cached):
+        return cached
+    path = _search_library_path(library_name)
+    if path:
+        _LIBRARY_PATH_CACHE[library_name] = path
+    return path
+
+
+def _search_library_path(library_name: str) -> str | None:
     """
     Find the library path by searching in common locations.
     - Prefer Sphinx documentation (doc/ or docs/ with conf.py and index.rst).
@@ -269,6 +390,51 @@ def find_library_path(library_name: str) -> str | None:
     return None
 
 
+def cache_root() -> str:
+    """
+    Path of contextmaker's persistent cache, $CONTEXTMAKER_CACHE_DIR or ~/.cache/contextmaker
+    (not created: see get_cache_dir()).
+    """
+    return os.environ.get("CONTEXTMAKER_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "contextmaker")
+
+
+def get_cache_dir(*parts: str) -> str:
+    """
+    Get (and create) a folder under contextmaker's persistent cache (see cache_root()).
+
+    Args:
+        *parts (str): Sub-folders under the cache root.
+
+    Returns:
+        str: Path to the cache folder.
+    """
+    path = os.path.join(cache_root(), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextlib.contextmanager
+def run_workspace(output_path: str, library_name: str):
+    """
+    Private working folder for one conversion run, removed when the run ends.
+
+    It is created inside output_path, so the final artifact can be moved into place with an
+    atomic os.replace(), and its name is unique, so concurrent runs never share intermediate files.
+
+    Args:
+        output_path (str): Output directory of the run.
+        library_name (str): Library being converted (used as a name prefix).
+
+    Yields:
+        str: Path to the workspace folder.
+    """
+    workspace = tempfile.mkdtemp(prefix=f".{library_name}_", dir=output_path)
+    try:
+        yield workspace
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
 def get_default_output_path() -> str:
     """
     Get the default output path in user's home directory.
@@ -281,18 +447,19 @@ def get_default_output_path() -> str:
     return default_path
 
 
-def convert_markdown_to_txt(output_folder: str, library_name: str) -> str:
+def convert_markdown_to_txt(output_folder: str, library_name: str, md_path: str | None = None) -> str:
     """
     Convert the output.md file in the output folder to a .txt file with library name.
 
     Args:
-        output_folder (str): Folder containing output.md file.
+        output_folder (str): Folder receiving the .txt file (and containing output.md by default).
         library_name (str): Name of the library for the txt filename.
+        md_path (str, optional): Markdown file to convert, if not <output_folder>/output.md.
 
     Returns:
         str: Path to the created .txt file.
     """
-    md_path = os.path.join(output_folder, "output.md")
+    md_path = md_path or os.path.join(output_folder, "output.md")
     if not os.path.isfile(md_path):
         logger.error(f"Markdown file does not exist: {md_path}")
         raise FileNotFoundError(md_path)
@@ -302,39 +469,121 @@ def convert_markdown_to_txt(output_folder: str, library_name: str) -> str:
 
     txt_filename = f"{library_name}.txt"
     txt_path = os.path.join(output_folder, txt_filename)
-
-    with open(txt_path, 'w', encoding='utf-8') as txt_file:
-        txt_file.write(content)
+    _atomic_write(txt_path, content)
 
     logger.info(f"✅ Markdown converted to text at: {txt_path}")
     return txt_path
 
 
+# (camb_dir, libname) -> (fingerprint, path or None), see find_library_file()
+_LIBRARY_FILE_CACHE = {}
+
+# Where `python setup.py make` puts the CAMB library, checked before any tree walk
+CAMB_LIBRARY_LOCATIONS = ["camb", ".", os.path.join("fortran", "Release")]
+
+CAMB_MOCK_SITECUSTOMIZE = '''# ctypes mock installed by contextmaker
+# Libraries named in CONTEXTMAKER_MOCK_LIBS that cannot be loaded are replaced by a MagicMock,
+# so modules wrapping them (e.g. camb) can be imported by Sphinx without compiling them.
+# This shim comes first on PYTHONPATH, so it runs the sitecustomize it hides (Debian, conda...) first.
+import ctypes
+import importlib.machinery
+import importlib.util
+import os
+import sys
+from unittest import mock
+
+_shim_dir = os.path.dirname(os.path.abspath(__file__))
+_next_spec = importlib.machinery.PathFinder.find_spec(
+    "sitecustomize", [p for p in sys.path if os.path.abspath(p or os.curdir) != _shim_dir]
+)
+if _next_spec is not None and _next_spec.loader is not None:
+    _next_spec.loader.exec_module(importlib.util.module_from_spec(_next_spec))
+
+_mocked_names = set(filter(None, os.environ.get("CONTEXTMAKER_MOCK_LIBS", "").split(os.pathsep)))
+_load_library = ctypes.LibraryLoader.LoadLibrary
+
+
+def _load_or_mock(self, name, *args, **kwargs):
+    try:
+        return _load_library(self, name, *args, **kwargs)
+    except OSError:
+        if os.path.basename(str(name)) in _mocked_names:
+            return mock.MagicMock(name=os.path.basename(str(name)))
+        raise
+
+
+ctypes.LibraryLoader.LoadLibrary = _load_or_mock
+'''
+
+
 def find_library_file(camb_dir, libname):
     """
-    Recursively search for the Fortran library file under camb_dir.
+    Find the compiled Fortran library under camb_dir.
+    The locations written by `python setup.py make` are checked first; only if the library is not
+    there is the tree walked (skipping VCS and cache folders). Results are cached per process and
+    invalidated when the candidate folders change, so repeated checks cost a few stat() calls.
     Returns the first match or None if not found.
     """
-    matches = glob.glob(os.path.join(camb_dir, '**', libname), recursive=True)
-    return matches[0] if matches else None
+    camb_dir = os.path.abspath(camb_dir)
+    key = (camb_dir, libname)
+    fingerprint = tuple(
+        os.stat(d).st_mtime_ns if os.path.isdir(d) else None
+        for d in [os.path.join(camb_dir, loc) for loc in CAMB_LIBRARY_LOCATIONS]
+    )
+    cached = _LIBRARY_FILE_CACHE.get(key)
+    if cached is not None:
+        cached_fingerprint, cached_path = cached
+        if cached_path is not None and os.path.isfile(cached_path):
+            return cached_path
+        if cached_path is None and cached_fingerprint == fingerprint:
+            return None
+
+    libpath = None
+    for location in CAMB_LIBRARY_LOCATIONS:
+        candidate = os.path.normpath(os.path.join(camb_dir, location, libname))
+        if os.path.isfile(candidate):
+            libpath = candidate
+            break
+    if libpath is None:
+        for root, dirs, files in os.walk(camb_dir):
+            dirs[:] = [d for d in dirs if d not in ['.git', '__pycache__', 'node_modules', '.tox', '.venv']]
+            if libname in files:
+                libpath = os.path.join(root, libname)
+                break
+    _LIBRARY_FILE_CACHE[key] = (fingerprint, libpath)
+    return libpath
+
+
+def camb_library_name() -> str:
+    """
+    Name of the CAMB Fortran library on this platform.
+    """
+    return "cambdll.dll" if platform.system() == "Windows" else "camblib.so"
 
 
-def ensure_camb_built(camb_dir: str):
+def ensure_camb_built(camb_dir: str, build: bool = True) -> str | None:
     """
     Ensure the CAMB Fortran library is built. If not, build it automatically.
     Args:
         camb_dir (str): Path to the CAMB source directory (where setup.py is).
+        build (bool): Compile the library if it is missing. When False, nothing is compiled and
+            None is returned, so the docs can be generated with a mocked library (see camb_mock_env).
+    Returns:
+        str | None: Path to the built library, or None if it is missing and build is False.
     Raises:
         RuntimeError: If the build fails or setup.py is missing.
     """
-    libname = "cambdll.dll" if platform.system() == "Windows" else "camblib.so"
+    libname = camb_library_name()
     libpath = find_library_file(camb_dir, libname)
     if not libpath:
+        if not build:
+            logger.info(f"CAMB Fortran library not built in {camb_dir}; skipping compilation, the library will be mocked.")
+            return None
         setup_py = os.path.join(camb_dir, "setup.py")
         if not os.path.isfile(setup_py):
             raise RuntimeError(f"setup.py not found in {camb_dir}")
         logger.info(f"Building CAMB Fortran library in {camb_dir}...")
-        result = subprocess.run([sys.executable, "setup.py", "make"], cwd=camb_dir)
+        result = limits.run([sys.executable, "setup.py", "make"], "build", cwd=camb_dir)
         # Search again after build
         libpath = find_library_file(camb_dir, libname)
         if result.returncode != 0 or not libpath:
@@ -343,45 +592,112 @@ def ensure_camb_built(camb_dir: str):
         logger.info(f"CAMB Fortran library built successfully at {libpath}.")
     else:
         logger.info(f"CAMB Fortran library already built at {libpath}.")
+    return libpath
+
+
+def camb_mock_env(shim_dir: str | None = None) -> dict:
+    """
+    Environment variables letting a sphinx-build subprocess import camb without its Fortran library.
+    READTHEDOCS makes camb use its own MagicMock in place of the library (the path used by CAMB's
+    hosted docs); a sitecustomize shim additionally mocks the ctypes load of the missing library,
+    after running the sitecustomize it shadows, if any.
+    Args:
+        shim_dir (str, optional): Directory to write the sitecustomize shim to. Defaults to a new temporary directory.
+    Returns:
+        dict: Variables to pass as extra_env to build_markdown(); PYTHONPATH is meant to be prepended.
+    """
+    if shim_dir is None:
+        shim_dir = tempfile.mkdtemp(prefix="camb_mock_")
+    os.makedirs(shim_dir, exist_ok=True)
+    with open(os.path.join(shim_dir, "sitecustomize.py"), "w", encoding="utf-8") as f:
+        f.write(CAMB_MOCK_SITECUSTOMIZE)
+    return {
+        "READTHEDOCS": "True",
+        "CONTEXTMAKER_MOCK_LIBS": os.pathsep.join(["camblib.so", "cambdll.dll"]),
+        "PYTHONPATH": shim_dir,
+    }
 
 # --- CAMB sys.exit patching utility ---
 
-def patch_camb_sys_exit(camb_dir: str):
+CAMB_PATCH_EXCLUDE = [
+    os.path.normpath(os.path.join("fortran", "tests", "CAMB_test_files.py")),
+]
+
+
+def _atomic_symlink(target: str, link_path: str):
+    tmp_link = f"{link_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link_path)
+
+
+def _atomic_write(path: str, content: str, errors: str = "strict"):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", errors=errors) as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def patch_camb_sys_exit(camb_dir: str, cache_dir: str | None = None) -> str:
     """
-    Recursively replace sys.exit( with raise ImportError( in all .py files under camb_dir, except excluded files.
+    Build a patched overlay of the CAMB tree in which sys.exit( is replaced with raise ImportError(.
+    The checkout itself is never modified. The overlay mirrors camb_dir with symlinks; files that
+    need patching point to patched copies stored once per content hash. A manifest of
+    (mtime, size) per file makes repeat runs stat-only, and every write is atomic, so concurrent
+    builds can share the same checkout and overlay.
     Args:
         camb_dir (str): Path to the CAMB source directory.
+        cache_dir (str, optional): Overlay location. Defaults to a per-checkout folder under get_cache_dir().
+    Returns:
+        str: Path to the overlay tree, to be used in place of camb_dir.
     """
-    import os
-    ROOTS = [
-        camb_dir,
-        os.path.join(camb_dir, "camb"),
-        os.path.join(camb_dir, "docs"),
-        os.path.join(camb_dir, "fortran", "tests"),
-    ]
-    EXCLUDE = [
-        os.path.normpath(os.path.join("fortran", "tests", "CAMB_test_files.py")),
-    ]
-    def patch_sys_exit_in_file(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
-        if "sys.exit(" in content:
-            logger.info(f"Patching sys.exit in {filepath}")
-            content = content.replace("sys.exit(", "raise ImportError(")
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(content)
-    def should_patch(filepath):
-        filepath_norm = os.path.normpath(filepath)
-        for excl in EXCLUDE:
-            if filepath_norm.endswith(excl):
-                return False
-        return True
-    for root in ROOTS:
-        if not os.path.exists(root):
-            continue
-        for dirpath, _, filenames in os.walk(root):
-            for filename in filenames:
-                if filename.endswith(".py"):
-                    fullpath = os.path.join(dirpath, filename)
-                    if should_patch(fullpath):
-                        patch_sys_exit_in_file(fullpath)
\ No newline at end of file
+    camb_dir = os.path.abspath(camb_dir)
+    if cache_dir is None:
+        cache_dir = get_cache_dir("camb_overlay", hashlib.sha1(camb_dir.encode("utf-8")).hexdigest()[:16])
+    tree_dir = os.path.join(cache_dir, "tree")
+    blob_dir = os.path.join(cache_dir, "blobs")
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    os.makedirs(blob_dir, exist_ok=True)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    new_manifest = {}
+    patched_count = 0
+    for dirpath, dirnames, filenames in os.walk(camb_dir):
+        dirnames[:] = [d for d in dirnames if d not in ['.git', '__pycache__']]
+        rel_dir = os.path.relpath(dirpath, camb_dir)
+        os.makedirs(os.path.join(tree_dir, rel_dir), exist_ok=True)
+        for filename in filenames:
+            source_path = os.path.join(dirpath, filename)
+            rel_path = os.path.normpath(os.path.join(rel_dir, filename))
+            link_path = os.path.join(tree_dir, rel_path)
+            stat = os.stat(source_path)
+            entry = manifest.get(rel_path)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size and os.path.lexists(link_path):
+                new_manifest[rel_path] = entry
+                continue
+            blob_name = None
+            if filename.endswith(".py") and not any(rel_path.endswith(excl) for excl in CAMB_PATCH_EXCLUDE):
+                with open(source_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+                    content = f.read()
+                if "sys.exit(" in content:
+                    blob_name = hashlib.sha256(content.encode("utf-8", "surrogateescape")).hexdigest() + ".py"
+                    blob_path = os.path.join(blob_dir, blob_name)
+                    if not os.path.exists(blob_path):
+                        logger.info(f"Patching sys.exit in {source_path} (overlay copy)")
+                        # Non-UTF-8 bytes were read as surrogates: write them back unchanged
+                        _atomic_write(blob_path, content.replace("sys.exit(", "raise ImportError("), errors="surrogateescape")
+                    patched_count += 1
+            _atomic_symlink(os.path.join(blob_dir, blob_name) if blob_name else source_path, link_path)
+            new_manifest[rel_path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "blob": blob_name}
+
+    for rel_path in set(manifest) - set(new_manifest):
+        stale_link = os.path.join(tree_dir, rel_path)
+        if os.path.lexists(stale_link):
+            os.remove(stale_link)
+    if new_manifest != manifest:
+        _atomic_write(manifest_path, json.dumps(new_manifest))
+    logger.info(f"CAMB overlay ready at {tree_dir} ({patched_count} file(s) newly patched).")
+    return tree_dir
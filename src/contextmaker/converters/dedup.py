@@ -0,0 +1,111 @@
+"""
+Content-hash deduplication of the combined output.
+
+Combined contexts repeat a lot of text: inherited methods carry their parents' docstrings, the same
+boilerplate paragraphs appear in many modules, vendored copies of a module are documented twice.
+While the output is written, every block of every section is hashed; a repeat of a block
+already written is replaced by a one-line reference to where it first appeared:
+
+    *[Repeated, see pixell.enmap.md › Method `pixell.enmap.ndmap.copy`]*
+
+Blocks are paragraphs (separated by blank lines) and fenced code blocks, which are kept whole so no
+fence is left unbalanced. Headings are never replaced, so every symbol keeps its entry, and blocks
+shorter than MIN_BLOCK_CHARS are left alone (a reference would not be much shorter). Only the written
+text is deduplicated; sections collected for --store and --export keep their full text.
+"""
+
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Blocks shorter than this (after stripping) are never replaced
+MIN_BLOCK_CHARS = 120
+
+_FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$")
+
+
+def split_blocks(text: str) -> list:
+    """
+    Split text into ("blank" | "heading" | "block", text) items that concatenate back to it exactly.
+    """
+    items = []
+    block = []
+    fence = None
+
+    def flush():
+        if block:
+            items.append(("block", "".join(block)))
+            block.clear()
+
+    for line in text.splitlines(keepends=True):
+        if fence:
+            block.append(line)
+            match = _FENCE.match(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) and not line.strip()[len(match.group(1)):]:
+                fence = None
+                flush()
+            continue
+        match = _FENCE.match(line)
+        if match:
+            flush()
+            fence = match.group(1)
+            block.append(line)
+        elif not line.strip():
+            flush()
+            items.append(("blank", line))
+        elif _HEADING.match(line):
+            flush()
+            items.append(("heading", line))
+        else:
+            block.append(line)
+    flush()
+    return items
+
+
+def _digest(text: str) -> str:
+    normalized = "\n".join(line.rstrip() for line in text.strip().splitlines())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class Deduplicator:
+    """
+    Replace the blocks of an output that repeat earlier ones with references, keeping the headings.
+
+    Use one instance per output file and pass it every section in output order.
+    """
+
+    def __init__(self, min_chars: int = MIN_BLOCK_CHARS):
+        self.min_chars = min_chars
+        self.seen = {}
+        self.saved = 0
+
+    def reference(self, location: str, indent: str = "") -> str:
+        return f"{indent}*[Repeated, see {location}]*\n"
+
+    def text(self, title: str, text: str) -> str:
+        """
+        Return the text of the section titled title, with repeats of earlier content replaced.
+        """
+        parts = []
+        heading = None
+        for kind, item in split_blocks(text):
+            if kind == "heading":
+                heading = _HEADING.match(item).group(1)
+            elif kind == "block" and len(item.strip()) >= self.min_chars:
+                digest = _digest(item)
+                if digest in self.seen:
+                    indent = item[:len(item) - len(item.lstrip())]
+                    replacement = self.reference(self.seen[digest], indent)
+                    self.saved += len(item) - len(replacement)
+                    item = replacement
+                else:
+                    self.seen[digest] = f"{title} › {heading}" if heading else title
+            parts.append(item)
+        return "".join(parts)
+
+    def report(self, output: str):
+        if self.saved:
+            logger.info(f" ♻️ Deduplication removed {self.saved} characters of repeated content from {output}")
@@ -0,0 +1,227 @@
+"""
+Include/exclude filter shared by every step that walks a library: format detection, the copies
+made for sphinx-build, the non-Sphinx conversion walk, notebook discovery and the combine step.
+
+Patterns follow .gitignore rules, relative to the library root:
+
+- ``tests/`` matches a directory (and everything below it) at any depth;
+- ``*.pyx`` or ``conftest.py`` (no slash) match a name at any depth;
+- ``docs/source/api/*`` or ``/setup.py`` (with a slash) are anchored at the root;
+- ``**`` matches any number of directories, ``*``, ``?`` and ``[...]`` stay within one;
+- ``!pattern`` re-includes what an earlier pattern excluded (the last matching pattern wins).
+
+Patterns are compiled once to regular expressions. Excluded directories are pruned during the
+walk, so nothing below them is listed, read or copied. A ``.contextmakerignore`` file at the
+library root adds exclude patterns, and a size cap skips oversized (usually generated) files.
+"""
+
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Folders that never contain documentation (formerly hard-coded in the non-Sphinx walk)
+DEFAULT_EXCLUDE = [".git/", "__pycache__/", "build/", "dist/", ".pytest_cache/", "node_modules/", ".ipynb_checkpoints/", ".tox/", ".eggs/"]
+IGNORE_FILE = ".contextmakerignore"
+
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_size(size) -> int | None:
+    """
+    Parse a size such as 500000, "500k", "2M" or "1G" (powers of 1024) into bytes.
+    """
+    if size is None or isinstance(size, int):
+        return size
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kKmMgG]?)[bB]?\s*", str(size))
+    if not match:
+        raise ValueError(f"Invalid size: {size!r} (expected e.g. 500k, 2M, 1G)")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def translate(pattern: str) -> str:
+    """
+    Translate one gitignore-style pattern (without "!" or trailing "/") into a regular expression
+    body matching a path relative to the root, "/"-separated.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1:end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            parts.append("[" + chars.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ("" if anchored else "(?:.*/)?") + "".join(parts)
+
+
+def _compile(patterns):
+    """Compile patterns into (negate, file regex, directory regex) rules."""
+    rules = []
+    for pattern in patterns:
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith("#"):
+            continue
+        negate = pattern.startswith("!")
+        pattern = pattern[1:] if negate else pattern
+        dir_only = pattern.endswith("/")
+        body = translate(pattern.rstrip("/"))
+        # A matched directory also matches everything below it
+        file_regex = re.compile(f"^{body}/.*$" if dir_only else f"^{body}(?:/.*)?$")
+        dir_regex = re.compile(f"^{body}(?:/.*)?$")
+        rules.append((negate, file_regex, dir_regex))
+    return rules
+
+
+def _match(rules, rel_path, is_dir):
+    matched = False
+    for negate, file_regex, dir_regex in rules:
+        if (dir_regex if is_dir else file_regex).match(rel_path):
+            matched = not negate
+    return matched
+
+
+class FileFilter:
+    """
+    Compiled include/exclude filter for the files of a library.
+
+    Args:
+        root (str): Library root that patterns and relative paths refer to.
+        include (list, optional): If given, only files matching one of these patterns are kept.
+        exclude (list, optional): Patterns of files and directories to skip, after DEFAULT_EXCLUDE
+            and the library's .contextmakerignore.
+        max_size (int | str, optional): Skip files larger than this ("2M", 500000...).
+        defaults (bool): Apply DEFAULT_EXCLUDE and .contextmakerignore.
+    """
+
+    def __init__(self, root: str, include=None, exclude=None, max_size=None, defaults: bool = True):
+        self.root = os.path.abspath(root)
+        self.include = list(include or [])
+        self.user_exclude = read_ignore_file(self.root) + list(exclude or []) if defaults else list(exclude or [])
+        self.exclude = list(DEFAULT_EXCLUDE) + self.user_exclude if defaults else self.user_exclude
+        self.max_size = parse_size(max_size)
+        self._include_rules = _compile(self.include)
+        self._exclude_rules = _compile(self.exclude)
+
+    def without_defaults(self) -> "FileFilter":
+        """
+        The same filter without DEFAULT_EXCLUDE: only the patterns given by the user (and the
+        library's .contextmakerignore). Used to copy importable code, where folders such as build/
+        or dist/ may be real subpackages (pip._internal.operations.build).
+        """
+        return FileFilter(self.root, self.include, self.user_exclude, self.max_size, defaults=False)
+
+    def relative(self, path: str) -> str:
+        """Path relative to the root, "/"-separated (relative paths are returned as they are)."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        return path.replace(os.sep, "/")
+
+    def excludes_dir(self, path: str) -> bool:
+        """Tell whether a directory is excluded, so that the walk does not descend into it."""
+        rel_path = self.relative(path)
+        return rel_path != "." and _match(self._exclude_rules, rel_path, is_dir=True)
+
+    def excludes_file(self, path: str) -> bool:
+        """Tell whether a file matches the exclude patterns (include patterns and the size cap aside)."""
+        return _match(self._exclude_rules, self.relative(path), is_dir=False)
+
+    def accepts(self, path: str, size: int | None = None) -> bool:
+        """
+        Tell whether a file passes the filter.
+
+        Args:
+            path (str): Absolute path, or path relative to the root.
+            size (int, optional): File size, looked up only when needed for the size cap.
+        """
+        rel_path = self.relative(path)
+        if _match(self._exclude_rules, rel_path, is_dir=False):
+            return False
+        if self._include_rules and not _match(self._include_rules, rel_path, is_dir=False):
+            return False
+        if self.max_size is not None:
+            if size is None:
+                try:
+                    size = os.path.getsize(path if os.path.isabs(path) else os.path.join(self.root, path))
+                except OSError:
+                    return True
+            if size > self.max_size:
+                logger.info(f" ✂️ Skipping {rel_path}: {size} bytes exceeds the {self.max_size}-byte cap")
+                return False
+        return True
+
+    def walk(self, top: str | None = None):
+        """
+        os.walk() over top (default: the root), sorted, pruning excluded directories in place and
+        listing only accepted files.
+
+        Yields:
+            tuple: (dirpath, dirnames, filenames) like os.walk.
+        """
+        for dirpath, dirnames, filenames in os.walk(top or self.root):
+            dirnames[:] = sorted(d for d in dirnames if not self.excludes_dir(os.path.join(dirpath, d)))
+            yield dirpath, dirnames, sorted(f for f in filenames if self.accepts(os.path.join(dirpath, f)))
+
+    def copytree_ignore(self, apply_size: bool = True):
+        """
+        Return an ``ignore`` callable for shutil.copytree skipping excluded files and directories.
+
+        Include patterns select the files to document, not the files a build needs (conf.py,
+        templates, imported modules), so they do not apply to copies.
+
+        Args:
+            apply_size (bool): Also skip files over the size cap. Disable it when copying code that
+                must stay importable (e.g. the source root used by autodoc).
+        """
+        def ignore(dirpath, names):
+            ignored = set()
+            for name in names:
+                path = os.path.join(dirpath, name)
+                if os.path.isdir(path):
+                    excluded = self.excludes_dir(path)
+                else:
+                    excluded = self.excludes_file(path)
+                    if not excluded and apply_size and self.max_size is not None:
+                        excluded = os.path.getsize(path) > self.max_size
+                if excluded:
+                    ignored.add(name)
+            return ignored
+        return ignore
+
+
+def read_ignore_file(root: str) -> list:
+    """
+    Read the exclude patterns of a library's .contextmakerignore (same syntax as .gitignore).
+    """
+    path = os.path.join(root, IGNORE_FILE)
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def default_filter(root: str, file_filter: FileFilter | None = None) -> FileFilter:
+    """
+    Return file_filter, or the default filter of root when none is given.
+    """
+    return file_filter if file_filter is not None else FileFilter(root)
@@ -0,0 +1,224 @@
+"""
+Section-aligned writers for the combined output, plain or compressed as seekable frames.
+
+With compression, every section (title block, Sphinx page, notebook, source fragment) is written
+as its own compressed frame: a gzip member or a zstd frame. Concatenated frames are still a
+regular .gz/.zst file that standard tools decompress as a whole, and a JSON index next to it
+(`<file>.idx.json`) records where each frame starts, so one section can be read by seeking to its
+offset and decompressing only that frame (see read_section).
+
+Writers receive the text section by section, so only the section being written is held in memory.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Compression method -> file suffix
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def resolve_compression(compress: str | None) -> str | None:
+    """
+    Return the compression method to use, falling back to gzip when zstandard is not installed.
+    """
+    if compress == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            logger.warning("zstandard is not installed (pip install zstandard), compressing with gzip instead.")
+            return "gzip"
+    if compress not in (None, *COMPRESSION_SUFFIXES):
+        raise ValueError(f"Unknown compression method: {compress!r} (expected one of {', '.join(COMPRESSION_SUFFIXES)})")
+    return compress
+
+
+def output_path(path: str, compress: str | None) -> str:
+    """
+    Path the writer for ``path`` produces: ``path`` itself, or with the compression suffix appended.
+    """
+    return path + COMPRESSION_SUFFIXES[compress] if compress else path
+
+
+def index_path(path: str) -> str:
+    """
+    Path of the frame index of a compressed output file.
+    """
+    return path + ".idx.json"
+
+
+def _compress(data: bytes, compress: str) -> bytes:
+    if compress == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=19, write_content_size=True).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _decompress(data: bytes, compress: str) -> bytes:
+    if compress == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class PlainWriter:
+    """
+    Write text to a file, moved into place once complete. Frame boundaries are ignored.
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self.append = append
+        self.target = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" if not append else path
+        self.file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.target, "a" if self.append else "w", encoding="utf-8")
+        return self
+
+    def frame(self, title: str):
+        """Start a new section (no-op for plain output)."""
+
+    def write(self, text: str):
+        self.file.write(text)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if self.append:
+            return
+        if exc_type is None:
+            os.replace(self.target, self.path)
+        elif os.path.exists(self.target):
+            os.remove(self.target)
+
+
+class FramedWriter:
+    """
+    Write text as independently decompressible frames, one per section, plus a frame index.
+
+    Call frame(title) at every section boundary, then write() the section's text.
+    """
+
+    def __init__(self, path: str, compress: str = "gzip", append: bool = False):
+        self.compress = compress
+        self.path = output_path(path, compress)
+        self.append = append and os.path.exists(self.path)
+        self.target = self.path if self.append else f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.frames = read_index(self.path)["frames"] if self.append else []
+        self.offset = os.path.getsize(self.path) if self.append else 0
+        self.raw_offset = sum(f["raw_length"] for f in self.frames)
+        self.title = None
+        self.buffer = []
+        self.file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.target, "ab" if self.append else "wb")
+        return self
+
+    def frame(self, title: str):
+        """Close the current frame and start a new one for the section ``title``."""
+        self._flush()
+        self.title = title
+
+    def write(self, text: str):
+        self.buffer.append(text)
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        data = "".join(self.buffer).encode("utf-8")
+        self.buffer = []
+        blob = _compress(data, self.compress)
+        self.file.write(blob)
+        self.frames.append({
+            "title": self.title,
+            "offset": self.offset,
+            "length": len(blob),
+            "raw_offset": self.raw_offset,
+            "raw_length": len(data),
+        })
+        self.offset += len(blob)
+        self.raw_offset += len(data)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._flush()
+        self.file.close()
+        if exc_type is not None:
+            if not self.append and os.path.exists(self.target):
+                os.remove(self.target)
+            return
+        index = {"format": self.compress, "frames": self.frames}
+        partial_index = f"{index_path(self.path)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial_index, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        if not self.append:
+            os.replace(self.target, self.path)
+        os.replace(partial_index, index_path(self.path))
+
+
+def open_writer(path: str, compress: str | None = None, append: bool = False):
+    """
+    Open a section writer for ``path``: a FramedWriter if compress is set, a PlainWriter otherwise.
+
+    Args:
+        path (str): Output path (without compression suffix, see output_path()).
+        compress (str, optional): "gzip", "zstd" or None.
+        append (bool): Add sections to an existing output instead of replacing it.
+    """
+    if compress:
+        return FramedWriter(path, compress, append)
+    return PlainWriter(path, append)
+
+
+def read_index(path: str) -> dict:
+    """
+    Load the frame index of a compressed output file.
+
+    Returns:
+        dict: {"format": "gzip" | "zstd", "frames": [{"title", "offset", "length", "raw_offset", "raw_length"}, ...]}
+    """
+    with open(index_path(path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_frame(path: str, frame: dict, compress: str = "gzip") -> str:
+    """
+    Decompress a single frame of a compressed output file.
+    """
+    with open(path, "rb") as f:
+        f.seek(frame["offset"])
+        return _decompress(f.read(frame["length"]), compress).decode("utf-8")
+
+
+def read_section(path: str, title: str) -> str | None:
+    """
+    Read one section of a compressed output file, decompressing only its frame.
+
+    Args:
+        path (str): Compressed output file (with its .idx.json index next to it).
+        title (str): Section title (page, notebook or fragment name).
+
+    Returns:
+        str | None: The section text, or None if no frame has this title.
+    """
+    index = read_index(path)
+    for frame in index["frames"]:
+        if frame["title"] == title:
+            return read_frame(path, frame, index["format"])
+    return None
+
+
+def iter_sections(path: str):
+    """
+    Iterate over the (title, text) sections of a compressed output file, one frame at a time.
+    """
+    index = read_index(path)
+    for frame in index["frames"]:
+        yield frame["title"], read_frame(path, frame, index["format"])
@@ -0,0 +1,60 @@
+"""
+State kept between the rebuilds of watch mode, so a rebuild only redoes the work its changes affect.
+
+The watcher runs the normal make() pipeline for every rebuild, with an IncrementalState applied
+(``applied(state)``); the converters pick it up from there:
+    - Sphinx builds reuse their patched sources and build environment (sphinx-build re-reads the
+      edited documents only), unless make(only=...) prunes the project per run;
+    - notebooks are reconverted only when they are newer than their previous conversion;
+    - non-Sphinx fragments are regenerated only for files whose mtime or size changed.
+Without an applied state (every make() outside watch mode), nothing is kept between runs.
+"""
+
+import contextlib
+import contextvars
+import os
+from dataclasses import dataclass, field
+
+from contextmaker.converters.filters import FileFilter
+
+_current_state = contextvars.ContextVar("contextmaker_incremental", default=None)
+
+
+@dataclass
+class IncrementalState:
+    """
+    Work kept between rebuilds.
+
+    Attributes:
+        directory (str): Folder outliving the rebuilds (Sphinx environment, converted notebooks).
+        file_filter (FileFilter, optional): Filter of the watched library, used by every rebuild
+            instead of compiling a new one (the watcher's monitor uses it too).
+        file_cache (dict): File path -> ((mtime_ns, size), markdown, kind, fine-grained sections) of
+            the non-Sphinx fragments (see nonsphinx_converter.iter_file_sections).
+    """
+    directory: str
+    file_filter: FileFilter | None = None
+    file_cache: dict = field(default_factory=dict)
+
+    @property
+    def sphinx_dir(self) -> str:
+        return os.path.join(self.directory, "sphinx")
+
+
+def current() -> IncrementalState | None:
+    """
+    Return the state applied by applied(), or None outside watch mode.
+    """
+    return _current_state.get()
+
+
+@contextlib.contextmanager
+def applied(state: IncrementalState | None):
+    """
+    Use state for every conversion in this thread (or task) until the block exits.
+    """
+    token = _current_state.set(state)
+    try:
+        yield
+    finally:
+        _current_state.reset(token)
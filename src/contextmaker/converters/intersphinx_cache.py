@@ -0,0 +1,178 @@
+"""
+Local cache of intersphinx inventories (objects.inv), so Sphinx builds never wait on the network.
+
+Inventories are fetched once, e.g. on a machine with network access, and stored in the contextmaker
+cache (see auxiliary.get_cache_dir; copy that folder to offline build nodes):
+
+    contextmaker intersphinx fetch                        (the Python inventory)
+    contextmaker intersphinx fetch https://numpy.org/doc/stable/
+    contextmaker intersphinx list
+
+Builds then read them from there:
+    - the minimal conf.py maps Python to its cached inventory, or has no mapping at all;
+    - the patched copies of a project's conf.py try the cached copy of every inventory first, then
+      the original location;
+    - with make(offline_intersphinx=True) (--offline-intersphinx), a project's mappings are rewritten
+      to the cached copies only, and mappings without one are dropped.
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import re
+import threading
+import urllib.request
+
+from contextmaker.converters import auxiliary
+
+logger = logging.getLogger(__name__)
+
+# Mapping of the minimal conf.py
+DEFAULT_MAPPING = {"python": ("https://docs.python.org/3/", None)}
+
+FETCH_TIMEOUT = 30
+
+# First line of the block appended to patched conf.py files
+CONF_MARKER = "# Intersphinx inventories from the contextmaker cache"
+
+
+def cache_dir() -> str:
+    return auxiliary.get_cache_dir("intersphinx")
+
+
+def inventory_url(target_uri: str, inventory: str | None = None) -> str:
+    """
+    URL of an inventory as intersphinx resolves it: inventory, or objects.inv under target_uri.
+    """
+    return inventory or target_uri.rstrip("/") + "/objects.inv"
+
+
+def cached_path(url: str) -> str:
+    """
+    Path of the cached copy of an inventory URL (which may not exist).
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", url.split("://", 1)[-1]).strip("_")[:60]
+    return os.path.join(cache_dir(), f"{slug}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.inv")
+
+
+def cached_inventory(url: str) -> str | None:
+    """
+    Return the cached copy of an inventory URL, or None if it has not been fetched.
+    """
+    path = cached_path(url)
+    return path if os.path.isfile(path) else None
+
+
+def fetch(target_uri: str, inventory: str | None = None, timeout: float = FETCH_TIMEOUT) -> str:
+    """
+    Download an inventory into the cache, replacing the previous copy atomically.
+
+    Returns:
+        str: Path of the cached inventory.
+    """
+    url = inventory_url(target_uri, inventory)
+    path = cached_path(url)
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        data = response.read()
+    if not data.startswith(b"# Sphinx inventory version"):
+        raise ValueError(f"{url} is not a Sphinx inventory")
+    partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(partial_path, "wb") as f:
+        f.write(data)
+    os.replace(partial_path, path)
+    logger.info(f" 📚 Cached intersphinx inventory {url} at {path}")
+    return path
+
+
+def _entries(mapping):
+    """Normalize an intersphinx_mapping to (name, target_uri, [inventory locations]) entries."""
+    for key, value in (mapping or {}).items():
+        if isinstance(value, (tuple, list)) and len(value) == 2 and isinstance(value[0], str):
+            name, (target_uri, inventories) = key, value
+        else:  # old format: {target_uri: inventory}
+            name, target_uri, inventories = key, key, value
+        if not isinstance(inventories, (tuple, list)):
+            inventories = [inventories]
+        yield name, target_uri, list(inventories)
+
+
+def cached_mapping(mapping: dict, offline: bool = False) -> dict:
+    """
+    Point an intersphinx_mapping at the cached inventories.
+
+    Args:
+        mapping (dict): intersphinx_mapping of a conf.py ({name: (target_uri, inventory)}, where
+            inventory is None, a location or a tuple of locations; the old {target_uri: inventory}
+            form is accepted too).
+        offline (bool): Keep only local inventories (cached copies and local files), dropping the
+            mappings that have none; otherwise the original locations follow the cached copies.
+
+    Returns:
+        dict: New intersphinx_mapping.
+    """
+    result = {}
+    for name, target_uri, inventories in _entries(mapping):
+        locations = []
+        for inventory in inventories:
+            remote = inventory is None or "://" in inventory
+            cached = cached_inventory(inventory_url(target_uri, inventory)) if remote else None
+            if cached:
+                locations.append(cached)
+            if not remote or not offline:
+                locations.append(inventory)
+        # Tuples are tried in order until one location can be read
+        locations = list(dict.fromkeys(locations))
+        if locations:
+            result[name] = (target_uri, tuple(locations))
+        else:
+            logger.info(f" 📚 No cached intersphinx inventory for {name} ({target_uri}), mapping dropped")
+    return result
+
+
+def patch_conf_py(conf_path: str, offline: bool = False) -> str:
+    """
+    Make a conf.py read its intersphinx inventories from the cache (see cached_mapping), by appending
+    a block that rewrites intersphinx_mapping once the original configuration has run. Only call this
+    on a patched copy of the Sphinx source; calling it again leaves the file unchanged.
+
+    Returns:
+        str: conf_path
+    """
+    with open(conf_path, "r", encoding="utf-8") as f:
+        if CONF_MARKER in f.read():
+            return conf_path
+    with open(conf_path, "a", encoding="utf-8") as f:
+        f.write(
+            f"\n\n{CONF_MARKER}\n"
+            "from contextmaker.converters import intersphinx_cache as _contextmaker_intersphinx\n"
+            "intersphinx_mapping = _contextmaker_intersphinx.cached_mapping(\n"
+            f"    globals().get('intersphinx_mapping', {{}}), offline={offline!r}\n"
+            ")\n"
+        )
+    return conf_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="contextmaker intersphinx", description="Fetch and list the cached intersphinx inventories used by offline builds.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fetch_parser = commands.add_parser("fetch", help="Download inventories into the cache")
+    fetch_parser.add_argument("urls", nargs="*", help="Documentation root URLs or objects.inv URLs (default: the Python documentation)")
+    fetch_parser.add_argument("--timeout", type=float, default=FETCH_TIMEOUT, help=f"Seconds per download (default: {FETCH_TIMEOUT})")
+    commands.add_parser("list", help="List the cached inventories")
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        for filename in sorted(os.listdir(cache_dir())):
+            if filename.endswith(".inv"):
+                print(os.path.join(cache_dir(), filename))
+        return
+    failed = False
+    for url in args.urls or [uri for uri, _ in DEFAULT_MAPPING.values()]:
+        inventory = url if url.endswith(".inv") else None
+        try:
+            print(fetch(url, inventory, args.timeout))
+        except (OSError, ValueError) as e:
+            logger.error(f" ❌ Could not fetch the inventory of {url}: {e}")
+            failed = True
+    if failed:
+        raise SystemExit(1)
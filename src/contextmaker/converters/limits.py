@@ -0,0 +1,206 @@
+"""
+Time and resource limits for the external tools contextmaker runs (sphinx-build, jupytext, CAMB's
+setup.py make).
+
+Each tool runs in its own process group. Memory (address space) and CPU time are capped by a small
+Python launcher that calls ``resource.setrlimit`` and then execs the tool (``preexec_fn`` is not
+used: it is unsafe in a process running threads, like the daemon or the notebook pool), and the
+wall-clock timeout is enforced by killing the whole group, so grandchildren (autodoc imports, compilers) go with it. A breach is
+reported like any failure of the tool, so the callers' fallbacks apply: the minimal conf.py after
+the original one, then docstring extraction when Sphinx produces nothing.
+
+Limits are set per stage ("sphinx", "notebook", "build") or for all stages ("*"):
+
+    make("pixell", limits={"*": {"timeout": 600}, "sphinx": {"memory": "4G", "cpu": 900}})
+
+make() applies them to everything it runs with ``applied(limits)``; run() picks them up from there.
+"""
+
+import contextlib
+import contextvars
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+from contextmaker.converters import filters
+
+try:
+    import resource
+except ImportError:  # Windows: timeouts only
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("sphinx", "notebook", "build")
+
+# Applied unless overridden: no tool may hang a batch worker forever
+DEFAULT_LIMITS = {
+    "sphinx": {"timeout": 1800},
+    "notebook": {"timeout": 300},
+    "build": {"timeout": 3600},
+}
+
+# Seconds between SIGTERM and SIGKILL when a process group is stopped
+KILL_GRACE = 5
+
+_current_limits = contextvars.ContextVar("contextmaker_limits", default=None)
+
+
+@dataclass
+class StageLimits:
+    """
+    Limits of one stage.
+
+    Attributes:
+        timeout (float, optional): Wall-clock seconds before the process group is killed.
+        memory (int, optional): Address space cap of the child, in bytes.
+        cpu (int, optional): CPU time cap of the child, in seconds.
+    """
+    timeout: float | None = None
+    memory: int | None = None
+    cpu: int | None = None
+
+
+def resolve(stage: str, limits: dict | None = None) -> StageLimits:
+    """
+    Merge DEFAULT_LIMITS, then the "*" entry, then the stage's entry of limits (default: the limits
+    applied by applied()).
+    """
+    if limits is None:
+        limits = _current_limits.get() or {}
+    merged = {}
+    for source in (DEFAULT_LIMITS.get(stage, {}), limits.get("*", {}), limits.get(stage, {})):
+        merged.update(source)
+    return StageLimits(
+        timeout=float(merged["timeout"]) if merged.get("timeout") else None,
+        memory=filters.parse_size(merged.get("memory")) or None,
+        cpu=int(merged["cpu"]) if merged.get("cpu") else None,
+    )
+
+
+@contextlib.contextmanager
+def applied(limits: dict | None):
+    """
+    Use limits for every run() in this thread (or task) until the block exits.
+    """
+    token = _current_limits.set(limits)
+    try:
+        yield
+    finally:
+        _current_limits.reset(token)
+
+
+def parse_option(values, key: str, convert=float) -> dict:
+    """
+    Turn repeated CLI values "[STAGE=]VALUE" into a limits dict ({"*": {key: value}, STAGE: {...}}).
+    """
+    limits = {}
+    for value in values or []:
+        stage, sep, amount = value.rpartition("=")
+        stage = stage if sep else "*"
+        if stage not in STAGES + ("*",):
+            raise ValueError(f"Unknown stage {stage!r} (expected one of {', '.join(STAGES)})")
+        limits.setdefault(stage, {})[key] = convert(amount)
+    return limits
+
+
+def merge(*limit_dicts) -> dict:
+    """
+    Merge limits dicts stage by stage, later ones winning.
+    """
+    merged = {}
+    for limits in limit_dicts:
+        for stage, values in (limits or {}).items():
+            merged.setdefault(stage, {}).update(values)
+    return merged
+
+
+# Run as `python -I -c _LAUNCHER MEMORY CPU GRACE CMD...`: sets the limits (0: none), then replaces
+# itself with CMD. An unstartable CMD exits with 127, like a shell.
+_LAUNCHER = """
+import os, resource, sys
+memory, cpu, grace = (int(v) for v in sys.argv[1:4])
+if memory:
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+if cpu:
+    # SIGXCPU at the soft limit, SIGKILL at the hard one
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + grace))
+try:
+    os.execvp(sys.argv[4], sys.argv[4:])
+except OSError as e:
+    sys.stderr.write(f"contextmaker: cannot run {sys.argv[4]}: {e}\\n")
+    os._exit(127)
+"""
+
+
+def _limited(cmd, stage_limits):
+    """Wrap cmd in the launcher applying the stage's memory and CPU limits."""
+    return [sys.executable, "-I", "-c", _LAUNCHER, str(stage_limits.memory or 0), str(stage_limits.cpu or 0), str(KILL_GRACE), *map(str, cmd)]
+
+
+def _kill_group(pid):
+    """Terminate a process group, then kill what is left of it after KILL_GRACE seconds."""
+    for sig, wait in ((signal.SIGTERM, KILL_GRACE), (signal.SIGKILL, 0)):
+        try:
+            os.killpg(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            try:
+                os.killpg(pid, 0)
+            except (ProcessLookupError, PermissionError):
+                return
+            time.sleep(0.1)
+
+
+def run(cmd, stage: str, limits: dict | None = None, capture_output: bool = False, text: bool = False, **kwargs) -> subprocess.CompletedProcess:
+    """
+    subprocess.run() with the stage's limits.
+
+    The command runs in a new process group, killed as a whole on timeout and once the command
+    exits (reaping leftover grandchildren). A timeout gives returncode -SIGKILL with a note on
+    stderr; a CPU or memory breach shows as the tool's own failure (signal or MemoryError).
+
+    Args:
+        cmd (list): Command to run.
+        stage (str): "sphinx", "notebook" or "build" (see resolve()).
+        limits (dict, optional): Limits to use instead of the applied ones.
+        capture_output, text, **kwargs: As for subprocess.run.
+
+    Returns:
+        subprocess.CompletedProcess: Never raises TimeoutExpired.
+    """
+    stage_limits = resolve(stage, limits)
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    posix = os.name == "posix"
+    command = cmd
+    if posix and resource is not None and (stage_limits.memory or stage_limits.cpu):
+        command = _limited(cmd, stage_limits)
+    process = subprocess.Popen(command, text=text, start_new_session=posix, **kwargs)
+    try:
+        stdout, stderr = process.communicate(timeout=stage_limits.timeout)
+    except subprocess.TimeoutExpired:
+        logger.error(f" ⏱️ {stage} stage exceeded its {stage_limits.timeout:g}s timeout, killing: {' '.join(map(str, cmd))}")
+        if posix:
+            _kill_group(process.pid)
+        else:
+            process.kill()
+        stdout, stderr = process.communicate()
+        note = f"\ncontextmaker: killed after the {stage_limits.timeout:g}s {stage} timeout\n"
+        stderr = (stderr or ("" if text else b"")) + (note if text else note.encode())
+        return subprocess.CompletedProcess(cmd, -signal.SIGKILL if posix else 1, stdout, stderr)
+    finally:
+        if posix:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+    if posix and process.returncode in (-signal.SIGXCPU, -signal.SIGKILL) and stage_limits.cpu:
+        logger.error(f" ⏱️ {stage} stage exceeded its {stage_limits.cpu}s CPU limit: {' '.join(map(str, cmd))}")
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
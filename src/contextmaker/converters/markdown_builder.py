@@ -5,15 +5,31 @@ for use as context with Large Language Models (LLMs).
 """
 
 import argparse
+import contextvars
 import glob
+import hashlib
+import json
 import logging
 import os
 import shutil
-import subprocess
 import tempfile
 import html2text
 import re
-import pkgutil
+from concurrent.futures import ThreadPoolExecutor
+
+from contextmaker.converters import auxiliary, filters, framed_output, intersphinx_cache, limits, mock_imports, toctree
+from contextmaker.converters.dedup import Deduplicator
+from contextmaker.converters.sections import file_section, page_section
+
+STATIC_AUTODOC_EXTENSION = "contextmaker.converters.static_autodoc"
+
+# Sphinx builders producing one page per document, with the suffix of their pages. "text" is
+# built into Sphinx and writes plain text directly, without the Markdown to text conversion.
+BUILDER_SUFFIXES = {"markdown": ".md", "text": ".txt"}
+
+# Folders searched (recursively) for notebooks, and how many are converted at once
+NOTEBOOK_DIRS = ("docs", "doc")
+NOTEBOOK_WORKERS = min(4, os.cpu_count() or 1)
 
 # Logging configuration
 logging.basicConfig(
@@ -62,24 +78,23 @@ def create_safe_conf_py(original_conf_path):
         return original_conf_path
 
 
-def create_minimal_conf_py(sphinx_source, source_root):
+def create_minimal_conf_py(sphinx_source, source_root, static_autodoc=False):
     """
     Create a minimal working conf.py when the original one is problematic.
     Args:
         sphinx_source (str): Path to the Sphinx source directory
         source_root (str): Path to the source code root
+        static_autodoc (bool): Resolve autodoc directives from the source AST instead of importing the library
     Returns:
         str: Path to the minimal conf.py file
     """
-    # Detect all top-level modules in source_root
-    autodoc_mock_imports = set()
-    for importer, modname, ispkg in pkgutil.iter_modules([source_root]):
-        autodoc_mock_imports.add(modname)
-    # Also add submodules (one level deep)
-    for importer, modname, ispkg in pkgutil.walk_packages([source_root]):
-        autodoc_mock_imports.add(modname.split('.')[0])
+    # Mock the dependencies autodoc could not import (not needed when nothing gets imported)
+    autodoc_mock_imports = [] if static_autodoc else mock_imports.missing_modules(source_root)
+    # Cached inventories only: a fallback build must not wait on the network
+    intersphinx_mapping = intersphinx_cache.cached_mapping(intersphinx_cache.DEFAULT_MAPPING, offline=True)
     temp_dir = tempfile.mkdtemp(prefix="minimal_conf_")
     minimal_conf_path = os.path.join(temp_dir, "conf.py")
+    autodoc_extension = STATIC_AUTODOC_EXTENSION if static_autodoc else 'sphinx.ext.autodoc'
     minimal_conf_content = f'''# Minimal Sphinx configuration created by contextmaker
 import os
 import sys
@@ -90,18 +105,19 @@ author = 'ContextMaker'
 release = '1.0.0'
 version = '0.1.1'
 extensions = [
-    'sphinx.ext.autodoc',
+    '{autodoc_extension}',
     'sphinx.ext.napoleon',
     'sphinx.ext.viewcode',
     'sphinx.ext.intersphinx',
+    '{toctree.EXTENSION}',
 ]
 templates_path = ['_templates']
 exclude_patterns = ['_build', 'Thumbs.db', '.DS_Store']
 html_theme = 'alabaster'
-autodoc_mock_imports = {sorted(list(autodoc_mock_imports))}
-intersphinx_mapping = {{
-    'python': ('https://docs.python.org/3/', None),
-}}
+autodoc_mock_imports = {autodoc_mock_imports!r}
+intersphinx_mapping = {intersphinx_mapping!r}
+viewcode_import = False
+static_autodoc_paths = [r'{source_root}']
 '''
     with open(minimal_conf_path, 'w', encoding='utf-8') as f:
         f.write(minimal_conf_content)
@@ -110,9 +126,44 @@ intersphinx_mapping = {{
     return minimal_conf_path
 
 
+def create_static_autodoc_conf_py(conf_path, source_root):
+    """
+    Wrap a conf.py so that autodoc directives are resolved statically, without importing the library.
+    The original conf.py is kept next to the wrapper (as _contextmaker_original_conf.py) and executed
+    from it, so relative paths in it keep working; only 'sphinx.ext.autodoc' is swapped for the
+    static_autodoc extension. Only call this on a patched copy of the Sphinx source.
+    Args:
+        conf_path (str): Path to the conf.py to wrap (replaced in place)
+        source_root (str): Path to the source code root, searched for module sources
+    Returns:
+        str: Path to the wrapper conf.py (same as conf_path)
+    """
+    original_conf_path = os.path.join(os.path.dirname(conf_path), "_contextmaker_original_conf.py")
+    with open(conf_path, 'r', encoding='utf-8') as f:
+        if f.readline().startswith("# Static autodoc wrapper created by contextmaker"):
+            return conf_path  # already wrapped by a previous incremental build
+    os.replace(conf_path, original_conf_path)
+    wrapper_content = f'''# Static autodoc wrapper created by contextmaker
+with open(r'{original_conf_path}', encoding='utf-8') as _original_conf:
+    exec(compile(_original_conf.read(), r'{original_conf_path}', 'exec'))
+extensions = [
+    '{STATIC_AUTODOC_EXTENSION}' if ext == 'sphinx.ext.autodoc' else ext
+    for ext in globals().get('extensions', [])
+]
+if '{STATIC_AUTODOC_EXTENSION}' not in extensions:
+    extensions.insert(0, '{STATIC_AUTODOC_EXTENSION}')
+viewcode_import = False
+static_autodoc_paths = [r'{source_root}'] + list(globals().get('static_autodoc_paths', []))
+'''
+    with open(conf_path, 'w', encoding='utf-8') as f:
+        f.write(wrapper_content)
+    logger.info(f" 📄 Static autodoc enabled, conf.py wrapped at: {conf_path}")
+    return conf_path
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Builds Sphinx documentation in Markdown for LLM.")
-    parser.add_argument("--exclude", type=str, default="", help="List of files to exclude, separated by commas (without .md extension)")
+    parser.add_argument("--exclude", type=str, default="", help="Pages to exclude, separated by commas: names without .md extension or gitignore-style patterns (api/*)")
     parser.add_argument("--output", type=str, required=True, help="Path to the output file")
     parser.add_argument("--sphinx-source", type=str, required=True, help="Path to the Sphinx source folder (where conf.py and index.rst are located)")
     parser.add_argument("--conf", type=str, default=None, help="Path to conf.py (default: <sphinx-source>/conf.py)")
@@ -121,9 +172,29 @@ def parse_args():
     parser.add_argument("--source-root", type=str, required=True, help="Absolute path to the source code root to add to sys.path for Sphinx autodoc.")
     parser.add_argument("--library-name", type=str, default=None, help="Library name for the documentation title.")
     parser.add_argument("--html-to-text", action="store_true", help="Builds the Sphinx doc in HTML then converts to text instead of Markdown.")
+    parser.add_argument("--builder", choices=sorted(BUILDER_SUFFIXES), default="markdown", help="Sphinx builder of the pages: markdown (default) or text (plain text, with Sphinx's built-in builder).")
+    parser.add_argument("--static-autodoc", action="store_true", help="Resolve autodoc directives from the source AST instead of importing the library.")
+    parser.add_argument("--offline-intersphinx", action="store_true", help="Use only cached intersphinx inventories (see intersphinx_cache.py), never the network.")
     return parser.parse_args()
 
 
+def patch_sys_exit_in_file(file_path):
+    """
+    Comment out sys.exit() calls in a single .py file, in place.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if 'sys.exit(' in content:
+            patched = re.sub(r'sys\.exit\([^)]*\)', '# sys.exit() - patched by contextmaker', content)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(patched)
+            logger.info(f" 📄 Patched sys.exit() in {file_path}")
+            logger.info(f"Patched sys.exit() in {file_path}")
+    except Exception as e:
+        logger.warning(f"Could not patch {file_path}: {e}")
+
+
 def patch_sys_exit_in_py_files(root_dir):
     """
     Walk through all .py files under root_dir and comment out sys.exit() calls.
@@ -131,55 +202,187 @@ def patch_sys_exit_in_py_files(root_dir):
     for dirpath, _, filenames in os.walk(root_dir):
         for filename in filenames:
             if filename.endswith('.py'):
-                file_path = os.path.join(dirpath, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    if 'sys.exit(' in content:
-                        patched = re.sub(r'sys\.exit\([^)]*\)', '# sys.exit() - patched by contextmaker', content)
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(patched)
-                        logger.info(f" 📄 Patched sys.exit() in {file_path}")
-                        logger.info(f"Patched sys.exit() in {file_path}")
-                except Exception as e:
-                    logger.warning(f"Could not patch {file_path}: {e}")
+                patch_sys_exit_in_file(os.path.join(dirpath, filename))
 
 
-def copy_and_patch_source(original_path):
+def copy_and_patch_source(original_path, workspace=None, file_filter=None, apply_size=True):
     """
     Copy the original_path folder to a temporary folder and patch all .py files to neutralize sys.exit().
+    The temporary folder is created under workspace when given (see auxiliary.run_workspace).
+    With file_filter (see filters.py), excluded files and directories are not copied, nor files over
+    its size cap unless apply_size is False.
     Returns the path to the temporary folder.
     """
-    temp_dir = tempfile.mkdtemp(prefix="patched_src_")
+    temp_dir = tempfile.mkdtemp(prefix="patched_src_", dir=workspace)
     dest_path = os.path.join(temp_dir, os.path.basename(original_path))
     if os.path.isdir(original_path):
-        shutil.copytree(original_path, dest_path, dirs_exist_ok=True)
+        ignore = file_filter.copytree_ignore(apply_size) if file_filter else None
+        shutil.copytree(original_path, dest_path, dirs_exist_ok=True, ignore=ignore)
     else:
         shutil.copy2(original_path, dest_path)
     patch_sys_exit_in_py_files(dest_path)
     return dest_path
 
 
-def build_markdown(sphinx_source, conf_path, source_root, robust=False):
-    # Copy and patch source_root and sphinx_source folders
-    patched_source_root = copy_and_patch_source(source_root)
-    patched_sphinx_source = copy_and_patch_source(sphinx_source)
+def sync_and_patch_source(original_path, dest_path, file_filter=None, apply_size=True):
+    """
+    Keep a patched copy of original_path at a fixed location, copying only what changed.
+    Files are compared with the (mtime, size) recorded at the previous sync, since the copies
+    themselves differ from the originals once patched; files deleted upstream (or newly excluded)
+    are removed. Copies keep the original modification times, so sphinx-build only re-reads edited
+    documents.
+    Args:
+        original_path (str): Folder to mirror
+        dest_path (str): Folder holding the patched copy (created if needed)
+        file_filter (FileFilter, optional): Files and directories left out, as in copy_and_patch_source
+        apply_size (bool): Also leave out files over the filter's size cap
+    Returns:
+        list: Paths (in the copy) that were added, updated or removed
+    """
+    manifest_path = dest_path.rstrip(os.sep) + ".manifest.json"
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    current = {}
+    changed = []
+    ignore = file_filter.copytree_ignore(apply_size) if file_filter else None
+    for dirpath, dirnames, filenames in os.walk(original_path):
+        ignored = ignore(dirpath, dirnames + filenames) if ignore else set()
+        dirnames[:] = [d for d in dirnames if d not in ('.git', '__pycache__') and d not in ignored]
+        for filename in filenames:
+            if filename in ignored:
+                continue
+            source = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(source, original_path)
+            try:
+                stat = os.stat(source)
+            except OSError:
+                continue
+            current[rel_path] = [stat.st_mtime_ns, stat.st_size]
+            target = os.path.join(dest_path, rel_path)
+            if manifest.get(rel_path) == current[rel_path] and os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+            if filename.endswith('.py'):
+                patch_sys_exit_in_file(target)
+                shutil.copystat(source, target)
+            changed.append(target)
+    for rel_path in set(manifest) - set(current):
+        target = os.path.join(dest_path, rel_path)
+        if os.path.exists(target):
+            os.remove(target)
+            changed.append(target)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(current, f)
+    return changed
+
+
+def prune_to_selection(sphinx_source, only):
+    """
+    Keep only the documents selected by make(only=...) patterns, with their toctree closure, in a
+    patched copy of the Sphinx source, so that sphinx-build neither reads nor writes the others.
+    Files the kept documents read with include or literalinclude are kept too.
+    Args:
+        sphinx_source (str): Patched copy of the Sphinx source directory (modified in place)
+        only (list): Selection patterns (see toctree.select_documents)
+    Returns:
+        list: Paths of the selected source files, to pass to sphinx-build
+    """
+    keep = set(toctree.select_documents(sphinx_source, only))
+    doc_files = []
+    pruned = []
+    for docname in toctree.find_documents(sphinx_source):
+        for suffix in toctree.SOURCE_SUFFIXES:
+            path = os.path.join(sphinx_source, *docname.split("/")) + suffix
+            if not os.path.isfile(path):
+                continue
+            (doc_files if docname in keep else pruned).append(path)
+    included = toctree.included_files(sphinx_source, doc_files)
+    for path in pruned:
+        if os.path.abspath(path) not in included:
+            os.remove(path)
+    logger.info(f" 📄 Building {len(keep)} selected document(s) for {only}")
+    return doc_files
+
+
+def sphinx_build_env(source_root, extra_env=None):
+    """
+    Build the environment of a sphinx-build subprocess.
+    Args:
+        source_root (str): Path put first on PYTHONPATH so autodoc finds the library
+        extra_env (dict, optional): Extra variables (e.g. a library mock); its PYTHONPATH is prepended, not replaced
+    Returns:
+        dict: Environment for subprocess.run
+    """
+    extra_env = dict(extra_env or {})
+    python_path = [source_root, extra_env.pop("PYTHONPATH", ""), os.environ.get("PYTHONPATH", "")]
+    return {**os.environ, **extra_env, "PYTHONPATH": os.pathsep.join(p for p in python_path if p)}
+
+
+def builder_for(extension):
+    """
+    Sphinx builder producing pages for an output extension: "text" for "txt", "markdown" otherwise.
+    """
+    return "text" if extension == "txt" else "markdown"
+
+
+def build_markdown(sphinx_source, conf_path, source_root, robust=False, static_autodoc=False, extra_env=None, workspace=None, incremental_dir=None, only=None, file_filter=None, builder="markdown", offline_intersphinx=False):
+    """
+    Build the Sphinx documentation as Markdown (or plain text) from patched copies of the sources.
+    Args:
+        sphinx_source (str): Path to the Sphinx source directory
+        conf_path (str): Path to the original conf.py
+        source_root (str): Path to the source code root
+        robust (bool): Use the minimal conf.py instead of the original one
+        static_autodoc (bool): Resolve autodoc directives from the source AST instead of importing the library
+        extra_env (dict, optional): Extra environment for sphinx-build, see sphinx_build_env()
+        workspace (str, optional): Folder receiving all temporary folders of this build (private per run)
+        incremental_dir (str, optional): Folder keeping the patched sources and the build directory
+            between calls, so that sphinx-build only re-reads what changed (used by watch mode)
+        only (list, optional): Build only the documents selected by these patterns and their toctree
+            closure (see toctree.select_documents); ignored with incremental_dir
+        file_filter (FileFilter, optional): Files and directories left out of the copies given to
+            sphinx-build (see filters.py); the size cap only applies to the documentation sources
+        builder (str): "markdown", or "text" for .txt pages (see BUILDER_SUFFIXES and builder_for())
+        offline_intersphinx (bool): Rewrite the intersphinx mappings of the original conf.py to the cached
+            inventories only (see intersphinx_cache.py); by default cached copies are tried first
+    Returns:
+        str: Path to the build directory containing the .md (or .txt) files
+    """
+    # The library's default excludes (build/, dist/...) may be subpackages autodoc must import
+    source_filter = file_filter.without_defaults() if file_filter else None
+    if incremental_dir:
+        # Stable paths let sphinx-build reuse its pickled environment from the previous call
+        patched_source_root = os.path.join(incremental_dir, "src", os.path.basename(source_root))
+        patched_sphinx_source = os.path.join(incremental_dir, "docs", os.path.basename(sphinx_source))
+        sync_and_patch_source(source_root, patched_source_root, source_filter, apply_size=False)
+        sync_and_patch_source(sphinx_source, patched_sphinx_source, file_filter)
+        build_dir = os.path.join(incremental_dir, "build")
+    else:
+        # Copy and patch source_root and sphinx_source folders
+        patched_source_root = copy_and_patch_source(source_root, workspace, source_filter, apply_size=False)
+        patched_sphinx_source = copy_and_patch_source(sphinx_source, workspace, file_filter)
+        build_dir = tempfile.mkdtemp(prefix="sphinx_build_", dir=workspace)
     # Use the conf.py from the patched folder
     patched_conf_path = os.path.join(patched_sphinx_source, os.path.basename(conf_path))
-    build_dir = tempfile.mkdtemp(prefix="sphinx_build_")
+    doc_files = prune_to_selection(patched_sphinx_source, only) if only and not incremental_dir else []
     logger.info(f"Build directory: {build_dir}")
     os.makedirs(build_dir, exist_ok=True)
     if robust:
         # Always use minimal conf.py
-        minimal_conf_path = create_minimal_conf_py(patched_sphinx_source, patched_source_root)
+        minimal_conf_path = create_minimal_conf_py(patched_sphinx_source, patched_source_root, static_autodoc)
         conf_dir = os.path.dirname(minimal_conf_path)
         logger.info(f" 📄 Forcing minimal conf.py for robust mode: {minimal_conf_path}")
         logger.info(f"Using minimal conf.py for robust mode: {minimal_conf_path}")
-        result = subprocess.run(
-            ["sphinx-build", "-b", "markdown", "-c", conf_dir, patched_sphinx_source, build_dir],
+        result = limits.run(
+            ["sphinx-build", "-b", builder, "-c", conf_dir, patched_sphinx_source, build_dir] + doc_files,
+            "sphinx",
             capture_output=True,
             text=True,
-            env={**os.environ, "PYTHONPATH": patched_source_root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+            env=sphinx_build_env(patched_source_root, extra_env)
         )
         if result.returncode != 0:
             logger.error(" 📄 sphinx-build failed even with minimal configuration in robust mode.")
@@ -189,34 +392,40 @@ def build_markdown(sphinx_source, conf_path, source_root, robust=False):
     else:
         # Create a safe version of conf.py if needed
         safe_conf_path = create_safe_conf_py(patched_conf_path)
+        if static_autodoc:
+            safe_conf_path = create_static_autodoc_conf_py(safe_conf_path, patched_source_root)
+        intersphinx_cache.patch_conf_py(safe_conf_path, offline_intersphinx)
+        toctree.patch_conf_py(safe_conf_path)
         conf_dir = os.path.dirname(safe_conf_path)
         logger.info(f"sphinx_source : {patched_sphinx_source}")
         logger.info(f"conf_path : {safe_conf_path}")
         logger.info(f"build_dir : {build_dir}")
-        logger.info(f"Commande sphinx-build : sphinx-build -b markdown -c {conf_dir} {patched_sphinx_source} {build_dir}")
+        logger.info(f"Commande sphinx-build : sphinx-build -b {builder} -c {conf_dir} {patched_sphinx_source} {build_dir}")
         logger.info("Lancement de sphinx-build...")
         logger.info(f"sphinx_source: {patched_sphinx_source}")
         logger.info(f"conf_path: {safe_conf_path}")
         logger.info(f"build_dir: {build_dir}")
-        logger.info("Running sphinx-build for markdown output.")
-        result = subprocess.run(
-            ["sphinx-build", "-b", "markdown", "-c", conf_dir, patched_sphinx_source, build_dir],
+        logger.info(f"Running sphinx-build for {builder} output.")
+        result = limits.run(
+            ["sphinx-build", "-b", builder, "-c", conf_dir, patched_sphinx_source, build_dir] + doc_files,
+            "sphinx",
             capture_output=True,
             text=True,
-            env={**os.environ, "PYTHONPATH": patched_source_root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+            env=sphinx_build_env(patched_source_root, extra_env)
         )
         if result.returncode != 0:
             logger.error(f"sphinx-build failed with return code {result.returncode}")
             logger.error(" 📄 stdout:\n%s", result.stdout)
             logger.error(" 📄 stderr:\n%s", result.stderr)
             # Try with minimal conf.py
-            minimal_conf_path = create_minimal_conf_py(patched_sphinx_source, patched_source_root)
+            minimal_conf_path = create_minimal_conf_py(patched_sphinx_source, patched_source_root, static_autodoc)
             conf_dir = os.path.dirname(minimal_conf_path)
-            result = subprocess.run(
-                ["sphinx-build", "-b", "markdown", "-c", conf_dir, patched_sphinx_source, build_dir],
+            result = limits.run(
+                ["sphinx-build", "-b", builder, "-c", conf_dir, patched_sphinx_source, build_dir] + doc_files,
+                "sphinx",
                 capture_output=True,
                 text=True,
-                env={**os.environ, "PYTHONPATH": patched_source_root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+                env=sphinx_build_env(patched_source_root, extra_env)
             )
             if result.returncode == 0:
                 logger.info("sphinx-build succeeded with minimal config.")
@@ -235,7 +444,7 @@ def build_markdown(sphinx_source, conf_path, source_root, robust=False):
                 except Exception as e:
                     logger.warning(f" 📄 Failed to clean up minimal conf.py: {e}")
     # Nettoyage des dossiers temporaires
-    for temp in [patched_source_root, patched_sphinx_source]:
+    for temp in [] if incremental_dir else [patched_source_root, patched_sphinx_source]:
         try:
             shutil.rmtree(temp)
         except Exception:
@@ -245,129 +454,220 @@ def build_markdown(sphinx_source, conf_path, source_root, robust=False):
 
 def extract_toctree_order_recursive(rst_path, seen=None):
     """
-    Recursively extract the order of documents from .. toctree:: directives in rst files.
+    Extract the order of documents from the toctrees reachable from an rst file.
+    Kept for compatibility; see toctree.toctree_order().
     Args:
-        rst_path (str): Path to the rst file to parse.
-        seen (set): Set of already seen rst file basenames (without extension) to avoid cycles.
+        rst_path (str): Path to the root rst file.
+        seen (set): Docnames to leave out (e.g. already placed).
     Returns:
-        list: Ordered list of rst file basenames (without extension).
+        list: Ordered docnames (relative to the rst file's folder, without extension), root excluded.
     """
-    if seen is None:
-        seen = set()
-    try:
-        with open(rst_path, encoding="utf-8") as f:
-            lines = f.readlines()
-    except Exception as e:
-        logger.error(f" 📄  Could not read {rst_path}: {e}")
-        return []
-
-    toctree_docs = []
-    in_toctree = False
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith(".. toctree::"):
-            in_toctree = True
-            continue
-        if in_toctree:
-            if stripped == "" or stripped.startswith(":"):
-                continue
-            if stripped.startswith(".. "):  # another directive
-                break
-            doc = stripped
-            if doc not in seen:
-                seen.add(doc)
-                toctree_docs.append(doc)
-    # Recursively process referenced rst files
-    result = []
-    rst_dir = os.path.dirname(rst_path)
-    for doc in toctree_docs:
-        result.append(doc)
-        doc_path = os.path.join(rst_dir, doc + ".rst")
-        if os.path.exists(doc_path):
-            subdocs = extract_toctree_order_recursive(doc_path, seen)
-            for subdoc in subdocs:
-                if subdoc not in result:
-                    result.append(subdoc)
-    return result
-
-
-def combine_markdown(build_dir, exclude, output, index_path, library_name):
-    md_files = glob.glob(os.path.join(build_dir, "*.md"))
-    logger.info(f"Markdown files found: {[os.path.basename(f) for f in md_files]}")
-    exclude_set = set(f"{e.strip()}.md" for e in exclude if e.strip())
-
-    filtered = [f for f in md_files if os.path.basename(f) not in exclude_set]
-
-    index_md = None
-    others = []
-    for f in filtered:
-        if os.path.basename(f).lower() == "index.md":
-            index_md = f
-        else:
-            others.append(f)
-
-    # Use recursive toctree extraction
-    toctree_order = extract_toctree_order_recursive(index_path) if index_path else []
-    logger.info(f"Toctree order: {toctree_order}")
-    name_to_file = {os.path.splitext(os.path.basename(f))[0]: f for f in others}
-    ordered = []
-    for doc in toctree_order:
-        if doc in name_to_file:
-            ordered.append(name_to_file.pop(doc))
-        else:
-            logger.warning(f"Referenced in toctree but .md not found: {doc}.md")
+    root_doc = os.path.splitext(os.path.basename(rst_path))[0]
+    order = toctree.toctree_order(os.path.dirname(rst_path), root_doc)
+    seen = seen if seen is not None else set()
+    return [doc for doc in order if doc != root_doc and doc not in seen]
+
+
+def combine_markdown(build_dir, exclude, output, index_path, library_name, sections=None, compress=None, max_size=None, builder="markdown", source_dir=None):
+    """
+    Combine the pages of a Sphinx markdown (or text) build into one file, index first, then in toctree order.
+    Pages matching an exclude entry are left out: a page name ("changelog") or a gitignore-style
+    pattern on docnames ("api/*", see filters.py). Pages larger than max_size bytes are left out too.
+    When a sections list is given, it receives one Section per page (see sections.py).
+    With compress ("gzip" or "zstd"), every page is written as its own frame (see framed_output.py).
+    source_dir is passed to iter_pages.
+    Returns the path of the written file.
+    """
+    return write_combined(iter_pages(build_dir, exclude, index_path, max_size, builder, source_dir), output, library_name, sections, compress)
 
+
+def iter_pages(build_dir, exclude, index_path, max_size=None, builder="markdown", source_dir=None):
+    """
+    Yield the pages of a Sphinx markdown (or text) build as Sections, index first, then in toctree
+    order (see combine_markdown for exclude and max_size). Each page is read when it is yielded.
+    The source of each page is its document in source_dir, the Sphinx source folder (default: the
+    folder of index_path), see sections.page_section.
+    """
+    # Pages of nested folders are built into matching subfolders (api/enmap.md for api/enmap.rst)
+    md_files = glob.glob(os.path.join(build_dir, "**", "*" + BUILDER_SUFFIXES[builder]), recursive=True)
+    logger.info(f"Markdown files found: {len(md_files)}")
+    name_to_file = {os.path.splitext(os.path.relpath(f, build_dir))[0].replace(os.sep, "/"): f for f in md_files}
+    page_filter = filters.FileFilter(build_dir, exclude=exclude, max_size=max_size, defaults=False)
+    name_to_file = {doc: f for doc, f in name_to_file.items() if page_filter.accepts(doc, os.path.getsize(f))}
+
+    # Order along the toctree graph (Sphinx's own environment when it can be loaded)
+    if index_path:
+        root_doc = os.path.splitext(os.path.basename(index_path))[0]
+        toctree_order = toctree.toctree_order(os.path.dirname(index_path), root_doc, build_dir)
+    else:
+        toctree_order = ["index"]
+    final_order = [name_to_file.pop(doc) for doc in toctree_order if doc in name_to_file]
     remaining = sorted(name_to_file.values())
     if remaining:
-        logger.info(f".md files not referenced in toctree: {[os.path.basename(f) for f in remaining]}")
-    ordered.extend(remaining)
+        logger.info(f".md files not referenced in toctree: {[os.path.relpath(f, build_dir) for f in remaining]}")
+    final_order.extend(remaining)
 
-    final_order = ([index_md] if index_md else []) + ordered
+    if source_dir is None and index_path:
+        source_dir = os.path.dirname(index_path)
+    for f in final_order:
+        docname = os.path.splitext(os.path.relpath(f, build_dir))[0].replace(os.sep, "/")
+        with open(f, encoding="utf-8") as infile:
+            yield page_section(infile.read(), docname, source_dir)
 
-    os.makedirs(os.path.dirname(output), exist_ok=True)
-    with open(output, "w", encoding="utf-8") as out:
+
+def iter_notebooks(library_root, only=None, file_filter=None, output_dir=None):
+    """
+    Convert the notebooks of the documentation folders (see find_notebooks_in_doc_dirs) concurrently
+    once iteration starts, yielding each as a Section in alphabetical order (see NotebookConversions).
+    """
+    yield from NotebookConversions(library_root, only, file_filter, output_dir)
+
+
+def write_combined(pages, output, library_name, sections=None, compress=None, dedup=False):
+    """
+    Write the sections of a Sphinx context as they arrive: pages (see iter_pages), then notebooks
+    (see iter_notebooks), in the layout of combine_markdown and append_notebook_markdown.
+    When a sections list is given, it receives every section written, with its full text.
+    With dedup, repeated pages and blocks are replaced by references (see dedup.py).
+    Returns the path of the written file.
+    """
+    deduplicator = Deduplicator() if dedup else None
+    with framed_output.open_writer(output, compress) as out:
+        out.frame(library_name)
         out.write(f"# - {library_name} | Complete Documentation -\n\n")
-        for i, f in enumerate(final_order):
-            if i > 0:
-                out.write("\n\n---\n\n")
-            section = os.path.splitext(os.path.basename(f))[0]
-            out.write(f"## {section}\n\n")
-            with open(f, encoding="utf-8") as infile:
-                out.write(infile.read())
+        for i, section in enumerate(pages):
+            text = deduplicator.text(section.title, section.text) if deduplicator else section.text
+            out.frame(section.title)
+            if section.kind == "notebook":
+                out.write("\n\n# Notebook\n\n---\n\n")
+                out.write(text)
+            else:
+                if i > 0:
+                    out.write("\n\n---\n\n")
+                out.write(f"## {section.title}\n\n")
+                out.write(text)
                 out.write("\n\n")
+            if sections is not None:
+                sections.append(section)
 
+    output = framed_output.output_path(output, compress)
     logger.info(f"Combined markdown written to {output}")
+    if deduplicator:
+        deduplicator.report(output)
+    return output
 
 
-def find_notebooks_in_doc_dirs(library_root):
+def find_notebooks_in_doc_dirs(library_root, only=None, file_filter=None):
     """
-    Find all .ipynb files in 'docs/', 'doc/', and 'docs/source/' directories inside the given library root, sorted alphabetically.
+    Find all .ipynb files under the 'docs/' and 'doc/' directories of the given library root, recursively
+    (so 'docs/source/' and nested notebook folders are included), sorted alphabetically.
+    Build outputs and checkpoints are skipped, and a notebook reached twice (e.g. through a symlinked
+    folder) is listed once.
+    With only, keep the notebooks whose name or path (relative to the library root) matches a pattern.
+    With file_filter (see filters.py), drop the notebooks it rejects.
     Returns a list of absolute paths.
     """
-    candidates = []
-    for doc_dir in ["docs", "doc", "docs/source"]:
-        abs_doc_dir = os.path.join(library_root, doc_dir)
-        if os.path.isdir(abs_doc_dir):
-            found = glob.glob(os.path.join(abs_doc_dir, "*.ipynb"))
-            logger.info(f"Notebooks in {abs_doc_dir}: {found}")
-            candidates.extend(found)
-    abs_candidates = sorted([os.path.abspath(nb) for nb in candidates])
+    walker = file_filter or filters.FileFilter(library_root)
+    candidates = {}
+    for doc_dir in NOTEBOOK_DIRS:
+        abs_doc_dir = os.path.join(os.path.abspath(library_root), doc_dir)
+        if not os.path.isdir(abs_doc_dir):
+            continue
+        for dirpath, dirnames, filenames in walker.walk(abs_doc_dir):
+            dirnames[:] = [d for d in dirnames if d not in toctree.IGNORED_DIRS]
+            for filename in filenames:
+                if filename.endswith(".ipynb"):
+                    nb_path = os.path.join(dirpath, filename)
+                    candidates.setdefault(os.path.normcase(os.path.realpath(nb_path)), nb_path)
+    abs_candidates = sorted(candidates.values())
+    if only:
+        abs_candidates = [nb for nb in abs_candidates if auxiliary.matches_selection(notebook_names(nb, library_root), only)]
     if abs_candidates:
         logger.info(f"Notebooks found: {abs_candidates}")
     else:
-        logger.info(f"No notebooks found in docs/, doc/, or docs/source/ under {library_root}.")
+        logger.info(f"No notebooks found in docs/ or doc/ under {library_root}.")
     return abs_candidates
 
 
-def convert_notebook(nb_path):
+class NotebookConversions:
+    """
+    Notebooks of the documentation folders (see find_notebooks_in_doc_dirs), converted with jupytext
+    on a thread pool from the moment the object is created, e.g. while sphinx-build runs.
+
+    Iterating yields one Section per converted notebook, in the alphabetical order of
+    find_notebooks_in_doc_dirs, each as soon as it and the ones before it are ready. The pool is
+    shut down when the iteration ends or close() is called. Stage limits applied by the caller
+    (see limits.applied) also apply to the conversions. A notebook whose conversion in output_dir
+    is newer than it (watch mode keeps output_dir between rebuilds) is not converted again.
+    """
+
+    def __init__(self, library_root, only=None, file_filter=None, output_dir=None, max_workers=NOTEBOOK_WORKERS):
+        self.notebooks = find_notebooks_in_doc_dirs(library_root, only, file_filter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="contextmaker-notebook") if self.notebooks else None
+        self.futures = []
+        for nb_path in self.notebooks:
+            nb_output_dir = output_dir
+            if output_dir is not None:
+                # One folder per notebook: nested notebooks may share a name
+                nb_output_dir = os.path.join(output_dir, "notebooks", hashlib.sha1(nb_path.encode("utf-8")).hexdigest()[:12])
+                os.makedirs(nb_output_dir, exist_ok=True)
+            # run() reads the stage limits from a context variable, which worker threads do not inherit
+            self.futures.append(self.executor.submit(contextvars.copy_context().run, _convert_if_stale, nb_path, nb_output_dir))
+
+    def __iter__(self):
+        try:
+            for nb_path, future in zip(self.notebooks, self.futures):
+                notebook_md = future.result()
+                if notebook_md:
+                    with open(notebook_md, "r", encoding="utf-8") as f:
+                        yield file_section(notebook_md, f.read(), "notebook", nb_path)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Cancel the conversions not started yet and wait for the running ones.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _convert_if_stale(nb_path, output_dir):
+    if output_dir is not None:
+        md_path = os.path.join(output_dir, os.path.splitext(os.path.basename(nb_path))[0] + ".md")
+        try:
+            if os.stat(md_path).st_mtime_ns > os.stat(nb_path).st_mtime_ns:
+                return md_path
+        except FileNotFoundError:
+            pass
+    return convert_notebook(nb_path, output_dir)
+
+
+def notebook_names(nb_path, library_root):
+    """
+    Names a notebook can be selected by: its stem and its path relative to the library root, without extension.
+    """
+    rel_path = os.path.splitext(os.path.relpath(nb_path, library_root))[0].replace(os.sep, "/")
+    return [os.path.splitext(os.path.basename(nb_path))[0], rel_path]
+
+
+def convert_notebook(nb_path, output_dir=None):
+    """
+    Convert a notebook to Markdown with jupytext.
+    The .md file is written to output_dir (a new temporary folder by default), never next to the
+    notebook, so the library tree is left untouched and concurrent runs do not collide.
+    Returns the path to the .md file, or None if the conversion failed.
+    """
     logger.info(f"Converting notebook: {nb_path}")
     if not shutil.which("jupytext"):
         logger.error(" 📄 jupytext is required to convert notebooks.")
         return None
-    md_path = os.path.splitext(nb_path)[0] + ".md"
-    cmd = ["jupytext", "--to", "md", "--opt", "notebook_metadata_filter=-all", nb_path]
+    if output_dir is None:
+        output_dir = tempfile.mkdtemp(prefix="notebook_md_")
+    md_path = os.path.join(output_dir, os.path.splitext(os.path.basename(nb_path))[0] + ".md")
+    cmd = ["jupytext", "--to", "md", "--opt", "notebook_metadata_filter=-all", nb_path, "-o", md_path]
     logger.info("Running jupytext conversion...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = limits.run(cmd, "notebook", capture_output=True, text=True)
     if result.returncode != 0:
         logger.error(f" 📄 Failed to convert notebook:\n{result.stderr}")
         return None
@@ -378,15 +678,16 @@ def convert_notebook(nb_path):
     return md_path
 
 
-def append_notebook_markdown(output_file, notebook_md):
+def append_notebook_markdown(output_file, notebook_md, compress=None):
     logger.info(f"Appending notebook {notebook_md} to {output_file}")
-    with open(output_file, "a", encoding="utf-8") as out, open(notebook_md, encoding="utf-8") as nb_md:
+    with framed_output.open_writer(output_file, compress, append=True) as out, open(notebook_md, encoding="utf-8") as nb_md:
+        out.frame(os.path.splitext(os.path.basename(notebook_md))[0])
         out.write("\n\n# Notebook\n\n---\n\n")
         out.write(nb_md.read())
     logger.info(f"Notebook appended: {notebook_md}")
 
 
-def build_html_and_convert_to_text(sphinx_source, conf_path, source_root, output):
+def build_html_and_convert_to_text(sphinx_source, conf_path, source_root, output, static_autodoc=False, extra_env=None, offline_intersphinx=False):
     # Copie et patch du dossier source_root et sphinx_source
     patched_source_root = copy_and_patch_source(source_root)
     patched_sphinx_source = copy_and_patch_source(sphinx_source)
@@ -397,17 +698,22 @@ def build_html_and_convert_to_text(sphinx_source, conf_path, source_root, output
     os.makedirs(build_dir, exist_ok=True)
     # Create a safe version of conf.py if needed
     safe_conf_path = create_safe_conf_py(patched_conf_path)
+    if static_autodoc:
+        safe_conf_path = create_static_autodoc_conf_py(safe_conf_path, patched_source_root)
+    intersphinx_cache.patch_conf_py(safe_conf_path, offline_intersphinx)
+    toctree.patch_conf_py(safe_conf_path)
     conf_dir = os.path.dirname(safe_conf_path)
     logger.info(f" 📄 sphinx_source: {patched_sphinx_source}")
     logger.info(f" 📄 conf_path: {safe_conf_path}")
     logger.info(f" 📄 build_dir: {build_dir}")
     logger.info(f" 📄 sphinx-build command: sphinx-build -b html -c {conf_dir} {patched_sphinx_source} {build_dir}")
     logger.info(" 📄 Running sphinx-build (HTML)...")
-    result = subprocess.run(
+    result = limits.run(
         ["sphinx-build", "-b", "html", "-c", conf_dir, patched_sphinx_source, build_dir],
+        "sphinx",
         capture_output=True,
         text=True,
-        env={**os.environ, "PYTHONPATH": patched_source_root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+        env=sphinx_build_env(patched_source_root, extra_env)
     )
     if result.returncode != 0:
         logger.error(f"sphinx-build failed with return code {result.returncode}")
@@ -431,14 +737,15 @@ def build_html_and_convert_to_text(sphinx_source, conf_path, source_root, output
             logger.error(" 📄 Trying with minimal configuration...")
             
             # Try with minimal conf.py
-            minimal_conf_path = create_minimal_conf_py(patched_sphinx_source, patched_source_root)
+            minimal_conf_path = create_minimal_conf_py(patched_sphinx_source, patched_source_root, static_autodoc)
             conf_dir = os.path.dirname(minimal_conf_path)
             
-            result = subprocess.run(
+            result = limits.run(
                 ["sphinx-build", "-b", "html", "-c", conf_dir, patched_sphinx_source, build_dir],
+                "sphinx",
                 capture_output=True,
                 text=True,
-                env={**os.environ, "PYTHONPATH": patched_source_root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+                env=sphinx_build_env(patched_source_root, extra_env)
             )
             
             if result.returncode == 0:
@@ -505,27 +812,29 @@ def main():
     library_name = args.library_name if args.library_name else os.path.basename(source_root)
     # Nouveau mode : HTML -> texte
     if hasattr(args, 'html_to_text') and args.html_to_text:
-        build_html_and_convert_to_text(sphinx_source, conf_path, source_root, args.output)
+        build_html_and_convert_to_text(sphinx_source, conf_path, source_root, args.output, args.static_autodoc, offline_intersphinx=args.offline_intersphinx)
         logger.info(" ✅ Sphinx HTML to text conversion successful.")
         return
-    # Always use robust mode by default
-    build_dir = build_markdown(sphinx_source, conf_path, source_root, robust=True)
-    combine_markdown(build_dir, exclude, args.output, index_path, library_name)
-    # Append all notebooks found in docs/ and doc/ (alphabetically)
-    appended_notebooks = set()
-    for nb_path in find_notebooks_in_doc_dirs(source_root):
-        notebook_md = convert_notebook(nb_path)
-        if notebook_md:
-            append_notebook_markdown(args.output, notebook_md)
-            appended_notebooks.add(os.path.abspath(nb_path))
-    # Still allow --notebook, but avoid duplicate if already appended
-    if args.notebook:
-        nb_abs = os.path.abspath(args.notebook)
-        if nb_abs not in appended_notebooks:
-            notebook_md = convert_notebook(args.notebook)
+    # All intermediate files of this run live in one private folder, removed at the end
+    with tempfile.TemporaryDirectory(prefix="markdown_builder_") as workspace:
+        # Always use robust mode by default
+        build_dir = build_markdown(sphinx_source, conf_path, source_root, robust=True, static_autodoc=args.static_autodoc, workspace=workspace, builder=args.builder, offline_intersphinx=args.offline_intersphinx)
+        combine_markdown(build_dir, exclude, args.output, index_path, library_name, builder=args.builder)
+        # Append all notebooks found in docs/ and doc/ (alphabetically)
+        appended_notebooks = set()
+        for nb_path in find_notebooks_in_doc_dirs(source_root):
+            notebook_md = convert_notebook(nb_path, workspace)
             if notebook_md:
                 append_notebook_markdown(args.output, notebook_md)
-    logger.info(" ✅ Sphinx to Markdown conversion successful.")
+                appended_notebooks.add(os.path.abspath(nb_path))
+        # Still allow --notebook, but avoid duplicate if already appended
+        if args.notebook:
+            nb_abs = os.path.abspath(args.notebook)
+            if nb_abs not in appended_notebooks:
+                notebook_md = convert_notebook(args.notebook, workspace)
+                if notebook_md:
+                    append_notebook_markdown(args.output, notebook_md)
+    logger.info(f" ✅ Sphinx to {'Markdown' if args.builder == 'markdown' else 'text'} conversion successful.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""
+Static detection of the modules a library imports but the environment lacks, for autodoc_mock_imports.
+
+The minimal conf.py used when a project's own configuration fails mocks these modules so autodoc
+can import the library anyway. They are found without running any library code: every .py file
+of the source tree is parsed, the top-level names of its absolute imports are collected, and each
+name is looked up with importlib's finders, which locate a top-level module without importing it.
+Only the names found neither in the source tree nor in the environment are mocked, so the library
+itself is always documented from its real code.
+
+Imports guarded by ``try: ... except ImportError:`` are optional dependencies the library handles
+itself and are not mocked (a mock would make it take the "available" branch).
+
+The parsed import names are cached per hash of the sources in the contextmaker cache, so repeated
+builds of an unchanged library skip the parsing; availability is checked again on every call, since
+it depends on the environment rather than on the sources.
+"""
+
+import ast
+import hashlib
+import importlib.machinery
+import importlib.util
+import json
+import logging
+import os
+import sys
+import threading
+
+from contextmaker.converters import auxiliary, filters
+
+logger = logging.getLogger(__name__)
+
+# Exceptions whose handlers make an import optional
+_IMPORT_ERRORS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+
+class _ImportCollector(ast.NodeVisitor):
+    """Collect the top-level names of absolute imports, except those guarded by an ImportError handler."""
+
+    def __init__(self):
+        self.names = set()
+        self.guarded = 0
+
+    def visit_Try(self, node):
+        guarded = any(_catches_import_error(handler.type) for handler in node.handlers)
+        self.guarded += guarded
+        for statement in node.body:
+            self.visit(statement)
+        self.guarded -= guarded
+        for statement in node.handlers + node.orelse + node.finalbody:
+            self.visit(statement)
+
+    visit_TryStar = visit_Try
+
+    def visit_Import(self, node):
+        if not self.guarded:
+            self.names.update(alias.name.split(".")[0] for alias in node.names)
+
+    def visit_ImportFrom(self, node):
+        if not self.guarded and node.module and not node.level:
+            self.names.add(node.module.split(".")[0])
+
+
+def _catches_import_error(handler_type) -> bool:
+    if handler_type is None:
+        return True
+    types = handler_type.elts if isinstance(handler_type, ast.Tuple) else [handler_type]
+    return any(isinstance(t, ast.Name) and t.id in _IMPORT_ERRORS for t in types)
+
+
+def _python_files(source_root):
+    walker = filters.FileFilter(source_root)
+    for dirpath, _, filenames in walker.walk():
+        for filename in filenames:
+            if filename.endswith(".py"):
+                yield os.path.join(dirpath, filename)
+
+
+def imported_names(source_root: str) -> list:
+    """
+    List the top-level modules imported (absolutely, unguarded) anywhere in a source tree.
+
+    The result is cached per hash of the .py files' paths and contents.
+
+    Returns:
+        list: Sorted module names.
+    """
+    paths = sorted(_python_files(source_root))
+    sources = {}
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        sources[path] = data
+        digest.update(os.path.relpath(path, source_root).encode("utf-8", "surrogateescape") + b"\0")
+        digest.update(hashlib.sha256(data).digest())
+    cache_file = os.path.join(auxiliary.get_cache_dir("mock_imports"), digest.hexdigest() + ".json")
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    collector = _ImportCollector()
+    for path, data in sources.items():
+        try:
+            tree = ast.parse(data, filename=path)
+        except (SyntaxError, ValueError):
+            continue
+        collector.visit(tree)
+    names = sorted(collector.names)
+    try:
+        partial_path = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(names, f)
+        os.replace(partial_path, cache_file)
+    except OSError as e:
+        logger.warning(f"Could not cache the imports of {source_root}: {e}")
+    return names
+
+
+def module_available(name: str, search_paths: list) -> bool:
+    """
+    Tell whether a top-level module can be found in search_paths or in the environment, without importing it.
+    """
+    if name in sys.builtin_module_names or name in getattr(sys, "stdlib_module_names", ()):
+        return True
+    if importlib.machinery.PathFinder.find_spec(name, search_paths) is not None:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def missing_modules(source_root: str) -> list:
+    """
+    List the modules a library imports that can be found neither in its source tree nor in the environment.
+
+    Returns:
+        list: Sorted top-level module names, for autodoc_mock_imports.
+    """
+    search_paths = [source_root, os.path.dirname(source_root)]
+    missing = [name for name in imported_names(source_root) if not module_available(name, search_paths)]
+    if missing:
+        logger.info(f"Modules imported by {source_root} but not installed, mocked: {missing}")
+    return missing
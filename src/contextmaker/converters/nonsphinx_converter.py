@@ -1,177 +1,270 @@
-import subprocess
 import os
-import sys
-import ast
-import shutil
 import logging
-from contextmaker.converters import auxiliary
-import html2text
+import tempfile
+from contextmaker.converters import auxiliary, api_extractor, filters, framed_output, limits
+from contextmaker.converters.dedup import Deduplicator
+from contextmaker.converters.sections import api_sections, file_section
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def create_final_markdown(input_path, output_path, library_name=None):
+def create_final_markdown(input_path, output_path, library_name=None, sections=None, compress=None, only=None, file_filter=None):
     """
     Create the final text file from the library documentation or source files.
 
-    This function:
-    - Creates individual markdown files for each relevant input file (notebooks, Python files with docstrings or source).
-    - Combines all generated markdown files into a single '<library_name>.txt' file as plain text.
-    - Deletes the temporary folder used to store intermediate markdown files.
+    The fragments produced by iter_file_sections (notebooks, Python files with docstrings or source)
+    are written to a single '<library_name>.txt' file as they are produced, keeping their Markdown.
 
     Parameters:
         input_path (str): Path to the library or documentation source.
         output_path (str): Path where the final text file will be saved.
         library_name (str): Name of the library for the output file.
+        sections (list, optional): If given, receives a Section for every unit written (see sections.py).
+        compress (str, optional): "gzip" or "zstd" to write one compressed frame per file (see framed_output.py).
+        only (list, optional): Convert only the modules and notebooks matching these patterns (see create_markdown_files).
+        file_filter (FileFilter, optional): Include/exclude patterns and size cap for the walk (see filters.py).
+
+    Returns:
+        str: Path to the combined '<library_name>.txt' file (with the compression suffix if compressed).
     """
-    temp_output_path = create_markdown_files(input_path, output_path)
     if library_name is None:
         library_name = os.path.basename(os.path.normpath(input_path))
-    combine_markdown_files_to_txt(temp_output_path, output_path, library_name)
-    shutil.rmtree(temp_output_path, ignore_errors=True)
-    logger.info(f"Temporary folder '{temp_output_path}' removed after processing.")
+    return write_fragments(iter_file_sections(input_path, sections, only, file_filter), output_path, library_name, compress)
 
-def create_markdown_files(lib_path, output_path):
+def create_markdown_files(lib_path, output_path, sections=None, only=None, file_filter=None):
     """
     Generate markdown files from the library source files.
 
     Processes all files in lib_path, converting notebooks, extracting docstrings
     or copying source code into markdown files stored in a temporary directory.
+    The directory name is unique per call, so concurrent runs sharing an output path do not collide.
 
     Parameters:
         lib_path (str): Path to the source library or documentation.
         output_path (str): Path where the temporary markdown files will be saved.
+        sections (list, optional): If given, receives a Section for every unit written.
+        only (list, optional): Patterns selecting the files to convert: Python files by dotted module
+            name ("pixell.enmap" also selects its submodules), notebooks by name or relative path
+            (see auxiliary.matches_selection).
+        file_filter (FileFilter, optional): Files and directories to skip; excluded directories are
+            pruned during the walk (default: filters.DEFAULT_EXCLUDE and .contextmakerignore).
 
     Returns:
         str: Path to the temporary directory containing the markdown files.
     """
-    temp_output_path = os.path.join(output_path, "temp")
-    os.makedirs(temp_output_path, exist_ok=True)
+    os.makedirs(output_path, exist_ok=True)
+    temp_output_path = tempfile.mkdtemp(prefix="temp_", dir=output_path)
+    for section in iter_file_sections(lib_path, sections, only, file_filter):
+        with open(os.path.join(temp_output_path, section.title), "w", encoding="utf-8") as f:
+            f.write(section.text)
+    return temp_output_path
+
+def iter_file_sections(lib_path, sections=None, only=None, file_filter=None, file_cache=None):
+    """
+    Convert the files of a library one by one, yielding each fragment as soon as it is produced.
+
+    The library is walked first (cheap), then files are converted in the order of their fragment
+    names, which is the order of the combined output. If no file is documented, the README (or a
+    short summary) is yielded instead, see basic_documentation.
+
+    Parameters:
+        lib_path (str): Path to the source library or documentation.
+        sections (list, optional): If given, receives the fine-grained Sections of every fragment
+            (one per documented object for docstrings, see sections.py).
+        only (list, optional): Patterns selecting the files to convert (see create_markdown_files).
+        file_filter (FileFilter, optional): Files and directories to skip (see filters.py).
+        file_cache (dict, optional): Fragments of a previous run, reused for files whose mtime and
+            size are unchanged, and updated (see incremental.IncrementalState).
+
+    Yields:
+        Section: One per fragment, titled with the fragment's file name ("pixell.enmap.md"), with its Markdown
+            as text and the library file as source.
+    """
+    files = []
+    for root, dirs, filenames in filters.default_filter(lib_path, file_filter).walk():
+        for file in filenames:
+            file_path = os.path.join(root, file)
+            if only and not auxiliary.matches_selection(selection_names(file_path, lib_path), only):
+                continue
+            files.append((fragment_path(file_path, "", lib_path), file_path))
+    files.sort(key=lambda item: item[0])
 
-    # Track if we found any valid files
     found_files = False
-    
-    # Recursively search for files
-    for root, dirs, files in os.walk(lib_path):
-        # Skip common directories that don't contain documentation
-        dirs[:] = [d for d in dirs if d not in ['.git', '__pycache__', 'build', 'dist', '.pytest_cache', 'node_modules']]
-        
-        for file in files:
-            full_path = os.path.join(root, file)
-            relative_path = os.path.relpath(full_path, lib_path)
-            
-            if file.endswith(".ipynb"):
-                jupyter_to_markdown(full_path, temp_output_path)
-                found_files = True
-            elif file.endswith(".py") and auxiliary.has_docstrings(full_path):
-                docstrings_to_markdown(full_path, temp_output_path)
-                found_files = True
-            elif file.endswith(".py") and auxiliary.has_source(lib_path):
-                source_to_markdown(full_path, temp_output_path)
-                found_files = True
-    
+    source_only = None  # computed once, on the first undocumented Python file
+    if file_cache is not None:
+        for stale in set(file_cache) - {file_path for _, file_path in files}:
+            del file_cache[stale]
+    for title, file_path in files:
+        state = None
+        if file_cache is not None:
+            stat = os.stat(file_path)
+            state = (stat.st_mtime_ns, stat.st_size)
+        if state is not None and file_cache.get(file_path, (None,))[0] == state:
+            _, text, kind, file_sections = file_cache[file_path]
+            if sections is not None:
+                sections.extend(file_sections)
+        else:
+            if file_path.endswith(".py") and source_only is None and not auxiliary.has_docstrings(file_path):
+                source_only = auxiliary.has_source(lib_path)
+            file_sections = [] if sections is not None or file_cache is not None else None
+            text, kind = file_markdown(file_path, lib_path, file_sections, bool(source_only))
+            if sections is not None:
+                sections.extend(file_sections)
+            if file_cache is not None:
+                file_cache[file_path] = (state, text, kind, file_sections)
+        if text is None:
+            continue
+        found_files = True
+        module = api_extractor.module_name_from_path(file_path, lib_path) if file_path.endswith(".py") else None
+        yield file_section(file_path, text, kind, module=module, title=title)
+
     if not found_files:
         logger.warning("No documentation files found in the library. This may be a library without docstrings or documentation.")
-        # Create a basic documentation file from README or similar
-        create_basic_documentation(lib_path, temp_output_path)
-    
-    return temp_output_path
+        # Fall back to the README or similar
+        title, text, source = basic_documentation(lib_path, sections)
+        yield file_section(source or lib_path, text, "file", title=title)
 
-def combine_markdown_files_to_txt(temp_output_path, output_path, library_name):
+def write_fragments(fragments, output_path, library_name, compress=None, dedup=False):
     """
-    Combine all markdown files in the temporary directory into a single text file named <library_name>.txt.
-    For non-Sphinx projects, preserve the Markdown formatting exactly as in the .md files.
+    Write fragment sections (see iter_file_sections) to '<library_name>.txt' as they arrive.
+    The file is written under a temporary name and moved into place once complete.
+    With compress ("gzip" or "zstd"), every fragment is written as its own frame (see framed_output.py).
+    With dedup, repeated fragments and blocks are replaced by references (see dedup.py).
+    Returns the path to the combined file.
     """
+    deduplicator = Deduplicator() if dedup else None
     os.makedirs(output_path, exist_ok=True)
     combined_file_path = os.path.join(output_path, f"{library_name}.txt")
-    with open(combined_file_path, "w", encoding="utf-8") as combined_file:
+    with framed_output.open_writer(combined_file_path, compress) as combined_file:
         # Add the global title like in the Sphinx converter
+        combined_file.frame(library_name)
         combined_file.write(f"# - Complete Documentation | {library_name} -\n\n")
-        
-        for file in sorted(os.listdir(temp_output_path)):
-            if file.endswith((".md", ".txt")):
-                file_path = os.path.join(temp_output_path, file)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    # Write a section separator and filename
-                    combined_file.write(f"\n\n---\n\n# {file}\n\n")
-                    combined_file.write(content)
+        for section in fragments:
+            # Write a section separator and filename
+            combined_file.frame(section.title)
+            combined_file.write(f"\n\n---\n\n# {section.title}\n\n")
+            combined_file.write(deduplicator.text(section.title, section.text) if deduplicator else section.text)
+    combined_file_path = framed_output.output_path(combined_file_path, compress)
+    if deduplicator:
+        deduplicator.report(combined_file_path)
     logger.info(f"All documentation combined into: {combined_file_path}")
+    return combined_file_path
 
-def jupyter_to_markdown(file_path, output_path):
+def selection_names(file_path, lib_path):
     """
-    Convert a Jupyter notebook (.ipynb) to a markdown file using jupytext.
+    Names a library file can be selected by with make(only=...): the dotted module name of Python
+    files, the stem and relative path (without extension) of other files.
+    """
+    if file_path.endswith(".py"):
+        return [api_extractor.module_name_from_path(file_path, lib_path)]
+    rel_path = os.path.splitext(os.path.relpath(file_path, lib_path))[0].replace(os.sep, "/")
+    return [os.path.splitext(os.path.basename(file_path))[0], rel_path]
+
+def fragment_path(file_path, output_path, lib_path=None):
+    """
+    Return the markdown fragment written for a library file in output_path.
+    With lib_path, the fragment is named after the file's path relative to it ("a/utils.py" gives
+    "a.utils.md"), so same-named files of different folders do not overwrite each other.
+    """
+    name = os.path.relpath(file_path, lib_path) if lib_path else os.path.basename(file_path)
+    return os.path.join(output_path, os.path.splitext(name)[0].replace(os.sep, ".") + ".md")
+
+def file_markdown(file_path, lib_path, sections=None, source_only=None):
+    """
+    Produce the markdown fragment of one library file, without writing it.
 
     Parameters:
-        file_path (str): Path to the Jupyter notebook.
-        output_path (str): Directory to save the generated markdown file.
-    """
-    # Construct the output .md file path in the output directory
-    base_name = os.path.splitext(os.path.basename(file_path))[0]
-    md_file_path = os.path.join(output_path, base_name + ".md")
-    cmd = ["jupytext", "--to", "md", file_path, "-o", md_file_path]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+        file_path (str): Path to the file.
+        lib_path (str): Path to the library root.
+        sections (list, optional): If given, receives the Section objects of the fragment.
+        source_only (bool, optional): Whether the library has source code only (auxiliary.has_source);
+            computed when needed if not given.
+
+    Returns:
+        tuple: (markdown, kind) with kind "notebook", "module" or "source"; (None, None) if the file
+            is not documented.
+    """
+    if file_path.endswith(".ipynb"):
+        return notebook_markdown(file_path, sections, lib_path), "notebook"
+    if not file_path.endswith(".py"):
+        return None, None
+    if auxiliary.has_docstrings(file_path):
+        return docstrings_markdown(file_path, lib_path, sections), "module"
+    if source_only if source_only is not None else auxiliary.has_source(lib_path):
+        return source_markdown(file_path, lib_path, sections), "source"
+    return None, None
+
+def notebook_markdown(file_path, sections=None, lib_path=None):
+    """
+    Convert a Jupyter notebook to markdown with jupytext and return it, or None if jupytext fails.
+    """
+    cmd = ["jupytext", "--to", "md", file_path, "-o", "-"]
+    result = limits.run(cmd, "notebook", capture_output=True, text=True)
     if result.returncode != 0:
         logger.error("Jupytext error: %s", result.stderr)
-    else:
-        logger.info("Notebook converted to markdown: %s", md_file_path)
+        return None
+    if sections is not None:
+        sections.append(file_section(fragment_path(file_path, "", lib_path), result.stdout, "notebook", file_path))
+    return result.stdout
 
-def docstrings_to_markdown(file_path, output_path):
+def docstrings_to_markdown(file_path, output_path, lib_path=None, sections=None):
     """
-    Extract docstrings from a Python file and write them to a markdown file.
+    Extract the API of a Python file and write it to a markdown file.
 
-    Extracts module, class, and function docstrings and formats them with markdown headers.
+    The file is parsed once (see api_extractor); every documented or public class, function,
+    method and attribute is written with its qualified name, full signature and decorators,
+    with header depth following the class/method nesting.
 
     Parameters:
         file_path (str): Path to the Python source file.
         output_path (str): Directory to save the markdown file.
+        lib_path (str, optional): Library root, used to compute dotted module names.
+        sections (list, optional): If given, receives one Section per documented object.
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        source = f.read()
-
-    tree = ast.parse(source, filename=file_path)
-    docstrings = []
-
-    module_doc = ast.get_docstring(tree)
-    if module_doc:
-        docstrings.append(f"# Module docstring\n\n{module_doc}\n")
-
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-            doc = ast.get_docstring(node)
-            if doc:
-                if isinstance(node, ast.ClassDef):
-                    header = f"## Class `{node.name}`"
-                else:
-                    header = f"### Function `{node.name}`"
-                docstrings.append(f"{header}\n\n{doc}\n")
-
-    output_file = os.path.join(output_path, os.path.basename(file_path).replace(".py", ".md"))
+    output_file = fragment_path(file_path, output_path, lib_path)
     with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(docstrings))
+        f.write(docstrings_markdown(file_path, lib_path, sections))
+
+def docstrings_markdown(file_path, lib_path=None, sections=None):
+    """
+    Return the API of a Python file as markdown (see docstrings_to_markdown).
+    """
+    module = api_extractor.extract_api_from_file(file_path, lib_path)
+    if sections is not None:
+        sections.extend(api_sections(module, file_path))
+    return api_extractor.api_to_markdown(module)
 
-def source_to_markdown(file_path, output_path):
+def source_to_markdown(file_path, output_path, sections=None, lib_path=None):
     """
     Convert a Python source file to markdown by copying its content as-is.
 
     Parameters:
         file_path (str): Path to the Python source file.
         output_path (str): Directory to save the markdown file.
+        sections (list, optional): If given, receives the file's Section.
+        lib_path (str, optional): Library root, used to compute the dotted module name.
+    """
+    output_file = fragment_path(file_path, output_path, lib_path)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(source_markdown(file_path, lib_path, sections))
+
+def source_markdown(file_path, lib_path=None, sections=None):
+    """
+    Return the content of a Python source file (see source_to_markdown).
     """
     with open(file_path, "r", encoding="utf-8") as f:
         content = f.read()
+    if sections is not None:
+        sections.append(file_section(file_path, content, "source", module=api_extractor.module_name_from_path(file_path, lib_path)))
+    return content
 
-    output_file = os.path.join(output_path, os.path.basename(file_path).replace(".py", ".md"))
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(content)
-
-def create_basic_documentation(lib_path, output_path):
+def basic_documentation(lib_path, sections=None):
     """
-    Create basic documentation from README files or other common documentation files.
+    Return the documentation of a library without documented files: its README or changelog,
+    or else a short summary.
 
-    Parameters:
-        lib_path (str): Path to the library.
-        output_path (str): Directory to save the documentation file.
+    Returns:
+        tuple: (fragment name, text, path of the documentation file or None for the summary).
     """
     # Look for common documentation files
     doc_files = ['README.md', 'README.rst', 'README.txt', 'CHANGELOG.md', 'CHANGELOG.rst']
@@ -179,16 +272,18 @@ def create_basic_documentation(lib_path, output_path):
     for doc_file in doc_files:
         doc_path = os.path.join(lib_path, doc_file)
         if os.path.exists(doc_path):
-            output_file = os.path.join(output_path, f"basic_documentation_{doc_file}")
-            shutil.copy2(doc_path, output_file)
-            logger.info(f"Copied {doc_file} to basic documentation")
-            return
+            with open(doc_path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            if sections is not None:
+                sections.append(file_section(doc_path, text, "file"))
+            logger.info(f"Using {doc_file} as basic documentation")
+            return f"basic_documentation_{doc_file}", text, doc_path
     
     # If no documentation files found, create a basic summary
-    output_file = os.path.join(output_path, "basic_documentation.md")
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(f"# Basic Documentation for {os.path.basename(lib_path)}\n\n")
-        f.write("This library was processed but no structured documentation was found.\n")
-        f.write("The library may contain source code without docstrings or may require special setup for documentation generation.\n")
-    
-    logger.info("Created basic documentation summary")
\ No newline at end of file
+    text = (
+        f"# Basic Documentation for {os.path.basename(lib_path)}\n\n"
+        "This library was processed but no structured documentation was found.\n"
+        "The library may contain source code without docstrings or may require special setup for documentation generation.\n"
+    )
+    logger.info("Created basic documentation summary")
+    return "basic_documentation.md", text, None
@@ -0,0 +1,75 @@
+"""
+Sections: the units the converters write into the combined output.
+
+A section is a Sphinx page, a notebook, a source file, or (for libraries documented from their
+docstrings) a module, class, function, method, property or attribute. Converters can collect them
+while writing the combined file, so that other outputs (e.g. the SQLite store) are built from the
+same units without re-parsing the text.
+"""
+
+import os
+from dataclasses import dataclass
+
+from contextmaker.converters import api_extractor, toctree
+
+
+@dataclass
+class Section:
+    """
+    One unit of documentation.
+
+    Attributes:
+        title (str): Title of the section (page name, notebook name or qualified symbol name).
+        text (str): Markdown content.
+        kind (str): "page", "notebook", "source", "file", or an API entry kind ("module", "class", ...).
+        source (str, optional): File the section was generated from.
+        module (str, optional): Dotted module name, for API and source sections.
+        symbol (str, optional): Fully qualified symbol name, for API sections.
+        heading_path (tuple): Titles from the outermost heading down to this section's,
+            e.g. ("pixell.enmap", "ndmap", "copy") for a method.
+    """
+    title: str
+    text: str
+    kind: str
+    source: str | None = None
+    module: str | None = None
+    symbol: str | None = None
+    heading_path: tuple = ()
+
+
+def api_sections(module: dict, source: str | None = None) -> list:
+    """
+    Split a module API tree into one section per documented object (see api_extractor.markdown_blocks).
+
+    Args:
+        module (dict): Module entry returned by api_extractor.extract_api().
+        source (str, optional): Path of the module's source file.
+
+    Returns:
+        list: Section objects, the module first.
+    """
+    sections = []
+    for entry, block in api_extractor.markdown_blocks(module):
+        symbol = module["qualname"] if entry is module else f"{module['qualname']}.{entry['qualname']}"
+        heading_path = (module["qualname"],) if entry is module else (module["qualname"], *entry["qualname"].split("."))
+        sections.append(Section(title=symbol, text=block, kind=entry["kind"], source=source, module=module["qualname"], symbol=symbol, heading_path=heading_path))
+    return sections
+
+
+def file_section(path: str, text: str, kind: str, source: str | None = None, module: str | None = None, title: str | None = None) -> Section:
+    """
+    Build the section of a whole file (Sphinx page, notebook, copied source...), titled by its base name
+    unless a title (e.g. a nested Sphinx docname) is given.
+    """
+    title = title or os.path.splitext(os.path.basename(source or path))[0]
+    return Section(title=title, text=text, kind=kind, source=source or path, module=module, heading_path=(title,))
+
+
+def page_section(text: str, docname: str, source_dir: str | None = None) -> Section:
+    """
+    Build the section of a Sphinx page, titled by its docname ("api/enmap"). Its source is the document
+    it was built from in source_dir (the Sphinx source folder), never the build output, which only lives
+    as long as the run; generated pages (autosummary stubs, ...) have no source.
+    """
+    source = toctree.document_path(source_dir, docname) if source_dir else None
+    return Section(title=docname, text=text, kind="page", source=source, heading_path=(docname,))
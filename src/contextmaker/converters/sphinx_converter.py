@@ -1,8 +1,7 @@
-import subprocess
 import os
 import sys
 import logging
-from contextmaker.converters import auxiliary
+from contextmaker.converters import auxiliary, limits
 
 logger = logging.getLogger(__name__)
 
@@ -37,21 +36,22 @@ def convert_sphinx_docs_to_txt(input_path: str, output_path: str) -> bool:
         logger.error(" ❌ No valid sphinx source folder found (conf.py and index.rst in docs/source, docs, doc/source, or doc/)")
         return False
 
-    markdown_output = os.path.join(output_path, "output.md")
+    # Extract library name from input path
+    library_name = os.path.basename(input_path)
+
+    os.makedirs(output_path, exist_ok=True)
+    with auxiliary.run_workspace(output_path, library_name) as workspace:
+        return _convert_in_workspace(input_path, output_path, sphinx_source, library_name, workspace)
+
+
+def _convert_in_workspace(input_path, output_path, sphinx_source, library_name, workspace):
+    markdown_output = os.path.join(workspace, "output.md")
     notebook_path = os.path.join(input_path, "notebook.ipynb")  # Optional
 
-    # Get absolute path to markdown_builder.py before changing directory
     current_dir = os.path.dirname(os.path.abspath(__file__))
     markdown_builder_path = os.path.join(current_dir, "markdown_builder.py")
     logger.info(f" 📚 markdown_builder_path: {markdown_builder_path}")
 
-    # Change to output_path directory to create build artifacts there
-    original_cwd = os.getcwd()
-    os.chdir(output_path)
-
-    # Extract library name from input path
-    library_name = os.path.basename(input_path)
-
     command = [
         sys.executable, markdown_builder_path,
         "--sphinx-source", sphinx_source,
@@ -65,7 +65,8 @@ def convert_sphinx_docs_to_txt(input_path: str, output_path: str) -> bool:
     logger.info(f" 📚 Executing: {' '.join(command)}")
     
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=False)
+        # Build artifacts are created in the private workspace; the process cwd is left alone
+        result = limits.run(command, "sphinx", capture_output=True, text=True, cwd=workspace)
         if result.stdout:
             logger.info(f"markdown_builder.py STDOUT:\n{result.stdout}")
         if result.stderr.strip():
@@ -79,18 +80,10 @@ def convert_sphinx_docs_to_txt(input_path: str, output_path: str) -> bool:
         logger.error(" ❌ markdown_builder.py failed with exception.")
         logger.error(f"Exception: {e}")
         return False
-    finally:
-        # Restore original working directory
-        os.chdir(original_cwd)
     # Markdown to txt
     if os.path.exists(markdown_output):
-        txt_output_path = auxiliary.convert_markdown_to_txt(output_path, library_name)
+        txt_output_path = auxiliary.convert_markdown_to_txt(output_path, library_name, markdown_output)
         logger.info(f" ✅ Markdown converted to text at: {txt_output_path}")
-        
-        # Delete the markdown file after successful conversion
-        os.remove(markdown_output)
-        logger.info(f" 📄 Deleted temporary markdown file: {markdown_output}")
-        
         return True
     else:
         logger.warning(f"Markdown file not found at expected path: {output_path}")
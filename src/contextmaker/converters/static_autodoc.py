@@ -0,0 +1,359 @@
+"""
+Static autodoc: a Sphinx extension resolving autodoc directives without importing any code.
+
+``.. automodule::``, ``.. autoclass::``, ``.. autofunction::`` and the other ``auto*``
+directives are answered from the AST of the source tree (see api_extractor), so documenting a
+library never executes it: no compiled extension has to be built and no ``sys.exit()`` or
+circular import can abort the build. Enable it by listing
+``contextmaker.converters.static_autodoc`` in place of ``sphinx.ext.autodoc``;
+build_markdown() does this when called with ``static_autodoc=True``.
+
+``sphinx.ext.autodoc`` itself is still set up (napoleon and autosummary depend on it and its
+config values), only its directives are replaced.
+"""
+
+import os
+import sys
+
+from docutils import nodes
+from docutils.statemachine import StringList
+from sphinx.util import logging
+from sphinx.util.docutils import SphinxDirective, switch_source_input
+from sphinx.util.nodes import nested_parse_with_titles
+
+from contextmaker.converters import api_extractor
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_NAME = "contextmaker.converters.static_autodoc"
+
+# Directive name -> autodoc object type
+DIRECTIVES = {
+    "automodule": "module",
+    "autoclass": "class",
+    "autoexception": "exception",
+    "autofunction": "function",
+    "autodecorator": "function",
+    "automethod": "method",
+    "autoattribute": "attribute",
+    "autodata": "data",
+    "autoproperty": "property",
+}
+
+# Module file path -> (mtime_ns, module API tree)
+_API_CACHE = {}
+
+
+def find_module_file(modname: str, search_paths: list) -> str | None:
+    """
+    Locate the source file of a module without importing it.
+
+    Args:
+        modname (str): Dotted module name.
+        search_paths (list): Directories to search, in order (like sys.path).
+
+    Returns:
+        str | None: Path to the module's .py or package __init__.py, or None if not found.
+    """
+    rel_path = modname.replace(".", os.sep)
+    for root in search_paths:
+        if not root or not os.path.isdir(root):
+            continue
+        for candidate in (os.path.join(root, rel_path, "__init__.py"), os.path.join(root, rel_path + ".py")):
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+def load_module_api(modname: str, search_paths: list) -> dict | None:
+    """
+    Return the API tree of a module, parsing its source at most once per modification.
+
+    Args:
+        modname (str): Dotted module name.
+        search_paths (list): Directories to search for the module source.
+
+    Returns:
+        dict | None: Module entry (see api_extractor.extract_api) with an extra "file" key, or None.
+    """
+    path = find_module_file(modname, search_paths)
+    if path is None:
+        return None
+    mtime = os.stat(path).st_mtime_ns
+    cached = _API_CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        module = api_extractor.extract_api(source, path, modname, is_package=path.endswith("__init__.py"))
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        logger.warning(f"static autodoc: could not parse {path}: {e}")
+        return None
+    module["file"] = path
+    _API_CACHE[path] = (mtime, module)
+    return module
+
+
+def resolve_object(name: str, search_paths: list, current_module: str | None = None, _depth: int = 0):
+    """
+    Resolve a dotted name to an API entry, following re-exports (``from .x import y``).
+
+    Args:
+        name (str): Dotted object name, absolute or relative to ``current_module``.
+        search_paths (list): Directories to search for module sources.
+        current_module (str, optional): Module set by a previous ``py:module``/``currentmodule``.
+
+    Returns:
+        tuple | None: (module entry, entry) where entry is the module itself for modules, or None.
+    """
+    candidates = [name]
+    if current_module and not name.startswith(current_module + "."):
+        candidates.insert(0, f"{current_module}.{name}")
+    for full_name in candidates:
+        parts = full_name.split(".")
+        for i in range(len(parts), 0, -1):
+            module = load_module_api(".".join(parts[:i]), search_paths)
+            if module is None:
+                continue
+            entry = module
+            rest = parts[i:]
+            for j, part in enumerate(rest):
+                child = next((c for c in entry["children"] if c["name"] == part), None)
+                if child is None and entry is module and part in module["imports"] and _depth < 5:
+                    target = ".".join([module["imports"][part]] + rest[j + 1:])
+                    return resolve_object(target, search_paths, _depth=_depth + 1)
+                entry = child
+                if entry is None:
+                    break
+            if entry is not None:
+                return module, entry
+            break
+    return None
+
+
+def _is_exception(entry):
+    return any(b.split(".")[-1].endswith(("Error", "Exception", "Warning")) for b in entry["bases"])
+
+
+def _select_members(module, entry, options, search_paths):
+    """Return the (module, member) pairs to document for an entry, honouring the autodoc options."""
+    if "members" not in options:
+        return []
+    requested = options["members"]
+    excluded = {m.strip() for m in str(options.get("exclude-members") or "").split(",") if m.strip()}
+    if requested not in (None, True, ""):
+        names = [m.strip() for m in str(requested).split(",") if m.strip()]
+    elif entry is module and module["all"] is not None and "ignore-module-all" not in options:
+        names = list(module["all"])
+    else:
+        names = None
+
+    children = {c["name"]: c for c in entry["children"]}
+    selected = []
+    if names is not None:
+        for name in names:
+            if name in children:
+                selected.append((module, children[name]))
+            elif entry is module and name in module["imports"]:
+                resolved = resolve_object(module["imports"][name], search_paths)
+                if resolved and resolved[1]["kind"] != "module":
+                    owner, member = resolved
+                    if member["name"] != name:
+                        member = {**member, "name": name, "qualname": name}
+                    selected.append((owner, member))
+        explicit = True
+    else:
+        selected = [(module, c) for c in entry["children"]]
+        explicit = False
+
+    result = []
+    for owner, member in selected:
+        name = member["name"]
+        if name in excluded:
+            continue
+        if not explicit:
+            is_special = name.startswith("__") and name.endswith("__")
+            if is_special and "special-members" not in options:
+                continue
+            if name.startswith("_") and not is_special and "private-members" not in options:
+                continue
+            if not member["docstring"] and "undoc-members" not in options:
+                continue
+        result.append((owner, member))
+
+    order = options.get("member-order") or "alphabetical"
+    if order == "alphabetical":
+        result.sort(key=lambda pair: pair[1]["name"])
+    elif order == "groupwise":
+        groups = {"class": 0, "exception": 0, "function": 1, "method": 1, "property": 2, "attribute": 3}
+        result.sort(key=lambda pair: (groups.get(pair[1]["kind"], 4), pair[1]["name"]))
+    return result
+
+
+def _docstring_lines(app, what, fullname, docstring):
+    lines = docstring.splitlines() if docstring else []
+    try:
+        # Lets napoleon and other listeners rewrite the docstring as they would for autodoc
+        app.emit("autodoc-process-docstring", what, fullname, None, {}, lines)
+    except Exception as e:
+        logger.debug(f"static autodoc: autodoc-process-docstring failed for {fullname}: {e}")
+    return lines
+
+
+def generate_rst(app, module, entry, what, options, search_paths, indent=""):
+    """
+    Generate the reStructuredText autodoc would produce for an entry and its selected members.
+
+    Args:
+        app (sphinx.application.Sphinx): The Sphinx application (used for events and config).
+        module (dict): Module entry owning ``entry``.
+        entry (dict): Entry to document (may be ``module`` itself).
+        what (str): Autodoc object type ("module", "class", "function", ...).
+        options (dict): Directive options merged with autodoc_default_options.
+        search_paths (list): Directories to search for module sources.
+        indent (str): Indentation prefix of the generated block.
+
+    Returns:
+        list: Lines of reStructuredText.
+    """
+    modname = module["qualname"]
+    no_index = "no-index" in options or "noindex" in options
+    lines = []
+
+    def add(line=""):
+        lines.append(f"{indent}{line}" if line else "")
+
+    if what == "module":
+        add(f".. py:module:: {modname}")
+        if no_index:
+            add("   :no-index:")
+        add()
+        for line in _docstring_lines(app, "module", modname, entry["docstring"]):
+            add(line)
+        add()
+        body_indent = indent
+    else:
+        fullname = f"{modname}.{entry['qualname']}"
+        if what in ("class", "exception"):
+            signature = entry["signature"]
+        elif what == "method":
+            signature = entry.get("bound_signature", entry["signature"])
+        elif what == "function":
+            signature = entry["signature"]
+        else:
+            signature = ""
+        add(f".. py:{what}:: {entry['qualname']}{signature}")
+        add(f"   :module: {modname}")
+        if no_index:
+            add("   :no-index:")
+        if entry.get("is_async"):
+            add("   :async:")
+        if what == "method":
+            for decorator in ("staticmethod", "classmethod"):
+                if decorator in entry["decorators"]:
+                    add(f"   :{decorator}:")
+        if what in ("attribute", "data", "property"):
+            annotation = entry["signature"].lstrip(": ") if what != "property" else entry["signature"].partition(" -> ")[2]
+            if annotation:
+                add(f"   :type: {annotation}")
+            if entry.get("value") and what != "property":
+                add(f"   :value: {entry['value']}")
+        add()
+        if what in ("class", "exception") and "show-inheritance" in options and entry["bases"]:
+            bases = ", ".join(f":py:class:`{b}`" for b in entry["bases"] if "=" not in b)
+            if bases:
+                add(f"   Bases: {bases}")
+                add()
+        docstring = entry["docstring"]
+        if what in ("class", "exception"):
+            content = app.config.autoclass_content if hasattr(app.config, "autoclass_content") else "class"
+            init = next((c for c in entry["children"] if c["name"] == "__init__"), None)
+            init_doc = init["docstring"] if init else None
+            if content == "init" and init_doc:
+                docstring = init_doc
+            elif content == "both" and init_doc:
+                docstring = f"{docstring}\n\n{init_doc}" if docstring else init_doc
+        for line in _docstring_lines(app, what, fullname, docstring):
+            add(f"   {line}" if line else "")
+        add()
+        body_indent = indent + "   "
+
+    # Re-exported members are documented under the module that exports them, as autodoc does
+    for _owner, member in _select_members(module, entry, options, search_paths):
+        member_what = member["kind"]
+        if member_what == "class" and _is_exception(member):
+            member_what = "exception"
+        elif member_what == "attribute" and what == "module":
+            member_what = "data"
+        member_options = {k: v for k, v in options.items() if k != "members"}
+        if member_what in ("class", "exception") and "members" in options:
+            member_options["members"] = None
+        lines.extend(generate_rst(app, module, member, member_what, member_options, search_paths, body_indent))
+    return lines
+
+
+class _AnyOptionSpec(dict):
+    """Option spec accepting every autodoc option, like autodoc's own directives."""
+
+    def __bool__(self):
+        return True
+
+    def __getitem__(self, _key):
+        return lambda value: value if value is not None else None
+
+
+class StaticAutodocDirective(SphinxDirective):
+    """
+    Drop-in replacement for the autodoc directives, generating content from source ASTs.
+    """
+
+    option_spec = _AnyOptionSpec()
+    has_content = True
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = True
+
+    def run(self):
+        what = DIRECTIVES[self.name.split(":")[-1]]
+        name = self.arguments[0].strip().split("(")[0]
+        options = dict(getattr(self.config, "autodoc_default_options", {}) or {})
+        options.update(self.options)
+        options.setdefault("member-order", getattr(self.config, "autodoc_member_order", "alphabetical"))
+        search_paths = list(self.config.static_autodoc_paths) + sys.path
+
+        current_module = self.env.ref_context.get("py:module")
+        resolved = resolve_object(name, search_paths, None if what == "module" else current_module)
+        if resolved is None:
+            logger.warning(f"static autodoc: could not resolve {what} {name!r}", location=(self.env.docname, self.lineno))
+            return []
+        module, entry = resolved
+        if entry is module and what != "module":
+            what = "module"
+        elif what == "class" and _is_exception(entry):
+            what = "exception"
+        self.env.note_dependency(module["file"])
+
+        result = StringList()
+        source, _ = self.get_source_info()
+        for line in generate_rst(self.env.app, module, entry, what, options, search_paths):
+            result.append(line, source, self.lineno)
+        with switch_source_input(self.state, result):
+            node = nodes.section() if what == "module" else nodes.paragraph()
+            node.document = self.state.document
+            nested_parse_with_titles(self.state, result, node)
+        return node.children
+
+
+def _register_directives(app, *_args):
+    for directive in DIRECTIVES:
+        app.add_directive(directive, StaticAutodocDirective, override=True)
+
+
+def setup(app):
+    app.setup_extension("sphinx.ext.autodoc")
+    app.add_config_value("static_autodoc_paths", [], "env")
+    # autodoc (and extensions set up later) may (re-)register the directives up to config-inited,
+    # so they are taken over once everything is loaded
+    app.connect("builder-inited", _register_directives)
+    return {"version": "1.0", "parallel_read_safe": True, "parallel_write_safe": True}
@@ -0,0 +1,444 @@
+"""
+Toctree graph of a Sphinx project, used to order the combined output like the documentation.
+
+Every source document (.rst, MyST .md, .ipynb) is parsed once. All its ``toctree`` directives are
+read (reStructuredText ``.. toctree::`` and MyST ```` ```{toctree} ```` fences), with ``:glob:``
+patterns, ``:caption:``, ``Title <target>`` entries, and targets relative to the document's folder
+or absolute from the source root (``/api/index``).
+
+This module is also a Sphinx extension, added to every configuration contextmaker builds with: at
+the end of the build it writes Sphinx's own resolved toctrees to GRAPH_FILE in the output folder,
+as JSON. When a build directory with that file is given, its graph is used instead of the parsed
+one. The pickled environment is never loaded: unpickling would import the extensions and library
+classes it references into the contextmaker process (and run whatever code they carry).
+
+Ordering is a depth-first walk from the root document with a visited set, so every document is
+placed once. Each ``:glob:`` pattern is compiled once and only compared with the documents sharing
+its literal prefix (found by bisection in the sorted docnames), so the graph is built in time
+linear in the number of documents and entries plus the documents the globs match.
+"""
+
+import bisect
+import fnmatch
+import json
+import logging
+import os
+import posixpath
+import re
+import threading
+
+from contextmaker.converters import auxiliary
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SUFFIXES = (".rst", ".md", ".ipynb")
+EXTENSION = "contextmaker.converters.toctree"
+# Resolved toctrees written to the build folder by the extension
+GRAPH_FILE = ".contextmaker_toctree.json"
+# First line of the block appended to patched conf.py files
+CONF_MARKER = "# Toctree graph export of contextmaker"
+IGNORED_DIRS = {"_build", "_static", "_templates", "build", "__pycache__", ".ipynb_checkpoints"}
+
+_RST_TOCTREE = re.compile(r"^(\s*)\.\.\s+toctree::\s*$")
+_MYST_TOCTREE = re.compile(r"^\s*(`{3,}|:{3,})\s*\{toctree\}\s*$")
+_ENTRY_WITH_TITLE = re.compile(r"^(.*?)\s*<([^<>]+)>$")
+# Directives naming the Python objects a document describes (rst and MyST forms)
+_OBJECT_DIRECTIVE = re.compile(r"^\s*(?:\.\.\s+|`{3,}\s*\{|:{3,}\s*\{)(?:auto\w+|py:module|module|currentmodule|py:currentmodule|autosummary)(?:::|\})[ \t]*(\S*)", re.MULTILINE)
+# Directives reading another file into a document (rst and MyST forms)
+_INCLUDE_DIRECTIVE = re.compile(r"^\s*(?:\.\.\s+|`{3,}\s*\{|:{3,}\s*\{)(include|literalinclude)(?:::|\})[ \t]*(\S+)", re.MULTILINE)
+
+
+def find_documents(source_dir: str) -> list:
+    """
+    List the documents of a Sphinx source folder as sorted docnames ("index", "api/enmap", ...).
+    """
+    docnames = []
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS and not d.startswith("."))
+        for filename in filenames:
+            stem, suffix = os.path.splitext(filename)
+            if suffix in SOURCE_SUFFIXES:
+                rel_dir = os.path.relpath(dirpath, source_dir)
+                docnames.append(stem if rel_dir == "." else posixpath.join(rel_dir.replace(os.sep, "/"), stem))
+    return sorted(set(docnames))
+
+
+def document_path(source_dir: str, docname: str) -> str | None:
+    """
+    Path of the source file (.rst, MyST .md, .ipynb) of a document, or None if it has none (generated pages).
+    """
+    base = os.path.join(source_dir, *docname.split("/"))
+    return next((base + suffix for suffix in SOURCE_SUFFIXES if os.path.isfile(base + suffix)), None)
+
+
+def _option(line):
+    name, _, value = line.strip()[1:].partition(":")
+    return name.strip(), value.strip()
+
+
+def _new_toctree():
+    return {"caption": None, "glob": False, "hidden": False, "entries": []}
+
+
+def parse_toctrees(text: str, myst: bool = False) -> list:
+    """
+    Extract all toctree directives of a document.
+
+    Args:
+        text (str): Document source.
+        myst (bool): Parse MyST fences (``{toctree}``) instead of reStructuredText directives.
+
+    Returns:
+        list: One dict per toctree: {"caption": str | None, "glob": bool, "hidden": bool,
+        "entries": [raw entry strings]}.
+    """
+    toctrees = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        if myst:
+            match = _MYST_TOCTREE.match(lines[i])
+            if not match:
+                i += 1
+                continue
+            fence = match.group(1)
+            toctree = _new_toctree()
+            i += 1
+            in_front_matter = False
+            while i < len(lines) and not lines[i].strip().startswith(fence):
+                stripped = lines[i].strip()
+                if stripped == "---":
+                    in_front_matter = not in_front_matter
+                elif stripped.startswith(":") or in_front_matter:
+                    name, value = _option(stripped if stripped.startswith(":") else ":" + stripped)
+                    if name in ("glob", "hidden"):
+                        toctree[name] = True
+                    elif name == "caption":
+                        toctree["caption"] = value
+                elif stripped:
+                    toctree["entries"].append(stripped)
+                i += 1
+            toctrees.append(toctree)
+            i += 1
+            continue
+        match = _RST_TOCTREE.match(lines[i])
+        if not match:
+            i += 1
+            continue
+        indent = len(match.group(1))
+        toctree = _new_toctree()
+        i += 1
+        while i < len(lines):
+            line = lines[i]
+            stripped = line.strip()
+            if stripped and len(line) - len(line.lstrip()) <= indent:
+                break  # dedent: end of the directive
+            if stripped.startswith(":") and not toctree["entries"]:
+                name, value = _option(stripped)
+                if name in ("glob", "hidden"):
+                    toctree[name] = True
+                elif name == "caption":
+                    toctree["caption"] = value
+            elif stripped:
+                toctree["entries"].append(stripped)
+            i += 1
+        toctrees.append(toctree)
+    return toctrees
+
+
+def _glob(pattern, sorted_docs, compiled):
+    """Docnames matching a toctree glob, comparing only those that start with its literal prefix."""
+    regex = compiled.get(pattern)
+    if regex is None:
+        regex = compiled[pattern] = re.compile(fnmatch.translate(pattern))
+    prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+    matches = []
+    for i in range(bisect.bisect_left(sorted_docs, prefix), len(sorted_docs)):
+        docname = sorted_docs[i]
+        if not docname.startswith(prefix):
+            break
+        if regex.match(docname):
+            matches.append(docname)
+    return matches
+
+
+def _resolve(docname, entry, toctree, sorted_docs, doc_set, compiled):
+    """Resolve a toctree entry of docname to the docnames it includes."""
+    match = _ENTRY_WITH_TITLE.match(entry)
+    target = match.group(2).strip() if match else entry
+    if target == "self" or re.match(r"^[a-z][a-z0-9+.-]*://", target):
+        return []
+    for suffix in SOURCE_SUFFIXES:
+        if target.endswith(suffix):
+            target = target[:-len(suffix)]
+            break
+    if target.startswith("/"):
+        target = target.lstrip("/")
+    else:
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(docname), target))
+    if toctree["glob"] and any(c in target for c in "*?["):
+        return [d for d in _glob(target, sorted_docs, compiled) if d != docname]
+    return [target] if target in doc_set else []
+
+
+def build_toctree_graph(source_dir: str, docnames: list | None = None) -> dict:
+    """
+    Parse every document of a source folder once and resolve its toctrees.
+
+    Args:
+        source_dir (str): Sphinx source folder.
+        docnames (list, optional): Documents to consider (default: find_documents(source_dir)).
+
+    Returns:
+        dict: docname -> list of toctrees {"caption": str | None, "docnames": [included docnames]}.
+    """
+    all_docs = docnames if docnames is not None else find_documents(source_dir)
+    doc_set = set(all_docs)
+    sorted_docs = sorted(doc_set)
+    compiled = {}
+    graph = {}
+    for docname in all_docs:
+        path = None
+        for suffix in (".rst", ".md"):
+            candidate = os.path.join(source_dir, *docname.split("/")) + suffix
+            if os.path.isfile(candidate):
+                path = candidate
+                break
+        if path is None:
+            graph[docname] = []
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f" 📄  Could not read {path}: {e}")
+            graph[docname] = []
+            continue
+        toctrees = parse_toctrees(text, myst=path.endswith(".md"))
+        graph[docname] = [
+            {"caption": t["caption"], "docnames": [d for entry in t["entries"] for d in _resolve(docname, entry, t, sorted_docs, doc_set, compiled)]}
+            for t in toctrees
+        ]
+    return graph
+
+
+def _write_graph(app, exception):
+    """build-finished handler: write the environment's resolved toctrees to GRAPH_FILE."""
+    if exception is not None:
+        return
+    env = app.env
+    data = {
+        "root_doc": getattr(app.config, "root_doc", None) or getattr(app.config, "master_doc", "index"),
+        "docnames": sorted(env.found_docs),
+        "includes": {docname: list(included) for docname, included in env.toctree_includes.items()},
+    }
+    path = os.path.join(app.outdir, GRAPH_FILE)
+    partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(partial_path, path)
+
+
+def setup(app):
+    """
+    Sphinx extension entry point (see the module docstring).
+    """
+    app.connect("build-finished", _write_graph)
+    return {"parallel_read_safe": True, "parallel_write_safe": True}
+
+
+def patch_conf_py(conf_path: str) -> str:
+    """
+    Add this module to the extensions of a conf.py, by appending a block run after the original
+    configuration. Only call this on a patched copy of the Sphinx source; calling it again leaves
+    the file unchanged.
+
+    Returns:
+        str: conf_path
+    """
+    with open(conf_path, "r", encoding="utf-8") as f:
+        if CONF_MARKER in f.read():
+            return conf_path
+    with open(conf_path, "a", encoding="utf-8") as f:
+        f.write(f"\n\n{CONF_MARKER}\nextensions = list(globals().get('extensions', [])) + [{EXTENSION!r}]\n")
+    return conf_path
+
+
+def load_sphinx_graph(build_dir: str) -> tuple | None:
+    """
+    Read the resolved toctrees the extension wrote to a Sphinx build folder, if it did.
+
+    Returns:
+        tuple | None: (graph as in build_toctree_graph, root docname, all docnames), or None if the
+        build has no readable GRAPH_FILE (e.g. it failed, or ran without the extension).
+    """
+    path = os.path.join(build_dir, GRAPH_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        includes = data["includes"]
+        root_doc = data["root_doc"]
+        all_docs = data["docnames"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.info(f"Could not read the Sphinx toctrees from {path}, parsing sources instead: {e}")
+        return None
+    graph = {docname: [{"caption": None, "docnames": list(includes.get(docname, []))}] for docname in all_docs}
+    return graph, root_doc, all_docs
+
+
+def order_documents(graph: dict, root_doc: str = "index", docnames: list | None = None) -> list:
+    """
+    Order documents depth-first along the toctrees, starting at the root document.
+
+    Documents no toctree reaches follow, in sorted order, each with its own toctree subtree.
+
+    Args:
+        graph (dict): Toctree graph (see build_toctree_graph).
+        root_doc (str): Root document.
+        docnames (list, optional): All documents (default: the graph's keys).
+
+    Returns:
+        list: Every docname once, root first.
+    """
+    visited = set()
+    order = []
+    for start in [root_doc] + sorted(docnames if docnames is not None else graph):
+        stack = [start]
+        while stack:
+            docname = stack.pop()
+            if docname in visited:
+                continue
+            visited.add(docname)
+            order.append(docname)
+            children = [d for toctree in graph.get(docname, []) for d in toctree["docnames"]]
+            stack.extend(reversed(children))
+    return [d for d in order if d in graph]
+
+
+def toctree_order(source_dir: str, root_doc: str = "index", build_dir: str | None = None) -> list:
+    """
+    Order the documents of a Sphinx project as they appear in its toctrees.
+
+    Args:
+        source_dir (str): Sphinx source folder.
+        root_doc (str): Root document (overridden by the Sphinx environment when it is loaded).
+        build_dir (str, optional): Build folder of a previous sphinx-build, whose resolved toctrees
+            (see load_sphinx_graph) are preferred.
+
+    Returns:
+        list: Docnames, root first.
+    """
+    loaded = load_sphinx_graph(build_dir) if build_dir else None
+    if loaded:
+        graph, root_doc, docnames = loaded
+    else:
+        docnames = find_documents(source_dir)
+        graph = build_toctree_graph(source_dir, docnames)
+    return order_documents(graph, root_doc, docnames)
+
+
+def document_objects(text: str) -> list:
+    """
+    List the Python objects (modules, classes, functions...) a document describes with autodoc,
+    module or autosummary directives, including the entries listed in autosummary blocks.
+    """
+    names = [m.group(1) for m in _OBJECT_DIRECTIVE.finditer(text) if m.group(1)]
+    in_autosummary = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if "autosummary" in stripped and ("::" in stripped or "{" in stripped):
+            in_autosummary = True
+            continue
+        if in_autosummary:
+            if stripped and not line[:1].isspace():
+                in_autosummary = False
+            elif stripped and not stripped.startswith((":", "`", "~")):
+                names.append(stripped.lstrip("~").split()[0])
+    return names
+
+
+def included_files(source_dir: str, paths: list) -> set:
+    """
+    List the files read into documents by ``include`` and ``literalinclude`` directives, following
+    nested includes. Targets are relative to the including file, or to source_dir when they start
+    with "/"; standard includes (``<isonum.txt>``) are skipped.
+
+    Args:
+        source_dir (str): Sphinx source folder.
+        paths (list): Source files of the documents.
+
+    Returns:
+        set: Absolute paths of the included files that exist.
+    """
+    included = set()
+    stack = [os.path.abspath(p) for p in paths]
+    read = set()
+    while stack:
+        path = stack.pop()
+        if path in read:
+            continue
+        read.add(path)
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            continue
+        for match in _INCLUDE_DIRECTIVE.finditer(text):
+            directive, target = match.groups()
+            if target.startswith("<"):
+                continue
+            if target.startswith("/"):
+                target_path = os.path.join(source_dir, *target.lstrip("/").split("/"))
+            else:
+                target_path = os.path.join(os.path.dirname(path), *target.split("/"))
+            target_path = os.path.abspath(target_path)
+            if not os.path.isfile(target_path):
+                continue
+            included.add(target_path)
+            if directive == "include":
+                stack.append(target_path)
+    return included
+
+
+def select_documents(source_dir: str, patterns: list, root_doc: str = "index") -> list:
+    """
+    Select the documents matching make(only=...) patterns, with everything their toctrees include.
+
+    A pattern selects documents by docname ("api/*", "tutorial") or by the Python objects they
+    describe ("pixell.enmap" selects the pages documenting that module or its members), see
+    auxiliary.matches_selection. The root document is always kept.
+
+    Args:
+        source_dir (str): Sphinx source folder.
+        patterns (list): Selection patterns.
+        root_doc (str): Root document.
+
+    Returns:
+        list: Selected docnames, in toctree order.
+    """
+    docnames = find_documents(source_dir)
+    graph = build_toctree_graph(source_dir, docnames)
+    targets = [d for d in docnames if auxiliary.matches_selection([d, d.rsplit("/", 1)[-1]], patterns)]
+    object_patterns = [p for p in patterns if "/" not in p]
+    if object_patterns:
+        for docname in docnames:
+            path = os.path.join(source_dir, *docname.split("/"))
+            path = next((path + s for s in (".rst", ".md") if os.path.isfile(path + s)), None)
+            if path is None or docname in targets:
+                continue
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                if auxiliary.matches_selection(document_objects(f.read()), object_patterns):
+                    targets.append(docname)
+    # Toctree closure: the targets and every document reachable from them
+    selected = set()
+    stack = list(targets)
+    while stack:
+        docname = stack.pop()
+        if docname in selected:
+            continue
+        selected.add(docname)
+        stack.extend(d for toctree in graph.get(docname, []) for d in toctree["docnames"])
+    selected.add(root_doc)
+    return [d for d in order_documents(graph, root_doc, docnames) if d in selected]
@@ -0,0 +1,154 @@
+"""
+Output reuse: skip the conversion when the library has not changed since the last one.
+
+Every output written by make() gets a sidecar, <output>.meta.json, recording what it was built from:
+the installed distribution (name and version), an mtime fingerprint of the source root, the
+contextmaker version and the make() options that shape the output, plus the pipeline that ran. The
+next make() with the same options compares a fresh record with it and, when they match, returns the
+existing artifact without running Sphinx or reading any file. `--force` (make(force=True)) always
+converts. Outputs built through a fallback (minimal conf.py, docstring extraction) get no record, so
+a failure such as a timeout is retried by the next run instead of being reused.
+
+The fingerprint hashes the relative path, size and modification time of every file the conversion
+would read (the same filtered walk), so an edit, an added or a removed file invalidates the output,
+and so does upgrading the library or contextmaker.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import threading
+
+from contextmaker.converters import filters, framed_output
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the record layout changes, so older sidecars are ignored
+RECORD_FORMAT = 2
+
+
+def record_path(output_file: str) -> str:
+    """
+    Path of the freshness record of an output file.
+    """
+    return output_file + ".meta.json"
+
+
+def distribution(library_name: str) -> dict | None:
+    """
+    Installed distribution providing a top-level module, as {"name": ..., "version": ...}, or None
+    for libraries that are not installed (e.g. converted from a checkout with input_path).
+    """
+    # Most distributions are named after their package; mapping every installed distribution to
+    # its packages is much slower, so it is only done for the others (e.g. scikit-learn)
+    names = [library_name]
+    packages_distributions = getattr(importlib.metadata, "packages_distributions", None)
+    for name in names:
+        try:
+            return {"name": name, "version": importlib.metadata.version(name)}
+        except importlib.metadata.PackageNotFoundError:
+            if name == library_name and packages_distributions is not None:
+                names += packages_distributions().get(library_name, [])
+    return None
+
+
+def contextmaker_version() -> str:
+    try:
+        return importlib.metadata.version("contextmaker")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def source_fingerprint(file_filter: filters.FileFilter) -> dict:
+    """
+    Fingerprint the files a conversion reads: a hash of their relative paths, sizes and mtimes.
+
+    Returns:
+        dict: {"files": count, "sha256": hex digest}
+    """
+    digest = hashlib.sha256()
+    count = 0
+    for dirpath, _, filenames in file_filter.walk():
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{file_filter.relative(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+            count += 1
+    return {"files": count, "sha256": digest.hexdigest()}
+
+
+def record_options(extension: str, builder: str, static_autodoc=False, build_camb=False, compress=None, only=None, include=None, exclude=None, max_file_size=None, offline_intersphinx=False, dedup=False) -> dict:
+    """
+    The make() options that shape the output, as recorded by build_record() (compress as resolved
+    by framed_output.resolve_compression, builder by markdown_builder.builder_for).
+    """
+    return {
+        "extension": extension, "builder": builder, "static_autodoc": static_autodoc, "build_camb": build_camb,
+        "compress": compress, "only": only, "include": include, "exclude": exclude, "max_file_size": max_file_size,
+        "offline_intersphinx": offline_intersphinx, "dedup": dedup,
+    }
+
+
+def build_record(library_name: str, input_path: str, options: dict) -> dict:
+    """
+    Describe what an output built now from input_path with these make() options depends on.
+    """
+    file_filter = filters.FileFilter(input_path, options.get("include"), options.get("exclude"), options.get("max_file_size"))
+    return {
+        "format": RECORD_FORMAT,
+        "library": library_name,
+        "distribution": distribution(library_name),
+        "source": {"path": os.path.abspath(input_path), **source_fingerprint(file_filter)},
+        "contextmaker": contextmaker_version(),
+        "options": options,
+    }
+
+
+def read_record(output_file: str) -> dict | None:
+    try:
+        with open(record_path(output_file), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_record(output_file: str, record: dict):
+    """
+    Write the freshness record of an output file atomically.
+    """
+    path = record_path(output_file)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def remove_record(output_file: str):
+    """
+    Remove the freshness record of an output file, if any, so that it is never reused.
+    """
+    try:
+        os.remove(record_path(output_file))
+    except FileNotFoundError:
+        pass
+
+
+def fresh_output(output_file: str, record: dict) -> bool:
+    """
+    Tell whether output_file exists and was built from what record describes.
+    """
+    if not os.path.isfile(output_file):
+        return False
+    if record["options"].get("compress") and not os.path.isfile(framed_output.index_path(output_file)):
+        return False
+    previous = read_record(output_file)
+    if not isinstance(previous, dict):
+        return False
+    # The pipeline is only known after the conversion: a fresh record does not have it
+    previous.pop("pipeline", None)
+    return previous == json.loads(json.dumps(record))
@@ -0,0 +1,199 @@
+"""
+Dry-run planner: what a conversion would do and roughly what it would cost, without converting.
+
+`contextmaker <library> --plan` runs the same detection as make() (library search, find_format,
+find_sphinx_source, the filtered file walk) and prints a JSON plan: the pipeline, file, document and
+notebook counts with their sizes, the Sphinx strategy expected from the project's conf.py, the share
+of files unchanged since the previous output, and an estimated duration. Batch schedulers can use
+the estimates to spread libraries over workers.
+
+When make() would reuse the previous output instead of converting (same freshness record, see
+freshness.py, and no force, store or export), the plan says so with "reused": true and the
+estimate is only the cost of that check.
+
+The duration comes from the linear COST_MODEL below. Its rates are coarse defaults; schedulers
+that record actual durations can refit them and recompute from the reported counts.
+"""
+
+import ast
+import logging
+import os
+
+from contextmaker import freshness
+from contextmaker.converters import auxiliary, filters, framed_output, toctree
+from contextmaker.converters.mock_imports import module_available
+
+logger = logging.getLogger(__name__)
+
+# Seconds per unit of work
+COST_MODEL = {
+    "sphinx_build": 6.0,            # startup of one sphinx-build run
+    "sphinx_document": 0.2,         # reading and writing one document
+    "sphinx_source_mb": 1.5,        # autodoc over 1 MB of library source
+    "notebook": 1.5,                # one jupytext conversion
+    "python_file": 0.01,            # docstring detection and fragment writing
+    "python_mb": 1.0,               # API extraction from 1 MB of source
+    "freshness_file": 0.0001,       # fingerprinting one file to reuse the previous output
+}
+
+
+def conf_requirements(conf_path: str) -> dict:
+    """
+    List the modules a conf.py imports and the Sphinx extensions it enables, without running it.
+
+    Returns:
+        dict: {"imports": [top-level module names], "extensions": [extension names]}
+    """
+    try:
+        with open(conf_path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=conf_path)
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        logger.warning(f"Could not read {conf_path}: {e}")
+        return {"imports": [], "extensions": []}
+    imports = set()
+    extensions = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.add(node.module.split(".")[0])
+        elif isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "extensions" for t in node.targets):
+            if isinstance(node.value, (ast.List, ast.Tuple)):
+                extensions += [e.value for e in node.value.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+    return {"imports": sorted(imports), "extensions": extensions}
+
+
+def sphinx_strategy(library_name: str, sphinx_source: str, input_path: str, static_autodoc: bool = False) -> dict:
+    """
+    Predict how make() will build a Sphinx project.
+
+    The original conf.py is expected to fail, and the minimal one to be used after it, when a
+    module it imports or an extension it enables cannot be found. Only top-level packages are
+    looked up: finding "sphinx_gallery.gen_gallery" would import sphinx_gallery.
+
+    Returns:
+        dict: {"conf": "original" | "minimal", "autodoc": "import" | "static", "sphinx_builds": int,
+            "missing_modules": [names]}
+    """
+    requirements = conf_requirements(os.path.join(sphinx_source, "conf.py"))
+    search_paths = [input_path, os.path.dirname(input_path), sphinx_source]
+    missing = sorted(
+        name for name in set(requirements["imports"]) | set(requirements["extensions"])
+        if not module_available(name.split(".")[0], search_paths)
+    )
+    # CAMB is mocked and documented statically unless it is built (see make())
+    static = static_autodoc or library_name.lower() == "camb"
+    return {
+        "conf": "minimal" if missing else "original",
+        "autodoc": "static" if static else "import",
+        "sphinx_builds": 2 if missing else 1,
+        "missing_modules": missing,
+    }
+
+
+def previous_output(output_path: str, library_name: str, extension: str) -> str | None:
+    """
+    Return the existing output of a previous conversion (plain or compressed), if any.
+    """
+    path = os.path.join(output_path, f"{library_name}.{extension}")
+    for candidate in [path] + [framed_output.output_path(path, c) for c in framed_output.COMPRESSION_SUFFIXES]:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def plan(library_name, input_path=None, output_path=None, extension="txt", static_autodoc=False, only=None, include=None, exclude=None, max_file_size=None,
+         build_camb=False, compress=None, offline_intersphinx=False, dedup=True, force=False, store=None, export=False) -> dict | None:
+    """
+    Describe the conversion make() would run with the same arguments, without converting anything.
+
+    Returns:
+        dict | None: JSON-serializable plan with "library", "input_path", "pipeline", "output",
+            "reused", "files", "sphinx" (Sphinx pipeline only), "cache" and "estimated_seconds" keys;
+            None if the library cannot be found.
+    """
+    if input_path:
+        input_path = os.path.abspath(input_path)
+    else:
+        input_path = auxiliary.find_library_path(library_name)
+        if not input_path:
+            logger.error(f"❌ Library '{library_name}' not found. Try specifying the path manually with input_path.")
+            return None
+    output_path = os.path.abspath(output_path) if output_path else auxiliary.get_default_output_path()
+    from contextmaker.converters.markdown_builder import builder_for
+    compress = framed_output.resolve_compression(compress)
+    output_file = framed_output.output_path(os.path.join(output_path, f"{library_name}.{extension}"), compress)
+    record = freshness.build_record(library_name, input_path, freshness.record_options(
+        extension, builder_for(extension), static_autodoc, build_camb, compress, only, include, exclude, max_file_size,
+        offline_intersphinx, dedup,
+    ))
+    reused = not (force or store or export) and freshness.fresh_output(output_file, record)
+    file_filter = filters.FileFilter(input_path, include, exclude, max_file_size)
+    pipeline = auxiliary.find_format(input_path, file_filter)
+
+    from contextmaker.converters import nonsphinx_converter
+    counts = {"python": [0, 0], "documents": [0, 0], "notebooks": [0, 0], "other": [0, 0]}
+    mtimes = []
+    for dirpath, _, filenames in file_filter.walk():
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if only and not auxiliary.matches_selection(nonsphinx_converter.selection_names(path, input_path), only):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            suffix = os.path.splitext(filename)[1]
+            kind = {".py": "python", ".ipynb": "notebooks", ".rst": "documents", ".md": "documents"}.get(suffix, "other")
+            counts[kind][0] += 1
+            counts[kind][1] += stat.st_size
+            mtimes.append(stat.st_mtime)
+    result = {
+        "library": library_name,
+        "input_path": input_path,
+        "pipeline": pipeline,
+        "output": output_file,
+        "reused": reused,
+        "files": {kind: {"count": count, "bytes": size} for kind, (count, size) in counts.items()},
+    }
+    result["files"]["total"] = {"count": sum(c for c, _ in counts.values()), "bytes": sum(s for _, s in counts.values())}
+
+    python_mb = counts["python"][1] / 2 ** 20
+    if pipeline == "sphinx":
+        from contextmaker.converters.markdown_builder import find_notebooks_in_doc_dirs
+        sphinx_source = auxiliary.find_sphinx_source(input_path)
+        documents = toctree.select_documents(sphinx_source, only) if only else toctree.find_documents(sphinx_source)
+        # Notebooks are costed once, as jupytext conversions below
+        documents = [d for d in documents if not (toctree.document_path(sphinx_source, d) or "").endswith(".ipynb")]
+        notebooks = find_notebooks_in_doc_dirs(input_path, only, file_filter)
+        strategy = sphinx_strategy(library_name, sphinx_source, input_path, static_autodoc)
+        result["sphinx"] = {
+            "source": sphinx_source, "builder": builder_for(extension), "documents": len(documents), "notebooks": len(notebooks), **strategy,
+        }
+        seconds = (
+            strategy["sphinx_builds"] * (COST_MODEL["sphinx_build"] + COST_MODEL["sphinx_document"] * len(documents))
+            + COST_MODEL["sphinx_source_mb"] * python_mb
+            + COST_MODEL["notebook"] * len(notebooks)
+        )
+    else:
+        seconds = (
+            COST_MODEL["python_file"] * counts["python"][0]
+            + COST_MODEL["python_mb"] * python_mb
+            + COST_MODEL["notebook"] * counts["notebooks"][0]
+        )
+
+    # Files not modified since the previous output would not change it
+    previous = previous_output(output_path, library_name, extension)
+    unchanged = 0
+    if previous:
+        output_mtime = os.path.getmtime(previous)
+        unchanged = sum(1 for mtime in mtimes if mtime <= output_mtime)
+    result["cache"] = {
+        "previous_output": previous,
+        "unchanged_files": unchanged,
+        "hit_ratio": round(unchanged / len(mtimes), 3) if mtimes else 0.0,
+    }
+    if reused:
+        seconds = COST_MODEL["freshness_file"] * record["source"]["files"]
+    result["estimated_seconds"] = round(seconds, 1)
+    return result
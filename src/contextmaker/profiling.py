@@ -0,0 +1,164 @@
+"""
+Per-stage profiling of a conversion, to find out why a library converts slowly.
+
+`contextmaker <library> --profile DIR` (make(profile=DIR)) runs every pipeline stage under its own
+cProfile profiler and writes, to DIR/<library>/:
+    - <stage>.pstats: the stage's profile (python -m pstats, snakeviz, ...);
+    - <stage>.allocations.txt: with --profile-memory, the top allocations of the stage (tracemalloc
+      snapshots taken when it starts and ends) and its peak traced memory;
+    - summary.txt: wall time of every stage.
+
+Stages are "discovery" (library search, output reuse check), "format_detection", "sphinx"
+(sphinx-build runs and their fallbacks), "file_conversion" (fragments and notebooks) and
+"combine". Only one stage is profiled at a time: a nested stage pauses the one around it. The
+conversion is streamed normally, so while profiling the converted sections are collected before
+combine starts, to measure the two stages apart.
+
+Without a profile directory, stage() only reads a context variable: no profiler, no tracemalloc.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import logging
+import os
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("discovery", "format_detection", "sphinx", "file_conversion", "combine")
+
+# Allocation sites listed per stage
+TOP_ALLOCATIONS = 25
+
+_current_profiler = contextvars.ContextVar("contextmaker_profiler", default=None)
+
+
+class Profiler:
+    """
+    cProfile (and optionally tracemalloc) measurements of the stages of one conversion.
+
+    Attributes:
+        directory (str): Folder receiving the reports.
+        memory (bool): Also take tracemalloc snapshots.
+        profiles (dict): Stage -> cProfile.Profile, accumulated over every time the stage runs.
+        seconds (dict): Stage -> wall time.
+    """
+
+    def __init__(self, directory: str, memory: bool = False):
+        self.directory = directory
+        self.memory = memory
+        self.profiles = {}
+        self.seconds = {}
+        self.allocations = {}
+        self.peaks = {}
+        self.stack = []
+        self.token = None
+        self.started_tracemalloc = False
+
+    def enter(self, name: str):
+        if self.stack:
+            self.profiles[self.stack[-1][0]].disable()
+        snapshot = None
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+        self.stack.append((name, time.perf_counter(), snapshot))
+        self.profiles.setdefault(name, cProfile.Profile()).enable()
+
+    def exit(self):
+        name, start, snapshot = self.stack.pop()
+        self.profiles[name].disable()
+        self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+        if snapshot is not None:
+            self.peaks[name] = max(self.peaks.get(name, 0), tracemalloc.get_traced_memory()[1])
+            ignored = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+            after = tracemalloc.take_snapshot().filter_traces(ignored)
+            self.allocations[name] = after.compare_to(snapshot.filter_traces(ignored), "lineno")[:TOP_ALLOCATIONS]
+        if self.stack:
+            self.profiles[self.stack[-1][0]].enable()
+
+    def write(self) -> list:
+        """
+        Write the reports of the stages that ran.
+
+        Returns:
+            list: Paths of the written files.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        written = []
+        for name, profile in self.profiles.items():
+            path = os.path.join(self.directory, f"{name}.pstats")
+            profile.dump_stats(path)
+            written.append(path)
+        for name, statistics in self.allocations.items():
+            path = os.path.join(self.directory, f"{name}.allocations.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"Stage {name}: peak traced memory {self.peaks[name] / 2 ** 20:.1f} MB\n")
+                f.write(f"Top {len(statistics)} allocation sites by growth during the stage:\n\n")
+                for stat in statistics:
+                    f.write(f"{stat}\n")
+            written.append(path)
+        path = os.path.join(self.directory, "summary.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for name in sorted(self.seconds, key=lambda n: STAGES.index(n) if n in STAGES else len(STAGES)):
+                f.write(f"{name:<18}{self.seconds[name]:>10.3f}s\n")
+        written.append(path)
+        return written
+
+
+def start(directory: str | None, library_name: str, memory: bool = False) -> Profiler | None:
+    """
+    Start profiling the stages of a conversion into directory/<library_name>; None (no profiling)
+    without a directory. Pass the result to stop().
+    """
+    if not directory:
+        return None
+    profiler = Profiler(os.path.join(os.path.abspath(directory), library_name), memory)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        profiler.started_tracemalloc = True
+    profiler.token = _current_profiler.set(profiler)
+    return profiler
+
+
+def stop(profiler: Profiler | None):
+    """
+    Stop profiling and write the reports.
+    """
+    if profiler is None:
+        return
+    _current_profiler.reset(profiler.token)
+    while profiler.stack:  # a stage interrupted by an exception
+        profiler.exit()
+    if profiler.started_tracemalloc:
+        tracemalloc.stop()
+    try:
+        written = profiler.write()
+        logger.info(f" ⏱️ Stage profiles written to {profiler.directory} ({len(written)} files)")
+    except OSError as e:
+        logger.warning(f"Could not write the profiles to {profiler.directory}: {e}")
+
+
+def active() -> bool:
+    """
+    Tell whether the current conversion is being profiled.
+    """
+    return _current_profiler.get() is not None
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Profile the block as stage name when profiling is on; do nothing otherwise.
+    """
+    profiler = _current_profiler.get()
+    if profiler is None:
+        yield
+        return
+    profiler.enter(name)
+    try:
+        yield
+    finally:
+        profiler.exit()
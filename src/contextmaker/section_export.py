@@ -0,0 +1,159 @@
+"""
+Columnar export of documentation sections for embedding pipelines.
+
+Each section of a library's context (see converters/sections.py) becomes one record carrying the
+library, source file, heading path, kind, text, byte length and a SHA-256 content hash. Records are
+streamed to `<library>.sections.jsonl`, and also written to `<library>.sections.parquet` when
+pyarrow is installed (`pip install contextmaker[parquet]`), which batch jobs can read zero-copy.
+
+Every record has a "changed" flag telling whether its content hash differs from the previous
+export of the same section, so downstream jobs can skip re-embedding unchanged sections.
+"""
+
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+def section_record(library_name: str, section, previous_hashes: dict | None = None) -> dict:
+    """
+    Turn a Section into an export record.
+
+    Args:
+        library_name (str): Library the section belongs to.
+        section (Section): Section to export.
+        previous_hashes (dict, optional): Heading path (tuple) -> content hash of the previous export.
+
+    Returns:
+        dict: Record with library, source, heading_path, kind, module, symbol, title, text,
+            byte_length, content_hash and changed keys.
+    """
+    data = section.text.encode("utf-8")
+    content_hash = hashlib.sha256(data).hexdigest()
+    heading_path = list(section.heading_path or (section.title,))
+    previous = (previous_hashes or {}).get(tuple(heading_path))
+    return {
+        "library": library_name,
+        "source": section.source,
+        "heading_path": heading_path,
+        "kind": section.kind,
+        "module": section.module,
+        "symbol": section.symbol,
+        "title": section.title,
+        "text": section.text,
+        "byte_length": len(data),
+        "content_hash": content_hash,
+        "changed": previous != content_hash,
+    }
+
+
+def load_hashes(jsonl_path: str) -> dict:
+    """
+    Read the content hashes of an existing JSONL export, keyed by heading path.
+
+    Returns:
+        dict: Heading path (tuple) -> content hash; empty if the file does not exist or is unreadable.
+    """
+    hashes = {}
+    try:
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                hashes[tuple(record["heading_path"])] = record["content_hash"]
+    except (OSError, ValueError, KeyError) as e:
+        if os.path.exists(jsonl_path):
+            logger.warning(f"Could not read previous export {jsonl_path}, every section counts as changed: {e}")
+    return hashes
+
+
+def write_jsonl(jsonl_path: str, library_name: str, sections, previous_hashes: dict | None = None):
+    """
+    Stream sections to a JSONL file, one record per line, moved into place once complete.
+
+    Args:
+        jsonl_path (str): Output file.
+        library_name (str): Library the sections belong to.
+        sections (iterable): Section objects.
+        previous_hashes (dict, optional): Hashes of the previous export (see load_hashes).
+
+    Yields:
+        dict: Each record as it is written, so other writers can consume the same stream.
+    """
+    partial_path = f"{jsonl_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(partial_path, "w", encoding="utf-8") as f:
+            for section in sections:
+                record = section_record(library_name, section, previous_hashes)
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                yield record
+        os.replace(partial_path, jsonl_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+def write_parquet(parquet_path: str, records: list) -> bool:
+    """
+    Write records to a Parquet file with pyarrow, if it is installed.
+
+    Returns:
+        bool: True if the file was written, False if pyarrow is not available.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        logger.info("pyarrow is not installed, skipping the Parquet export (pip install contextmaker[parquet]).")
+        return False
+    schema = pa.schema([
+        ("library", pa.string()),
+        ("source", pa.string()),
+        ("heading_path", pa.list_(pa.string())),
+        ("kind", pa.string()),
+        ("module", pa.string()),
+        ("symbol", pa.string()),
+        ("title", pa.string()),
+        ("text", pa.large_string()),
+        ("byte_length", pa.int64()),
+        ("content_hash", pa.string()),
+        ("changed", pa.bool_()),
+    ])
+    table = pa.Table.from_pylist(records, schema=schema)
+    partial_path = f"{parquet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table, partial_path)
+    os.replace(partial_path, parquet_path)
+    return True
+
+
+def export_sections(output_path: str, library_name: str, sections) -> str:
+    """
+    Export sections as `<library>.sections.jsonl` (and `.parquet` when pyarrow is available).
+
+    Args:
+        output_path (str): Output directory.
+        library_name (str): Library the sections belong to.
+        sections (iterable): Section objects.
+
+    Returns:
+        str: Path of the JSONL file.
+    """
+    jsonl_path = os.path.join(output_path, f"{library_name}.sections.jsonl")
+    previous_hashes = load_hashes(jsonl_path)
+    # Records are only kept in memory when they are needed for the Parquet table
+    records = [] if importlib.util.find_spec("pyarrow") else None
+    count = changed = 0
+    for record in write_jsonl(jsonl_path, library_name, sections, previous_hashes):
+        count += 1
+        changed += record["changed"]
+        if records is not None:
+            records.append(record)
+    logger.info(f" 📦 Exported {count} section(s) of '{library_name}' to {jsonl_path} ({changed} changed)")
+    if records is not None:
+        write_parquet(os.path.join(output_path, f"{library_name}.sections.parquet"), records)
+    else:
+        logger.info("pyarrow is not installed, skipping the Parquet export (pip install contextmaker[parquet]).")
+    return jsonl_path
@@ -0,0 +1,173 @@
+"""
+SQLite output store with full-text search over documentation sections.
+
+Every section written to a library's context (Sphinx pages, notebooks, and one unit per module,
+class, function, ... for docstring-based libraries) is stored as a row carrying its library,
+module, symbol name and kind, and indexed with FTS5, so questions such as "which sections mention
+curvedsky.alm2map?" are answered in milliseconds across many libraries sharing one database.
+
+Usage:
+    contextmaker pixell --store ~/contexts.db
+    contextmaker search ~/contexts.db "curvedsky.alm2map" --library pixell
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    library TEXT NOT NULL,
+    module TEXT,
+    symbol TEXT,
+    kind TEXT NOT NULL,
+    title TEXT NOT NULL,
+    source TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_library ON sections(library);
+CREATE INDEX IF NOT EXISTS sections_symbol ON sections(symbol);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+    title, module, symbol, text,
+    content='sections', content_rowid='id',
+    tokenize="unicode61 tokenchars '_'"
+);
+CREATE TRIGGER IF NOT EXISTS sections_ai AFTER INSERT ON sections BEGIN
+    INSERT INTO sections_fts(rowid, title, module, symbol, text)
+    VALUES (new.id, new.title, new.module, new.symbol, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_ad AFTER DELETE ON sections BEGIN
+    INSERT INTO sections_fts(sections_fts, rowid, title, module, symbol, text)
+    VALUES ('delete', old.id, old.title, old.module, old.symbol, old.text);
+END;
+"""
+
+RESULT_COLUMNS = ["library", "module", "symbol", "kind", "title", "source"]
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open (and create if needed) a section store.
+
+    WAL journaling lets readers query the store while a library is being rewritten.
+    """
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def write_sections(db_path: str, library_name: str, sections: list) -> int:
+    """
+    Replace the sections of a library in the store, in a single transaction.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        library_name (str): Library the sections belong to.
+        sections (list): Section objects (see converters/sections.py).
+
+    Returns:
+        int: Number of sections written.
+    """
+    connection = connect(db_path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM sections WHERE library = ?", (library_name,))
+            connection.executemany(
+                "INSERT INTO sections (library, module, symbol, kind, title, source, text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(library_name, s.module, s.symbol, s.kind, s.title, s.source, s.text) for s in sections],
+            )
+    finally:
+        connection.close()
+    logger.info(f" 🗄️ Stored {len(sections)} section(s) of '{library_name}' in {db_path}")
+    return len(sections)
+
+
+def _fts_query(query: str) -> str:
+    # Each term becomes a quoted phrase, so dotted names ("curvedsky.alm2map") and punctuation
+    # are matched literally instead of being parsed as FTS5 syntax
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def search(db_path: str, query: str, library: str | None = None, kind: str | None = None, limit: int = 20, raw: bool = False) -> list:
+    """
+    Full-text search of the store, best matches first.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query (str): Terms that must all appear (dotted names allowed); FTS5 syntax if raw=True.
+        library (str, optional): Restrict to one library.
+        kind (str, optional): Restrict to one section kind ("page", "class", "function", ...).
+        limit (int): Maximum number of results.
+        raw (bool): Pass the query to FTS5 unchanged (operators, column filters, prefixes...).
+
+    Returns:
+        list: Dicts with library, module, symbol, kind, title, source and a text snippet.
+    """
+    sql = (
+        "SELECT s.library, s.module, s.symbol, s.kind, s.title, s.source, "
+        "snippet(sections_fts, 3, '[', ']', ' … ', 12) AS snippet "
+        "FROM sections_fts JOIN sections s ON s.id = sections_fts.rowid WHERE sections_fts MATCH ?"
+    )
+    params = [query if raw else _fts_query(query)]
+    if library:
+        sql += " AND s.library = ?"
+        params.append(library)
+    if kind:
+        sql += " AND s.kind = ?"
+        params.append(kind)
+    sql += " ORDER BY bm25(sections_fts, 10.0, 2.0, 5.0, 1.0) LIMIT ?"
+    params.append(limit)
+    connection = connect(db_path)
+    try:
+        return [dict(row) for row in connection.execute(sql, params)]
+    finally:
+        connection.close()
+
+
+def find_symbol(db_path: str, name: str, library: str | None = None) -> list:
+    """
+    Look a symbol up by its qualified name or any dotted suffix of it (e.g. "curvedsky.alm2map").
+
+    Returns:
+        list: Dicts with the result columns and the section text.
+    """
+    sql = f"SELECT {', '.join(RESULT_COLUMNS)}, text FROM sections WHERE (symbol = ? OR symbol LIKE ? ESCAPE '\\')"
+    escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    params = [name, f"%.{escaped}"]
+    if library:
+        sql += " AND library = ?"
+        params.append(library)
+    connection = connect(db_path)
+    try:
+        return [dict(row) for row in connection.execute(sql + " ORDER BY library, symbol", params)]
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="contextmaker search", description="Search a section store written with --store.")
+    parser.add_argument('database', help='Path to the SQLite store')
+    parser.add_argument('query', help='Search terms, or a symbol name with --symbol')
+    parser.add_argument('--library', '-l', help='Restrict the search to one library')
+    parser.add_argument('--kind', '-k', help='Restrict the search to one section kind (page, module, class, function...)')
+    parser.add_argument('--limit', '-n', type=int, default=20, help='Maximum number of results (default: 20)')
+    parser.add_argument('--symbol', action='store_true', help='Look up a symbol by (suffix of) its qualified name and print its section')
+    parser.add_argument('--raw', action='store_true', help='Use FTS5 query syntax as-is')
+    args = parser.parse_args(argv)
+    if args.symbol:
+        for row in find_symbol(args.database, args.query, args.library):
+            source = f" ({row['source']})" if row["source"] else ""
+            print(f"[{row['library']}] {row['kind']} {row['symbol']}{source}\n\n{row['text']}\n")
+        return
+    for row in search(args.database, args.query, args.library, args.kind, args.limit, args.raw):
+        name = row["symbol"] or row["title"]
+        print(f"[{row['library']}] {row['kind']} {name}: {row['snippet']}")
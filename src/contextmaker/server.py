@@ -0,0 +1,254 @@
+"""
+Long-running ContextMaker daemon.
+
+`contextmaker serve` keeps the converters imported and the library lookups cached, and accepts
+build requests over a Unix socket. Each request is one JSON line; identical requests arriving
+while a build is running share that build instead of starting another one. When a daemon is
+running, make() sends its request there instead of converting in-process.
+
+Protocol (one JSON object per line):
+    request:  {"action": "make", "library_name": "pixell", "output_path": ..., "stream": false, ...}
+    response: {"status": "ok", "output_file": "/path/pixell.txt"}  (followed by the file content if "stream")
+              {"status": "error", "error": "..."}
+    other actions: "ping", "shutdown".
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from contextmaker.converters import auxiliary
+
+logger = logging.getLogger(__name__)
+
+# make() keyword arguments a client may forward to the daemon
+MAKE_OPTIONS = ["output_path", "input_path", "extension", "static_autodoc", "build_camb", "store", "export", "compress", "only", "include", "exclude", "max_file_size", "limits", "offline_intersphinx", "dedup", "force"]
+
+
+def default_socket_path() -> str:
+    """
+    Socket the daemon listens on: $CONTEXTMAKER_SOCKET, or serve.sock in the contextmaker cache.
+    """
+    return os.environ.get("CONTEXTMAKER_SOCKET") or os.path.join(auxiliary.cache_root(), "serve.sock")
+
+
+def _send_json(sock_file, payload):
+    sock_file.write((json.dumps(payload) + "\n").encode("utf-8"))
+    sock_file.flush()
+
+
+def send_request(payload: dict, socket_path: str | None = None, timeout: float | None = None):
+    """
+    Send one request to the daemon and return its JSON response.
+
+    Args:
+        payload (dict): Request, see the module docstring.
+        socket_path (str, optional): Daemon socket. Defaults to default_socket_path().
+        timeout (float, optional): Socket timeout in seconds (None waits for the build to finish).
+
+    Returns:
+        tuple: (response dict, streamed content as str or None).
+
+    Raises:
+        OSError: If the daemon cannot be reached.
+    """
+    socket_path = socket_path or default_socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as sock_file:
+            _send_json(sock_file, payload)
+            response = json.loads(sock_file.readline().decode("utf-8"))
+            content = None
+            if payload.get("stream") and response.get("status") == "ok":
+                content = sock_file.read().decode("utf-8")
+    return response, content
+
+
+def daemon_available(socket_path: str | None = None) -> bool:
+    """
+    Tell whether a daemon answers on the socket. Stale socket files count as unavailable.
+    """
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        response, _ = send_request({"action": "ping"}, socket_path, timeout=2)
+    except (OSError, ValueError):
+        return False
+    return response.get("status") == "ok"
+
+
+def request_build(library_name: str, socket_path: str | None = None, stream: bool = False, **make_kwargs):
+    """
+    Ask the daemon to run make() and wait for the result.
+
+    Paths are made absolute on the client side, since the daemon runs in another directory.
+
+    Args:
+        library_name (str): Library to convert.
+        socket_path (str, optional): Daemon socket. Defaults to default_socket_path().
+        stream (bool): Return the generated content instead of the output path.
+        **make_kwargs: Options of make() listed in MAKE_OPTIONS.
+
+    Returns:
+        str | None: Output path (or content if stream), None if the daemon reported a failure.
+    """
+    payload = {"action": "make", "library_name": library_name, "stream": stream}
+    for key in MAKE_OPTIONS:
+        value = make_kwargs.get(key)
+        if value is not None:
+            payload[key] = os.path.abspath(value) if key in ("output_path", "input_path", "store") else value
+    response, content = send_request(payload, socket_path)
+    if response.get("status") != "ok":
+        logger.error(f" ❌ Daemon build failed for '{library_name}': {response.get('error')}")
+        return None
+    logger.info(f" ✅ Daemon build completed. Output: {response['output_file']}")
+    return content if stream else response["output_file"]
+
+
+class BuildService:
+    """
+    Runs make() on a thread pool, sharing one build between identical concurrent requests.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="contextmaker-build")
+        self.lock = threading.Lock()
+        self.inflight = {}
+
+    def submit(self, library_name: str, options: dict):
+        """
+        Queue a build, or join the identical build already queued or running.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the output path (or None on failure).
+        """
+        key = json.dumps([library_name, options], sort_keys=True)
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                logger.info(f"Joining in-flight build of '{library_name}'")
+                return future
+            future = self.executor.submit(self._build, library_name, options)
+            self.inflight[key] = future
+            future.add_done_callback(lambda _f: self._forget(key))
+            return future
+
+    def _forget(self, key):
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    @staticmethod
+    def _build(library_name, options):
+        from contextmaker.contextmaker import make
+        return make(library_name, use_daemon=False, **options)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+        except ValueError as e:
+            _send_json(self.wfile, {"status": "error", "error": f"invalid request: {e}"})
+            return
+        action = request.get("action")
+        if action == "ping":
+            _send_json(self.wfile, {"status": "ok", "pid": os.getpid()})
+        elif action == "shutdown":
+            _send_json(self.wfile, {"status": "ok"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif action == "make":
+            self._handle_make(request)
+        else:
+            _send_json(self.wfile, {"status": "error", "error": f"unknown action: {action!r}"})
+
+    def _handle_make(self, request):
+        options = {key: request[key] for key in MAKE_OPTIONS if key in request}
+        try:
+            output_file = self.server.service.submit(request["library_name"], options).result()
+        except BaseException as e:  # make() may sys.exit() when the library cannot be installed
+            _send_json(self.wfile, {"status": "error", "error": f"{type(e).__name__}: {e}"})
+            return
+        if output_file is None:
+            _send_json(self.wfile, {"status": "error", "error": "conversion failed, see the daemon log"})
+            return
+        _send_json(self.wfile, {"status": "ok", "output_file": output_file})
+        if request.get("stream"):
+            with open(output_file, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    self.wfile.write(chunk)
+
+
+class ContextMakerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server dispatching requests to a BuildService.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: BuildService):
+        self.service = service
+        super().__init__(socket_path, _RequestHandler)
+
+
+def warm_up():
+    """
+    Import the converters and text libraries once, so requests do not pay for it.
+    """
+    from contextmaker.converters import markdown_builder, nonsphinx_converter, api_extractor  # noqa: F401
+    try:
+        import markdown  # noqa: F401
+        import html2text  # noqa: F401
+    except ImportError:
+        logger.warning("markdown/html2text not installed; text output will not be available.")
+    auxiliary.enable_library_path_cache()
+
+
+def serve(socket_path: str | None = None, max_workers: int = 2):
+    """
+    Run the daemon until it receives a "shutdown" request or is interrupted.
+
+    Args:
+        socket_path (str, optional): Socket to listen on. Defaults to default_socket_path().
+        max_workers (int): Number of builds running concurrently (others are queued).
+    """
+    socket_path = socket_path or default_socket_path()
+    if daemon_available(socket_path):
+        raise RuntimeError(f"A contextmaker daemon is already running on {socket_path}")
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # stale socket from a daemon that did not exit cleanly
+    warm_up()
+    service = BuildService(max_workers)
+    with ContextMakerServer(socket_path, service) as server:
+        logger.info(f" 🚀 contextmaker daemon listening on {socket_path} (pid {os.getpid()})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.shutdown()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+    logger.info("contextmaker daemon stopped.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="contextmaker serve", description="Run ContextMaker as a daemon accepting build requests on a Unix socket.")
+    parser.add_argument('--socket', help='Socket path (default: $CONTEXTMAKER_SOCKET or ~/.cache/contextmaker/serve.sock)')
+    parser.add_argument('--workers', type=int, default=2, help='Number of concurrent builds (default: 2)')
+    parser.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    args = parser.parse_args(argv)
+    if args.stop:
+        send_request({"action": "shutdown"}, args.socket, timeout=5)
+        return
+    serve(args.socket, args.workers)
@@ -0,0 +1,260 @@
+"""
+Watch mode: regenerate a library's context whenever its sources or docs change.
+
+`contextmaker <library> --watch` builds the context once, then monitors the input tree (inotify
+on Linux, stat polling elsewhere). Bursts of changes are debounced into one rebuild. Every build
+is a normal make() run with the same options, so watch mode writes exactly what a one-off
+conversion writes; it only redoes the affected work (see converters/incremental.py): non-Sphinx
+fragments are regenerated per changed file, Sphinx projects reuse their build environment
+(sphinx-build re-reads edited documents only) and notebooks are reconverted when modified.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+
+from contextmaker.converters import auxiliary, filters, incremental
+
+logger = logging.getLogger(__name__)
+
+# Sphinx build outputs, never watched (on top of what the library's file filter excludes)
+IGNORED_DIRS = {'_build'}
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _ignored_dir(path, file_filter, ignored):
+    return os.path.basename(path) in IGNORED_DIRS or path in ignored or file_filter.excludes_dir(path)
+
+
+def _walk_dirs(root, file_filter, ignored):
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not _ignored_dir(os.path.join(dirpath, d), file_filter, ignored)]
+        yield dirpath
+
+
+class PollingMonitor:
+    """
+    Detect changes by comparing (mtime, size) snapshots of the tree, leaving out what file_filter excludes.
+    """
+
+    def __init__(self, root, file_filter, ignored=()):
+        self.root = root
+        self.file_filter = file_filter
+        self.ignored = set(ignored)
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for dirpath in _walk_dirs(self.root, self.file_filter, self.ignored):
+            for entry in os.scandir(dirpath):
+                if entry.is_file(follow_symlinks=False) and not self.file_filter.excludes_file(entry.path):
+                    stat = entry.stat(follow_symlinks=False)
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        """
+        Wait for timeout seconds and return the paths added, modified or removed meanwhile.
+        """
+        time.sleep(timeout)
+        snapshot = self._scan()
+        changed = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+        changed |= set(self.snapshot) - set(snapshot)
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyMonitor:
+    """
+    Detect changes with Linux inotify (through libc, no extra dependency), watching every folder
+    file_filter does not exclude.
+    """
+
+    def __init__(self, root, file_filter, ignored=()):
+        self.root = root
+        self.file_filter = file_filter
+        self.ignored = set(ignored)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        for dirpath in _walk_dirs(root, file_filter, self.ignored):
+            self._add_watch(dirpath)
+
+    def _add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            logger.warning(f"Cannot watch {path} (errno {ctypes.get_errno()}), changes there will be missed.")
+        else:
+            self.watches[wd] = path
+
+    def poll(self, timeout):
+        """
+        Wait up to timeout seconds for events and return the paths they concern.
+        A queue overflow reports the root folder, meaning "rescan everything".
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.add(self.root)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            folder = self.watches.get(wd)
+            if folder is None:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if _ignored_dir(path, self.file_filter, self.ignored):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # A new (or moved-in) folder: watch it and report what it already contains
+                    for dirpath in _walk_dirs(path, self.file_filter, self.ignored):
+                        self._add_watch(dirpath)
+                        changed.update(e.path for e in os.scandir(dirpath) if e.is_file() and not self.file_filter.excludes_file(e.path))
+                else:
+                    changed.add(path)
+                continue
+            if not self.file_filter.excludes_file(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_monitor(root, file_filter=None, ignored=(), polling=False):
+    """
+    Return an InotifyMonitor when inotify is usable, a PollingMonitor otherwise (or if polling=True).
+    file_filter (default: the library's default filter, see filters.py) decides what is watched.
+    """
+    file_filter = filters.default_filter(root, file_filter)
+    if not polling and hasattr(os, "O_CLOEXEC") and os.uname().sysname == "Linux":
+        try:
+            return InotifyMonitor(root, file_filter, ignored)
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify unavailable ({e}), falling back to polling.")
+    return PollingMonitor(root, file_filter, ignored)
+
+
+def wait_for_changes(monitor, debounce=0.5, interval=1.0):
+    """
+    Block until something changes, then keep collecting until debounce seconds pass without events.
+
+    Returns:
+        set: Changed paths (the monitor root means the whole tree must be rescanned).
+    """
+    changed = set()
+    while not changed:
+        changed = monitor.poll(interval)
+    while True:
+        more = monitor.poll(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def watch(library_name, output_path=None, input_path=None, extension='txt', static_autodoc=False, build_camb=False, store=None, export=False, compress=None, only=None, include=None, exclude=None, max_file_size=None, limits=None, offline_intersphinx=False, dedup=True, debounce=0.5, interval=1.0, polling=False, max_rebuilds=None):
+    """
+    Build a library's context, then rebuild it after every change of its input tree.
+
+    Every build runs make() with the given options, so the output is the one `contextmaker
+    <library>` writes; the work kept between rebuilds (see converters/incremental.py) makes the
+    rebuilds incremental.
+
+    Args:
+        library_name (str): Name of the library.
+        output_path, input_path, extension, static_autodoc, build_camb, store, export, compress, only,
+        include, exclude, max_file_size, limits, offline_intersphinx, dedup: As for make().
+        debounce (float, optional): Quiet time (seconds) closing a burst of changes.
+        interval (float, optional): Polling interval (seconds) while idle.
+        polling (bool, optional): Use stat polling even where inotify is available.
+        max_rebuilds (int, optional): Stop after this many rebuilds (runs until interrupted by default).
+
+    Returns:
+        str | None: Path of the last published output, or None if the library was not found or its
+        first build failed.
+    """
+    from contextmaker.contextmaker import find_input_path, make
+    input_path = find_input_path(library_name, input_path)
+    if not input_path:
+        return None
+    output_path = os.path.abspath(output_path) if output_path else auxiliary.get_default_output_path()
+    os.makedirs(output_path, exist_ok=True)
+    options = dict(
+        output_path=output_path, input_path=input_path, extension=extension, static_autodoc=static_autodoc,
+        build_camb=build_camb, store=store, export=export, compress=compress, only=only, include=include,
+        exclude=exclude, max_file_size=max_file_size, limits=limits, offline_intersphinx=offline_intersphinx,
+        dedup=dedup, force=True, use_daemon=False,
+    )
+
+    # One filter for everything: what is watched, format detection and the conversions
+    file_filter = filters.FileFilter(input_path, include, exclude, max_file_size)
+
+    with auxiliary.run_workspace(output_path, library_name) as state_dir:
+        state = incremental.IncrementalState(state_dir, file_filter)
+
+        def build():
+            with incremental.applied(state):
+                return make(library_name, **options)
+
+        output_file = build()
+        if output_file is None:
+            return None
+        logger.info(f" ✅ Initial build published: {output_file}")
+
+        monitor = create_monitor(input_path, file_filter, ignored={output_path, state_dir}, polling=polling)
+        logger.info(f" 👀 Watching {input_path} ({type(monitor).__name__}), press Ctrl+C to stop.")
+        rebuilds = 0
+        try:
+            while max_rebuilds is None or rebuilds < max_rebuilds:
+                changed = wait_for_changes(monitor, debounce, interval)
+                start = time.monotonic()
+                logger.info(f" 🔄 {len(changed)} change(s) detected, rebuilding...")
+                try:
+                    rebuilt = build()
+                    if rebuilt is None:
+                        logger.error(" ❌ Rebuild failed, keeping the previous output")
+                    else:
+                        output_file = rebuilt
+                        logger.info(f" ✅ Published {output_file} in {time.monotonic() - start:.1f}s")
+                except Exception as e:
+                    logger.exception(f" ❌ Rebuild failed, keeping the previous output: {e}")
+                rebuilds += 1
+        except KeyboardInterrupt:
+            logger.info("Watch mode stopped.")
+        finally:
+            monitor.close()
+    return output_file
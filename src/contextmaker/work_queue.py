@@ -0,0 +1,399 @@
+"""
+Work queue on a shared filesystem, to spread batch builds across cluster nodes without a broker.
+
+Every node sharing the queue folder (NFS, Lustre, ...) runs one or more workers:
+
+    contextmaker worker --queue /shared/queue --submit pixell camb healpy \\
+        --options '{"output_path": "/shared/contexts"}'
+    contextmaker worker --queue /shared/queue            (on every node; --drain exits once empty)
+    contextmaker worker --queue /shared/queue --status
+
+A job is a JSON file moving between the folders of the queue:
+    pending/<job>.json               submitted, waiting for a worker;
+    running/<job>@<worker>.json      claimed by a worker, which touches it every HEARTBEAT_INTERVAL;
+    done/<job>.json                  the job with its output file, worker, host and duration;
+    failed/<job>.json                the job with its error and traceback.
+workers/<worker>.json holds each worker's heartbeat (host, pid, current job).
+
+Jobs are claimed with a rename to a name unique to the worker: rename is atomic on POSIX and NFS
+filesystems, so exactly one worker gets each job, and a worker checks that its target exists
+when a retried NFS rename reports the source missing. A running job whose heartbeat is older than
+STALE_AFTER (its node died) is taken over by another worker the same way, up to MAX_ATTEMPTS
+claims. Heartbeat ages are compared with the filesystem's clock, so node clocks need not agree.
+Jobs run the normal make() pipeline in the worker process.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import traceback
+
+from contextmaker import server
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DIRS = ("pending", "running", "done", "failed", "workers")
+
+# Seconds between two heartbeats of a running job
+HEARTBEAT_INTERVAL = 30
+
+# Seconds without heartbeat after which a running job is considered abandoned
+STALE_AFTER = 10 * HEARTBEAT_INTERVAL
+
+# Claims of a job (first run plus takeovers) before it is marked as failed
+MAX_ATTEMPTS = 3
+
+# Seconds between two looks at an empty queue
+POLL_INTERVAL = 10
+
+
+def _write_json(path: str, data: dict):
+    partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(partial_path, path)
+
+
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _job_files(folder: str) -> list:
+    try:
+        return sorted(name for name in os.listdir(folder) if name.endswith(".json"))
+    except FileNotFoundError:
+        return []
+
+
+def _rename(source: str, target: str) -> bool:
+    """
+    Atomically move source to target; tell whether this call did it.
+    """
+    try:
+        os.rename(source, target)
+    except FileNotFoundError:
+        # A retransmitted NFS rename fails once the first attempt has succeeded
+        return os.path.exists(target)
+    except OSError:
+        return False
+    return True
+
+
+def filesystem_time(path: str) -> float:
+    """
+    Current time according to the filesystem holding path: the mtime of path, rewritten now.
+    """
+    with open(path, "a", encoding="utf-8"):
+        pass
+    os.utime(path)
+    return os.stat(path).st_mtime
+
+
+def job_id(library_name: str, options: dict) -> str:
+    """
+    Identifier of a job: the library name and a hash of its options, so identical submissions share a job.
+    """
+    digest = hashlib.sha1(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+    return f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', library_name)}-{digest}"
+
+
+def init_queue(queue_dir: str) -> str:
+    """
+    Create the folders of a queue (if needed).
+
+    Returns:
+        str: Absolute path of the queue.
+    """
+    queue_dir = os.path.abspath(queue_dir)
+    for name in QUEUE_DIRS:
+        os.makedirs(os.path.join(queue_dir, name), exist_ok=True)
+    return queue_dir
+
+
+def submit(queue_dir: str, library_names: list, options: dict | None = None) -> list:
+    """
+    Add one job per library to the queue.
+
+    A job already pending or running is left alone; one that is done or failed is submitted again.
+
+    Args:
+        queue_dir (str): Queue folder.
+        library_names (list): Libraries to convert.
+        options (dict, optional): make() options of every job (see server.MAKE_OPTIONS). Paths are
+            made absolute, since workers run in other directories.
+
+    Returns:
+        list: Identifiers of the submitted jobs.
+    """
+    queue_dir = init_queue(queue_dir)
+    unknown = set(options or {}) - set(server.MAKE_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown make() options: {sorted(unknown)}")
+    options = {
+        key: os.path.abspath(value) if key in ("output_path", "input_path", "store") else value
+        for key, value in (options or {}).items() if value is not None
+    }
+    running = {name.split("@", 1)[0] for name in _job_files(os.path.join(queue_dir, "running"))}
+    submitted = []
+    for library_name in library_names:
+        identifier = job_id(library_name, options)
+        pending_path = os.path.join(queue_dir, "pending", f"{identifier}.json")
+        if identifier in running or os.path.exists(pending_path):
+            logger.info(f"Job {identifier} is already queued")
+            continue
+        _write_json(pending_path, {"id": identifier, "library_name": library_name, "options": options, "attempts": 0, "submitted": time.time()})
+        for folder in ("done", "failed"):
+            try:
+                os.remove(os.path.join(queue_dir, folder, f"{identifier}.json"))
+            except FileNotFoundError:
+                pass
+        submitted.append(identifier)
+    logger.info(f" 📥 Submitted {len(submitted)} job(s) to {queue_dir}")
+    return submitted
+
+
+def retry_failed(queue_dir: str) -> list:
+    """
+    Move the failed jobs back to pending, with their attempts reset.
+
+    Returns:
+        list: Identifiers of the resubmitted jobs.
+    """
+    queue_dir = init_queue(queue_dir)
+    retried = []
+    for name in _job_files(os.path.join(queue_dir, "failed")):
+        path = os.path.join(queue_dir, "failed", name)
+        job = _read_json(path)
+        if job is None:
+            continue
+        job = {key: job[key] for key in ("id", "library_name", "options", "submitted") if key in job}
+        job["attempts"] = 0
+        _write_json(os.path.join(queue_dir, "pending", name), job)
+        os.remove(path)
+        retried.append(job["id"])
+    return retried
+
+
+def status(queue_dir: str) -> dict:
+    """
+    Summarize a queue.
+
+    Returns:
+        dict: Job counts per state, and every running job with its worker and heartbeat age in seconds.
+    """
+    queue_dir = init_queue(queue_dir)
+    summary = {name: len(_job_files(os.path.join(queue_dir, name))) for name in ("pending", "running", "done", "failed")}
+    probe = os.path.join(queue_dir, "workers", f".clock.{os.getpid()}.{threading.get_ident()}")
+    now = filesystem_time(probe)
+    os.remove(probe)
+    summary["jobs"] = []
+    for name in _job_files(os.path.join(queue_dir, "running")):
+        identifier, _, worker_id = name[:-len(".json")].partition("@")
+        try:
+            age = now - os.stat(os.path.join(queue_dir, "running", name)).st_mtime
+        except FileNotFoundError:
+            continue
+        summary["jobs"].append({"id": identifier, "worker": worker_id, "heartbeat_age": round(age, 1)})
+    return summary
+
+
+class Worker:
+    """
+    Claims jobs from a queue and runs them with make(), one at a time.
+
+    Attributes:
+        queue_dir (str): Queue folder.
+        worker_id (str): Unique name of the worker (host and pid by default).
+        stale_after (float): Seconds without heartbeat after which a running job is taken over.
+    """
+
+    def __init__(self, queue_dir: str, worker_id: str | None = None, stale_after: float = STALE_AFTER):
+        self.queue_dir = init_queue(queue_dir)
+        self.host = socket.gethostname()
+        self.worker_id = re.sub(r"[^A-Za-z0-9_.-]+", "_", worker_id or f"{self.host}-{os.getpid()}")
+        self.stale_after = stale_after
+        self.heartbeat_path = os.path.join(self.queue_dir, "workers", f"{self.worker_id}.json")
+
+    def folder(self, name: str) -> str:
+        return os.path.join(self.queue_dir, name)
+
+    def beat(self, job: dict | None = None):
+        """
+        Write the worker's heartbeat file.
+        """
+        _write_json(self.heartbeat_path, {
+            "worker": self.worker_id, "host": self.host, "pid": os.getpid(),
+            "job": job["id"] if job else None, "time": time.time(),
+        })
+
+    def claim(self) -> tuple | None:
+        """
+        Claim the next pending job, or else take over an abandoned running one.
+
+        Returns:
+            tuple | None: (job, path of the claimed file), or None if there is nothing to do.
+        """
+        for name in _job_files(self.folder("pending")):
+            claimed = os.path.join(self.folder("running"), f"{name[:-len('.json')]}@{self.worker_id}.json")
+            if _rename(os.path.join(self.folder("pending"), name), claimed):
+                return self._start(claimed)
+        self.beat()
+        now = os.stat(self.heartbeat_path).st_mtime
+        for name in _job_files(self.folder("running")):
+            path = os.path.join(self.folder("running"), name)
+            identifier, _, owner = name[:-len(".json")].partition("@")
+            try:
+                if owner == self.worker_id or now - os.stat(path).st_mtime < self.stale_after:
+                    continue
+            except FileNotFoundError:
+                continue
+            claimed = os.path.join(self.folder("running"), f"{identifier}@{self.worker_id}.json")
+            if _rename(path, claimed):
+                logger.warning(f" ⚠️ Taking over job {identifier}: no heartbeat from {owner} for {now - os.stat(claimed).st_mtime:.0f}s")
+                job = self._start(claimed)
+                if job is not None:
+                    return job
+        return None
+
+    def _start(self, claimed: str) -> tuple | None:
+        job = _read_json(claimed)
+        if job is None:
+            logger.error(f" ❌ Unreadable job file {claimed}, moved to failed")
+            _rename(claimed, os.path.join(self.folder("failed"), os.path.basename(claimed).split("@", 1)[0] + ".json"))
+            return None
+        job["attempts"] = job.get("attempts", 0) + 1
+        if job["attempts"] > MAX_ATTEMPTS:
+            self._finish(job, claimed, "failed", {"error": f"abandoned by its workers {MAX_ATTEMPTS} times"})
+            return None
+        _write_json(claimed, job)
+        return job, claimed
+
+    def _finish(self, job: dict, claimed: str, state: str, result: dict):
+        record = dict(job, **result, worker=self.worker_id, host=self.host, finished=time.time())
+        _write_json(os.path.join(self.folder(state), f"{job['id']}.json"), record)
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            logger.warning(f" ⚠️ Job {job['id']} was taken over by another worker while it ran here")
+
+    def _heartbeat(self, job: dict, claimed: str, stop: threading.Event):
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                os.utime(claimed)
+                self.beat(job)
+            except OSError as e:
+                logger.warning(f"Could not update the heartbeat of job {job['id']}: {e}")
+
+    def run(self, job: dict, claimed: str) -> bool:
+        """
+        Run a claimed job with make() and record its result in done/ or failed/.
+
+        Returns:
+            bool: Whether the conversion succeeded.
+        """
+        from contextmaker.contextmaker import make
+        logger.info(f" 🔨 Worker {self.worker_id} running job {job['id']} ({job['library_name']}, attempt {job['attempts']})")
+        self.beat(job)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, claimed, stop), daemon=True)
+        heartbeat.start()
+        start = time.time()
+        try:
+            output_file = make(job["library_name"], use_daemon=False, **job.get("options", {}))
+        except KeyboardInterrupt:
+            # Hand the job back to the other workers
+            _rename(claimed, os.path.join(self.folder("pending"), f"{job['id']}.json"))
+            raise
+        except (Exception, SystemExit) as e:  # make() may sys.exit() when the library cannot be installed
+            self._finish(job, claimed, "failed", {"error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc(), "started": start, "seconds": time.time() - start})
+            return False
+        finally:
+            stop.set()
+            heartbeat.join()
+        if output_file is None:
+            self._finish(job, claimed, "failed", {"error": "conversion failed, see the worker log", "started": start, "seconds": time.time() - start})
+            return False
+        self._finish(job, claimed, "done", {"output_file": output_file, "started": start, "seconds": time.time() - start})
+        logger.info(f" ✅ Job {job['id']} done in {time.time() - start:.1f}s: {output_file}")
+        return True
+
+    def work(self, drain: bool = False, max_jobs: int | None = None, poll_interval: float = POLL_INTERVAL) -> int:
+        """
+        Run jobs until interrupted.
+
+        Args:
+            drain (bool): Return once no job is pending or running instead of waiting for new ones.
+            max_jobs (int, optional): Return after this many jobs.
+            poll_interval (float): Seconds between two looks at an empty queue.
+
+        Returns:
+            int: Number of jobs run.
+        """
+        server.warm_up()
+        logger.info(f" 🚀 contextmaker worker {self.worker_id} on queue {self.queue_dir}")
+        count = 0
+        try:
+            while max_jobs is None or count < max_jobs:
+                claimed = self.claim()
+                if claimed is None:
+                    if drain and not _job_files(self.folder("running")):
+                        break
+                    self.beat()
+                    time.sleep(poll_interval)
+                    continue
+                self.run(*claimed)
+                count += 1
+        finally:
+            try:
+                os.remove(self.heartbeat_path)
+            except FileNotFoundError:
+                pass
+        logger.info(f"Worker {self.worker_id} stopped after {count} job(s).")
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="contextmaker worker", description="Run conversions from a work queue shared by several nodes through a filesystem.")
+    parser.add_argument('--queue', required=True, help='Queue folder, on a filesystem shared by the workers')
+    parser.add_argument('--submit', nargs='+', metavar='LIBRARY', help='Add jobs for these libraries instead of working')
+    parser.add_argument('--submit-file', help='Add jobs for the libraries listed in this file, one per line')
+    parser.add_argument('--options', default='{}', help='With --submit: make() options of the jobs as JSON, e.g. \'{"output_path": "/shared/contexts", "extension": "md"}\'')
+    parser.add_argument('--status', action='store_true', help='Print the state of the queue as JSON')
+    parser.add_argument('--retry-failed', action='store_true', help='Move the failed jobs back to pending')
+    parser.add_argument('--drain', action='store_true', help='Exit once no job is pending or running')
+    parser.add_argument('--max-jobs', type=int, help='Exit after this many jobs')
+    parser.add_argument('--worker-id', help='Worker name (default: <host>-<pid>)')
+    parser.add_argument('--stale-after', type=float, default=STALE_AFTER, help=f'Seconds without heartbeat before a running job is taken over (default: {STALE_AFTER})')
+    parser.add_argument('--poll', type=float, default=POLL_INTERVAL, help=f'Seconds between two looks at an empty queue (default: {POLL_INTERVAL})')
+    args = parser.parse_args(argv)
+
+    if args.submit or args.submit_file:
+        library_names = list(args.submit or [])
+        if args.submit_file:
+            with open(args.submit_file, "r", encoding="utf-8") as f:
+                library_names += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        try:
+            submit(args.queue, library_names, json.loads(args.options))
+        except ValueError as e:
+            parser.error(str(e))
+        return
+    if args.retry_failed:
+        print("\n".join(retry_failed(args.queue)))
+        return
+    if args.status:
+        print(json.dumps(status(args.queue), indent=2))
+        return
+    try:
+        Worker(args.queue, args.worker_id, args.stale_after).work(args.drain, args.max_jobs, args.poll)
+    except KeyboardInterrupt:
+        pass